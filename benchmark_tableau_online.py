@@ -0,0 +1,208 @@
+import time
+import threading
+import tracemalloc
+import argparse
+import xml.etree.ElementTree as ET
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import requests
+import common
+import tableau_online
+from tableau_online import Site, Workbook, View, Datasource, TABLEAU_API_VERSION, TABLEAU_PAGE_SIZE, xmlns
+
+
+BENCHMARK_SITE_ID = 'benchmark-site'
+
+# Names with non-ASCII characters, as in real workbook and seller names
+SAMPLE_NAMES = ('Ventas Año Fiscal', 'Übersicht Lieferanten', '3PN Ordering Report', 'Café Sellers – Q3')
+
+
+def get_cmd_parameters():
+	parser = argparse.ArgumentParser()
+	"""
+		'num_calls'		(Optional) Number of GET calls timed for calls/sec. Default is 500.
+		'num_items'		(Optional) Number of workbooks, views and datasources in each synthetic listing. Default is 20000.
+	"""
+
+	parser.add_argument(
+		"-c",
+		"--num_calls",
+		type=int,
+		default=500,
+		help="(Optional) Number of GET calls timed for calls/sec."
+	)
+
+	parser.add_argument(
+		"-n",
+		"--num_items",
+		type=int,
+		default=20000,
+		help="(Optional) Number of workbooks, views and datasources in each synthetic listing."
+	)
+
+	args = parser.parse_args()
+
+	return args
+
+
+def get_listing_page(element_name, num_items, page_number, page_size):
+	"""
+	Returns one page of a synthetic Tableau listing (e.g. /workbooks) as UTF-8 bytes, shaped like the REST API's.
+	"""
+
+	first_item = (page_number - 1) * page_size
+	items = []
+
+	for item_number in range(first_item, min(first_item + page_size, num_items)):
+		name = f'{SAMPLE_NAMES[item_number % len(SAMPLE_NAMES)]} {item_number}'
+		if element_name == 'workbook':
+			items.append(f'<workbook id="w{item_number}" name="{name}" contentUrl="wb{item_number}" webpageUrl="https://x/#/workbooks/{item_number}" showTabs="false" createdAt="2021-01-01T00:00:00Z" updatedAt="2021-06-01T00:00:00Z"><project id="p{item_number % 50}" name="Project"/><owner id="u1" name="owner@example.com"/></workbook>')
+		elif element_name == 'view':
+			items.append(f'<view id="v{item_number}" name="{name}" contentUrl="wb/sheets/{item_number}" createdAt="2021-01-01T00:00:00Z" updatedAt="2021-06-01T00:00:00Z"><workbook id="w{item_number // 10}"/><owner id="u1"/><project id="p{item_number % 50}"/></view>')
+		else:
+			items.append(f'<datasource id="d{item_number}" name="{name}" contentUrl="ds{item_number}" type="hyper" size="1048576" createdAt="2021-01-01T00:00:00Z" updatedAt="2021-06-01T00:00:00Z"><project id="p{item_number % 50}" name="Project"/><owner id="u1"/></datasource>')
+
+	return (f'<?xml version="1.0" encoding="UTF-8"?><tsResponse xmlns="{xmlns["t"]}"><pagination pageNumber="{page_number}" pageSize="{page_size}" totalAvailable="{num_items}"/>'
+		f'<{element_name}s>{"".join(items)}</{element_name}s></tsResponse>').encode('utf-8')
+
+
+def start_server(num_items):
+	"""
+	Starts a local keep-alive HTTP server answering listing URLs with synthetic pages, and anything else with a tiny response.
+	Returns the server; its address is http://127.0.0.1:<server.server_port>.
+	"""
+
+	class ListingHandler(BaseHTTPRequestHandler):
+		protocol_version = 'HTTP/1.1' # Keeps connections alive between calls, like Tableau Online
+		disable_nagle_algorithm = True # Otherwise the headers and body go in separate packets and keep-alive calls wait on delayed ACKs
+
+		def do_GET(self):
+			parsed_url = urlparse(self.path)
+			element_name = parsed_url.path.rstrip('/').split('/')[-1][:-1] # e.g. .../workbooks -> 'workbook'
+			query = parse_qs(parsed_url.query)
+
+			if element_name in ('workbook', 'view', 'datasource'):
+				body = get_listing_page(element_name, num_items, int(query.get('pageNumber', ['1'])[0]), int(query.get('pageSize', [str(TABLEAU_PAGE_SIZE)])[0]))
+			else:
+				body = f'<tsResponse xmlns="{xmlns["t"]}"/>'.encode('utf-8')
+
+			self.send_response(200)
+			self.send_header('Content-Type', 'application/xml; charset=utf-8')
+			self.send_header('Content-Length', str(len(body)))
+			self.end_headers()
+			self.wfile.write(body)
+
+		def log_message(self, format, *args):
+			pass
+
+	server = ThreadingHTTPServer(('127.0.0.1', 0), ListingHandler)
+	threading.Thread(target=server.serve_forever, daemon=True).start()
+
+	return server
+
+
+def benchmark_calls(server_address, num_calls):
+	"""
+	Times GET calls made with a bare requests.get (a new connection per call, as before the shared client) and with tableau_online.client
+	(pooled keep-alive connections). Returns {'before': calls/sec, 'after': calls/sec}.
+	"""
+
+	url = f"{server_address}/api/{TABLEAU_API_VERSION}/sites/{BENCHMARK_SITE_ID}/serverinfo"
+	calls_per_second = {}
+
+	for label, get in (('before', requests.get), ('after', tableau_online.client.get)):
+		get(url) # Warm up
+		start_time = time.perf_counter()
+		for call_number in range(num_calls):
+			get(url)
+		calls_per_second[label] = num_calls / (time.perf_counter() - start_time)
+
+	return calls_per_second
+
+
+def benchmark_listings(site, num_items):
+	"""
+	Times Workbook.find, View.find and Datasource.find end to end against the synthetic listings. Then times building the same objects
+	from the same pages two ways, without HTTP: the old tree parse (response text re-encoded for display, ET.fromstring, then a .//t:
+	descendant search) and the streaming parse that find uses (_iter_response_elements over the raw bytes).
+	Returns {content class name: {'find_seconds', 'tree_parse_seconds', 'tree_parse_peak_mb', 'stream_parse_seconds', 'stream_parse_peak_mb'}}.
+	"""
+
+	results = {}
+	content_builders = {'workbook': Workbook.from_element, 'view': View.from_element, 'datasource': Datasource}
+
+	for content_class, element_name in ((Workbook, 'workbook'), (View, 'view'), (Datasource, 'datasource')):
+		tableau_online.get_cache.clear()
+
+		start_time = time.perf_counter()
+		num_found = len(content_class.find(site))
+		find_seconds = time.perf_counter() - start_time
+
+		if num_found != num_items:
+			raise AssertionError(f'{content_class.__name__}.find returned {num_found} items, expected {num_items}.')
+
+		num_pages = -(-num_items // TABLEAU_PAGE_SIZE)
+		pages = [get_listing_page(element_name, num_items, page_number, TABLEAU_PAGE_SIZE) for page_number in range(1, num_pages + 1)]
+		build_content = content_builders[element_name]
+
+		def tree_parse(page):
+			parsed_response = ET.fromstring(tableau_online._encode_for_display(page.decode('utf-8')))
+			return sum(1 for element in parsed_response.findall(f'.//t:{element_name}', namespaces=xmlns) if build_content(element) != None)
+
+		def stream_parse(page):
+			page_response = requests.models.Response() # Already-read body, so iter_content yields it in chunks as a streamed response would
+			page_response._content = page
+			page_response._content_consumed = True
+			return sum(1 for element in tableau_online._iter_response_elements(page_response, element_name) if build_content(element) != None)
+
+		result = {'find_seconds': find_seconds}
+		for label, parse in (('tree_parse', tree_parse), ('stream_parse', stream_parse)):
+			start_time = time.perf_counter()
+			num_parsed = sum(parse(page) for page in pages)
+			result[f'{label}_seconds'] = time.perf_counter() - start_time
+
+			if num_parsed != num_items:
+				raise AssertionError(f'{label} of {element_name}s returned {num_parsed} items, expected {num_items}.')
+
+			# Memory is measured in a second pass because tracemalloc slows every allocation down several times
+			tracemalloc.start()
+			parse(pages[0])
+			result[f'{label}_peak_mb'] = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+			tracemalloc.stop()
+
+		results[content_class.__name__] = result
+
+	return results
+
+
+def run_benchmark(num_calls=500, num_items=20000):
+	"""
+	Runs every benchmark against a local server, so the numbers measure this client rather than Tableau Online, and logs the results.
+	TLS isn't used, so the real per-call saving of keep-alive connections on Tableau Online (a TLS handshake per call) is larger than shown.
+	"""
+
+	server = start_server(num_items)
+	server_address = f'http://127.0.0.1:{server.server_port}'
+	site = Site(BENCHMARK_SITE_ID, 'benchmark', server_address, 'benchmark-token', user_id='benchmark-user')
+
+	try:
+		calls_per_second = benchmark_calls(server_address, num_calls)
+		common.standard_logger.info(f"GET calls/sec. Before (requests.get): {calls_per_second['before']:.0f}. After (tableau_online.client): {calls_per_second['after']:.0f}. {calls_per_second['after'] / calls_per_second['before']:.1f}x.")
+
+		listing_results = benchmark_listings(site, num_items)
+		for content_class_name, result in listing_results.items():
+			common.standard_logger.info(f"{content_class_name}.find of {num_items} items: {result['find_seconds']:.2f}s ({num_items / result['find_seconds']:.0f} items/s). "
+				f"Parsing only. Before (tree): {result['tree_parse_seconds']:.2f}s, peak {result['tree_parse_peak_mb']:.1f} MB per page. "
+				f"After (stream): {result['stream_parse_seconds']:.2f}s, peak {result['stream_parse_peak_mb']:.1f} MB per page.")
+	finally:
+		server.shutdown()
+
+	return {'calls_per_second': calls_per_second, 'listings': listing_results}
+
+
+if __name__ == "__main__":
+	common.standard_logger.debug("File is being run directly")
+
+	args = get_cmd_parameters()
+
+	run_benchmark(args.num_calls, args.num_items)
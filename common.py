@@ -1,14 +1,24 @@
 import logging
 import os
 
+class DisplaySafeFormatter(logging.Formatter):
+	def format(self, record):
+		"""
+		Backslash-escapes non-ASCII characters (e.g. in workbook or seller names) so log lines display in any terminal, e.g. a Windows console.
+		"""
+		return super().format(record).encode('ascii', errors='backslashreplace').decode('ascii')
+
+
 logging.basicConfig(format='%(asctime)s - %(message)s', datefmt='%d-%b-%y %H:%M:%S', level=logging.INFO) 
+for handler in logging.getLogger().handlers:
+	handler.setFormatter(DisplaySafeFormatter(fmt='%(asctime)s - %(message)s', datefmt='%d-%b-%y %H:%M:%S'))
 standard_logger = logging
 
 
 def ensure_dir(file_path):
 	directory = os.path.dirname(file_path)
 	if not os.path.exists(directory):
-		os.makedirs(directory)
+		os.makedirs(directory, exist_ok=True) # Another thread may make it between the check and here
 		standard_logger.info(f'Made directory: {directory}')
 	return
 
@@ -0,0 +1,138 @@
+import os
+import argparse
+from datetime import datetime
+import pyarrow as pa
+import pyarrow.parquet as pq
+import common
+from connection_rewriter import ConnectionRewriter, TABLEAU_CONNECTION_WORKERS
+
+
+TABLEAU_CONNECTION_INVENTORY_PATH = os.getenv('TABLEAU_CONNECTION_INVENTORY_PATH', 'tableau_connection_inventory.parquet')
+TABLEAU_CONNECTION_INVENTORY_ROW_GROUP_SIZE = int(os.getenv('TABLEAU_CONNECTION_INVENTORY_ROW_GROUP_SIZE', 5000)) # Rows per Parquet row group, the unit filtered reads skip
+
+INVENTORY_SCHEMA = pa.schema([
+	('content_type', pa.string()), # 'workbook' or 'datasource'
+	('content_id', pa.string()),
+	('content_name', pa.string()),
+	('project_id', pa.string()),
+	('connection_id', pa.string()),
+	('connection_type', pa.string()),
+	('server_address', pa.string()),
+	('server_port', pa.string()),
+	('user_name', pa.string()),
+	('scanned_at', pa.string()),
+])
+
+
+def get_cmd_parameters():
+	parser = argparse.ArgumentParser()
+	"""
+		'inventory_path'	(Optional) Path of the Parquet file. Default is TABLEAU_CONNECTION_INVENTORY_PATH or 'tableau_connection_inventory.parquet'.
+		'workbooks_only'	(Optional) Don't scan published datasources.
+		'max_workers'		(Optional) Number of connection listings requested at once. Default is TABLEAU_CONNECTION_WORKERS or 8.
+	"""
+
+	parser.add_argument(
+		"-p",
+		"--inventory_path",
+		type=str,
+		default=TABLEAU_CONNECTION_INVENTORY_PATH,
+		help="(Optional) Path of the Parquet file."
+	)
+
+	parser.add_argument(
+		"-o",
+		"--workbooks_only",
+		action='store_true',
+		help="(Optional) Don't scan published datasources."
+	)
+
+	parser.add_argument(
+		"-w",
+		"--max_workers",
+		type=int,
+		default=TABLEAU_CONNECTION_WORKERS,
+		help="(Optional) Number of connection listings requested at once."
+	)
+
+	args = parser.parse_args()
+
+	return args
+
+
+def build_inventory(inventory_path=TABLEAU_CONNECTION_INVENTORY_PATH, site=None, include_datasources=True, max_workers=TABLEAU_CONNECTION_WORKERS):
+	"""
+	Lists the connections of every workbook (and published datasource) on the site in parallel and writes them to a Parquet file, one row per connection.
+	Rows are sorted by connection type and server address and written in row groups of TABLEAU_CONNECTION_INVENTORY_ROW_GROUP_SIZE rows,
+	so lookups by either skip the row groups whose min/max statistics can't match. An inventory smaller than one row group is read whole.
+	'inventory_path'		(Optional) Path of the Parquet file. It's replaced only once the new inventory is complete.
+	'site'					(Optional) tableau_online.Site to scan. Default is tableau_online.site.
+	'include_datasources'	(Optional) Boolean to also scan published datasources.
+	'max_workers'			(Optional) Number of connection listings requested at once.
+	Returns the inventory as a pyarrow Table.
+	"""
+
+	content_connections = ConnectionRewriter(site, max_workers, include_datasources).scan()
+	scanned_at = datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')
+
+	content_connections.sort(key=lambda content_connection: (content_connection[1]['connection_type'] or '', content_connection[1]['server_address'] or ''))
+
+	columns = {column_name: [] for column_name in INVENTORY_SCHEMA.names}
+
+	for content, connection in content_connections:
+		columns['content_type'].append(type(content).__name__.lower())
+		columns['content_id'].append(content.id)
+		columns['content_name'].append(content.name)
+		columns['project_id'].append(content.project_id)
+		columns['connection_id'].append(connection['connection_id'])
+		columns['connection_type'].append(connection['connection_type'])
+		columns['server_address'].append(connection['server_address'])
+		columns['server_port'].append(connection['server_port'])
+		columns['user_name'].append(connection['user_name'])
+		columns['scanned_at'].append(scanned_at)
+
+	inventory = pa.Table.from_pydict(columns, schema=INVENTORY_SCHEMA)
+
+	temporary_path = inventory_path + '.tmp'
+	pq.write_table(inventory, temporary_path, row_group_size=TABLEAU_CONNECTION_INVENTORY_ROW_GROUP_SIZE)
+	os.replace(temporary_path, inventory_path)
+
+	common.standard_logger.info(f'Wrote {inventory.num_rows} connections to {inventory_path}.')
+
+	return inventory
+
+
+def load_inventory(inventory_path=TABLEAU_CONNECTION_INVENTORY_PATH, **column_values):
+	"""
+	Reads the inventory, keeping only the rows whose columns equal all the given values. A list, set or tuple value matches any of its members.
+	The filters are applied while reading, so row groups that can't match are skipped.
+	e.g. load_inventory(server_address='old-postgres.example.com', content_type='workbook')
+	Returns a pyarrow Table. Use .to_pandas() for a DataFrame.
+	"""
+
+	filters = []
+
+	for column_name, value in column_values.items():
+		if isinstance(value, (list, set, tuple)):
+			filters.append((column_name, 'in', list(value)))
+		else:
+			filters.append((column_name, '=', value))
+
+	return pq.read_table(inventory_path, filters=filters if len(filters) > 0 else None)
+
+
+def find_connections(inventory_path=TABLEAU_CONNECTION_INVENTORY_PATH, **column_values):
+	"""
+	Returns the inventory rows matching all column values as dicts, e.g. find_connections(server_address='old-postgres.example.com').
+	"""
+
+	columns = load_inventory(inventory_path, **column_values).to_pydict()
+	return [dict(zip(columns.keys(), row_values)) for row_values in zip(*columns.values())]
+
+
+if __name__ == "__main__":
+	common.standard_logger.debug("File is being run directly")
+
+	args = get_cmd_parameters()
+
+	build_inventory(args.inventory_path, include_datasources=not args.workbooks_only, max_workers=args.max_workers)
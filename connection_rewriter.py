@@ -0,0 +1,300 @@
+import os
+import json
+import time
+import argparse
+from fnmatch import fnmatch
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import common
+import tableau_online
+from tableau_online import Workbook, Datasource, CONTENT_ERRORS
+
+
+TABLEAU_CONNECTION_WORKERS = int(os.getenv('TABLEAU_CONNECTION_WORKERS', 8)) # Threads listing and updating connections
+
+MATCH_FIELDS = ('connection_type', 'server_address', 'server_port', 'user_name')
+UPDATE_FIELDS = ('server_address', 'server_port', 'user_name', 'password', 'embed_password')
+
+# Log progress roughly this many times per run
+NUM_PROGRESS_UPDATES = 20
+
+
+def get_cmd_parameters():
+	parser = argparse.ArgumentParser()
+	"""
+		'rules_path'		Path of the JSON connection rules. See load_rules.
+		'dry_run'			(Optional) Log the planned connection updates without sending them.
+		'workbooks_only'	(Optional) Don't scan published datasources.
+		'max_workers'		(Optional) Number of requests sent at once. Default is TABLEAU_CONNECTION_WORKERS or 8.
+	"""
+
+	parser.add_argument(
+		"-r",
+		"--rules_path",
+		type=str,
+		help="Path of the JSON connection rules.",
+		required=True
+	)
+
+	parser.add_argument(
+		"-d",
+		"--dry_run",
+		action='store_true',
+		help="(Optional) Log the planned connection updates without sending them."
+	)
+
+	parser.add_argument(
+		"-o",
+		"--workbooks_only",
+		action='store_true',
+		help="(Optional) Don't scan published datasources."
+	)
+
+	parser.add_argument(
+		"-w",
+		"--max_workers",
+		type=int,
+		default=TABLEAU_CONNECTION_WORKERS,
+		help="(Optional) Number of requests sent at once."
+	)
+
+	args = parser.parse_args()
+
+	return args
+
+
+class ConnectionRuleError(Exception):
+	pass
+
+
+class ConnectionUpdate:
+	__slots__ = ('content', 'connection', 'update', 'covered_connection_ids')
+
+	def __init__(self, content, connection, update):
+		"""
+		One planned connection update.
+		'content'		Workbook or Datasource object owning the connection
+		'connection'	Connection dict, as from get_connections
+		'update'		Dict of new values, with keys among UPDATE_FIELDS
+		"""
+
+		self.content = content
+		self.connection = connection
+		self.update = update
+		self.covered_connection_ids = [connection['connection_id']] # Workbook connections of the same type that this update also changes
+
+
+	def __str__(self):
+		changes = ', '.join(f"{field}: {self.connection.get(field)} -> {value}" for field, value in self.update.items() if field not in ('password', 'embed_password'))
+		password = ' New password.' if self.update.get('password') else ''
+		return f"{type(self.content).__name__} {self.content.name} ({self.content.id}). {self.connection['connection_type']} connection(s) {', '.join(self.covered_connection_ids)}. {changes}.{password}"
+
+
+	def apply(self, site):
+		tableau_online.update_connection(site, self.content, self.connection['connection_id'], **self.update)
+
+
+class ConnectionRewriter:
+	def __init__(self, site=None, max_workers=TABLEAU_CONNECTION_WORKERS, include_datasources=True):
+		"""
+		Rewrites the connections of every workbook (and published datasource) on a site that match a set of rules.
+		Connections are listed and updated through a bounded pool of threads.
+		'site'					(Optional) tableau_online.Site to act on. Default is tableau_online.site.
+		'max_workers'			(Optional) Number of requests sent at once.
+		'include_datasources'	(Optional) Boolean to also rewrite the connections of published datasources.
+
+		Usage:
+			rewriter = ConnectionRewriter()
+			rewriter.apply(load_rules('connection_rules.json'), dry_run=True)
+		"""
+
+		self.site = site if site != None else tableau_online.site
+		self.max_workers = max_workers
+		self.include_datasources = include_datasources
+
+
+	def __str__(self):
+		return f"Site: {self.site}. Max workers: {self.max_workers}. Include datasources: {self.include_datasources}"
+
+
+	def scan(self):
+		"""
+		Lists the connections of every workbook, and every published datasource if included, concurrently.
+		Content whose connections can't be listed (e.g. deleted since the site was listed) is logged and left out, so one failure doesn't lose the scan.
+		Returns a list of (Workbook or Datasource, connection dict).
+		"""
+
+		contents = list(Workbook.iter_find(self.site))
+		if self.include_datasources == True:
+			contents += list(Datasource.iter_find(self.site))
+
+		common.standard_logger.info(f'Listing the connections of {len(contents)} workbooks and datasources...')
+
+		contents_connections = {}
+		num_failed = 0
+
+		with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+			futures = {executor.submit(content.get_connections, self.site): content for content in contents}
+
+			for future in as_completed(futures):
+				content = futures[future]
+				try:
+					contents_connections[content.id] = future.result()
+				except CONTENT_ERRORS as error:
+					common.standard_logger.error(f'Failed to list the connections of {type(content).__name__} {content.name} ({content.id}). {type(error).__name__}: {error}')
+					num_failed += 1
+
+		if num_failed > 0:
+			common.standard_logger.warning(f'Skipped {num_failed}/{len(contents)} workbooks and datasources whose connections could not be listed.')
+
+		return [(content, connection) for content in contents for connection in contents_connections.get(content.id, [])]
+
+
+	def plan(self, rules, content_connections=None):
+		"""
+		Returns the ConnectionUpdate objects needed to apply the rules. Nothing is written.
+		Each connection gets the update of the first rule it matches. Connections that already have the rule's values are skipped.
+		A workbook gets one update per connection type, because Tableau updates all of a workbook's connections of a type at once.
+		'rules'					List of rules as returned by load_rules
+		'content_connections'	(Optional) Result of scan(). Scanned if not given.
+		"""
+
+		if content_connections == None:
+			content_connections = self.scan()
+
+		connection_updates = {}
+
+		for content, connection in content_connections:
+			rule = _get_matching_rule(rules, connection)
+			if rule == None or _is_unchanged(connection, rule['update']):
+				continue
+
+			if isinstance(content, Workbook):
+				update_key = ('Workbook', content.id, connection['connection_type'])
+			else:
+				update_key = ('Datasource', content.id, connection['connection_id'])
+
+			if update_key not in connection_updates:
+				connection_updates[update_key] = ConnectionUpdate(content, connection, rule['update'])
+				continue
+
+			connection_update = connection_updates[update_key]
+			connection_update.covered_connection_ids.append(connection['connection_id'])
+			if connection_update.update != rule['update']:
+				common.standard_logger.warning(f"{content.name}: connection {connection['connection_id']} matches a different rule than connection {connection_update.connection['connection_id']} of the same type. Tableau updates both, so the first rule's update is used.")
+
+		common.standard_logger.info(f'Planned {len(connection_updates)} connection updates for {len(content_connections)} connections.')
+
+		return list(connection_updates.values())
+
+
+	def execute(self, connection_updates, dry_run=False):
+		"""
+		Sends connection updates through the pool of threads, logging progress. A failed update is logged and doesn't stop the others.
+		'connection_updates'	List of ConnectionUpdate objects, e.g. from plan()
+		'dry_run'				(Optional) Boolean to send nothing.
+		Returns {'planned': int, 'updated': int, 'failed': [(ConnectionUpdate, error)]}.
+		"""
+
+		if dry_run == True:
+			return {'planned': len(connection_updates), 'updated': 0, 'failed': []}
+
+		num_updated = 0
+		failed = []
+		progress_interval = max(1, len(connection_updates) // NUM_PROGRESS_UPDATES)
+		start_time = time.time()
+
+		with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+			futures = {executor.submit(connection_update.apply, self.site): connection_update for connection_update in connection_updates}
+
+			for num_done, future in enumerate(as_completed(futures), start=1):
+				try:
+					future.result()
+					num_updated += 1
+				except CONTENT_ERRORS as error:
+					common.standard_logger.error(f'Failed to update {futures[future]} {type(error).__name__}: {error}')
+					failed.append((futures[future], error))
+
+				if num_done % progress_interval == 0 or num_done == len(connection_updates):
+					elapsed_seconds = time.time() - start_time
+					common.standard_logger.info(f'Connection updates: {num_done}/{len(connection_updates)} ({100 * num_done // len(connection_updates)}%). Failed: {len(failed)}. {num_done / max(elapsed_seconds, 0.001):.1f}/s.')
+
+		return {'planned': len(connection_updates), 'updated': num_updated, 'failed': failed}
+
+
+	def apply(self, rules, dry_run=False):
+		"""
+		Scans the site, plans the rules, logs the plan, then executes it. Returns the same summary as execute().
+		'dry_run'		(Optional) Boolean to only log the plan.
+		"""
+
+		connection_updates = self.plan(rules)
+
+		for connection_update in connection_updates:
+			common.standard_logger.info(f'Plan: {connection_update}')
+
+		return self.execute(connection_updates, dry_run)
+
+
+def load_rules(rules_path):
+	"""
+	Reads and validates JSON connection rules:
+
+	[
+		{
+			"match": {"connection_type": "postgres", "server_address": "old-postgres.example.com"},		values are fnmatch patterns, case-insensitive
+			"update": {"server_address": "new-postgres.example.com", "user_name": "tableau", "password_env": "POSTGRES_PASSWORD"}
+		}
+	]
+
+	"match" keys are among MATCH_FIELDS and a connection must match all of them. "update" keys are among UPDATE_FIELDS;
+	"password_env" names an environment variable holding the password, so it doesn't have to be written in the file.
+	"""
+
+	with open(rules_path) as rules_file:
+		rules = json.load(rules_file)
+
+	if not isinstance(rules, list):
+		raise ConnectionRuleError('Connection rules must be a list.')
+
+	for rule_number, rule in enumerate(rules, start=1):
+		update = dict(rule.get('update', {}))
+
+		if 'password_env' in update:
+			password_env = update.pop('password_env')
+			if os.getenv(password_env) == None:
+				raise ConnectionRuleError(f'Rule {rule_number}: environment variable {password_env} is not set.')
+			update['password'] = os.getenv(password_env)
+
+		unknown_fields = [field for field in rule.get('match', {}) if field not in MATCH_FIELDS] + [field for field in update if field not in UPDATE_FIELDS]
+		if len(unknown_fields) > 0:
+			raise ConnectionRuleError(f'Rule {rule_number}: unknown fields {unknown_fields}.')
+		if len(rule.get('match', {})) == 0 or len(update) == 0:
+			raise ConnectionRuleError(f'Rule {rule_number} must have a non-empty "match" and "update".')
+
+		rule['update'] = {field: str(value) for field, value in update.items()} # e.g. a port written as a JSON number
+
+	return rules
+
+
+def _get_matching_rule(rules, connection):
+	for rule in rules:
+		if all(fnmatch((connection.get(field) or '').lower(), pattern.lower()) for field, pattern in rule['match'].items()):
+			return rule
+	return None
+
+
+def _is_unchanged(connection, update):
+	# A new password can't be compared with the current one, so it always counts as a change
+	if update.get('password'):
+		return False
+	return all(connection.get(field) == value for field, value in update.items() if field in MATCH_FIELDS)
+
+
+if __name__ == "__main__":
+	common.standard_logger.debug("File is being run directly")
+
+	args = get_cmd_parameters()
+
+	connection_rewriter = ConnectionRewriter(max_workers=args.max_workers, include_datasources=not args.workbooks_only)
+	summary = connection_rewriter.apply(load_rules(args.rules_path), dry_run=args.dry_run)
+	common.standard_logger.info(f"Planned: {summary['planned']}. Updated: {summary['updated']}. Failed: {len(summary['failed'])}.")
@@ -0,0 +1,211 @@
+from collections import defaultdict, deque
+import common
+import tableau_online
+from tableau_online import Project, Workbook, View, Datasource
+
+
+class ContentGraph:
+	def __init__(self, projects=(), workbooks=(), views=(), datasources=()):
+		"""
+		In-memory graph of a site's projects, workbooks, views and datasources with hash indexes by ID, name, project,
+		owner, parent project and parent workbook, so project -> workbook -> view traversals cost O(result) instead of nested scans.
+		Build it with ContentGraph.build(site) (one pass over each listing) or ContentGraph.from_snapshot(site_snapshot).
+		'projects', 'workbooks', 'views', 'datasources'		(Optional) Iterables of content objects to index.
+		"""
+
+		self.by_id = {Project: {}, Workbook: {}, View: {}, Datasource: {}} # content class -> {content ID: content}
+		self.by_name = {Project: defaultdict(list), Workbook: defaultdict(list), View: defaultdict(list), Datasource: defaultdict(list)} # content class -> {name: [content]}
+		self.projects_by_parent_project = defaultdict(list) # parent project ID (None for top-level) -> [Project]
+		self.workbooks_by_project = defaultdict(list) # project ID -> [Workbook]
+		self.datasources_by_project = defaultdict(list) # project ID -> [Datasource]
+		self.views_by_workbook = defaultdict(list) # workbook ID -> [View]
+		self.projects_by_owner = defaultdict(list) # owner email address -> [Project]
+		self.workbooks_by_owner = defaultdict(list) # owner name -> [Workbook]
+
+		for contents in (projects, workbooks, views, datasources):
+			for content in contents:
+				self.add(content)
+
+
+	def __str__(self):
+		return f"Projects: {len(self.by_id[Project])}. Workbooks: {len(self.by_id[Workbook])}. Views: {len(self.by_id[View])}. Datasources: {len(self.by_id[Datasource])}."
+
+
+	@classmethod
+	def build(self, site=None):
+		"""
+		Lists every project, workbook, view and datasource on the site once and indexes them.
+		'site'		(Optional) tableau_online.Site to list. Default is tableau_online.site.
+		"""
+
+		site = site if site != None else tableau_online.site
+
+		content_graph = ContentGraph(site.iter_projects(), Workbook.iter_find(site), View.iter_find(site), Datasource.iter_find(site))
+		common.standard_logger.info(f'Built content graph. {content_graph}')
+
+		return content_graph
+
+
+	@classmethod
+	def from_snapshot(self, site_snapshot):
+		"""
+		Indexes the content of a site_snapshot.SiteSnapshot without calling the server.
+		"""
+
+		return ContentGraph(site_snapshot.find_projects(), site_snapshot.find_workbooks(), site_snapshot.find_views(), site_snapshot.find_datasources())
+
+
+	def add(self, content):
+		"""
+		Indexes one Project, Workbook, View or Datasource. Adding an object with an ID already in the graph doesn't remove the old object's index entries.
+		"""
+
+		content_class = type(content)
+		self.by_id[content_class][content.id] = content
+		self.by_name[content_class][content.name].append(content)
+
+		if content_class == Project:
+			self.projects_by_parent_project[content.parent_project_id].append(content)
+			self.projects_by_owner[content.owner_email_address].append(content)
+		elif content_class == Workbook:
+			self.workbooks_by_project[content.project_id].append(content)
+			self.workbooks_by_owner[content.owner].append(content)
+		elif content_class == View:
+			self.views_by_workbook[content.parent_workbook_id].append(content)
+		elif content_class == Datasource:
+			self.datasources_by_project[content.project_id].append(content)
+
+
+	def get(self, content_class, content_id):
+		"""
+		Returns one Project, Workbook, View or Datasource by ID, or None if it's not in the graph.
+		"""
+
+		return self.by_id[content_class].get(content_id)
+
+
+	def find(self, content_class, name):
+		"""
+		Returns the objects of a content class with the given name, e.g. find(Project, 'Finance').
+		"""
+
+		return list(self.by_name[content_class].get(name, []))
+
+
+	def find_by_owner(self, owner):
+		"""
+		Returns the projects and workbooks owned by someone as {'projects', 'workbooks'}.
+		'owner'		Projects are matched on the owner's email address and workbooks on the owner's name, as in the API listings.
+		"""
+
+		return {'projects': list(self.projects_by_owner.get(owner, [])), 'workbooks': list(self.workbooks_by_owner.get(owner, []))}
+
+
+	def get_parent_project(self, project):
+		return self.by_id[Project].get(project.parent_project_id) if project.parent_project_id != None else None
+
+
+	def get_ancestor_projects(self, project):
+		"""
+		Returns the project's parent, grandparent, etc. up to its top-level project, nearest first.
+		"""
+
+		ancestor_projects = []
+		parent_project = self.get_parent_project(project)
+
+		while parent_project != None and parent_project not in ancestor_projects:
+			ancestor_projects.append(parent_project)
+			parent_project = self.get_parent_project(parent_project)
+
+		return ancestor_projects
+
+
+	def get_top_level_projects(self):
+		return list(self.projects_by_parent_project.get(None, []))
+
+
+	def get_child_projects(self, project_id):
+		return list(self.projects_by_parent_project.get(project_id, []))
+
+
+	def get_descendant_projects(self, project_id):
+		"""
+		Returns every project nested under a project, at any depth, breadth first. The project itself isn't included.
+		"""
+
+		descendant_projects = []
+		project_ids_to_visit = deque([project_id])
+		visited_project_ids = {project_id}
+
+		while len(project_ids_to_visit) > 0:
+			for child_project in self.projects_by_parent_project.get(project_ids_to_visit.popleft(), []):
+				if child_project.id not in visited_project_ids:
+					visited_project_ids.add(child_project.id)
+					descendant_projects.append(child_project)
+					project_ids_to_visit.append(child_project.id)
+
+		return descendant_projects
+
+
+	def _get_project_ids(self, project_id, recursive):
+		return [project_id] + ([project.id for project in self.get_descendant_projects(project_id)] if recursive == True else [])
+
+
+	def get_workbooks(self, project_id, recursive=False):
+		"""
+		Returns the workbooks in a project.
+		'recursive'		(Optional) Boolean to also include the workbooks of every nested project.
+		"""
+
+		return [workbook for each_project_id in self._get_project_ids(project_id, recursive) for workbook in self.workbooks_by_project.get(each_project_id, [])]
+
+
+	def get_datasources(self, project_id, recursive=False):
+		"""
+		Returns the datasources in a project.
+		'recursive'		(Optional) Boolean to also include the datasources of every nested project.
+		"""
+
+		return [datasource for each_project_id in self._get_project_ids(project_id, recursive) for datasource in self.datasources_by_project.get(each_project_id, [])]
+
+
+	def get_views(self, workbook_id):
+		return list(self.views_by_workbook.get(workbook_id, []))
+
+
+	def get_workbook(self, view):
+		return self.by_id[Workbook].get(view.parent_workbook_id)
+
+
+	def get_project(self, content):
+		"""
+		Returns the project containing a Workbook, Datasource, View or nested Project, or None if it's not in the graph.
+		"""
+
+		if isinstance(content, Project):
+			return self.get_parent_project(content)
+
+		if isinstance(content, View):
+			workbook = self.get_workbook(content)
+			project_id = workbook.project_id if workbook != None else content.project_id
+		else:
+			project_id = content.project_id
+
+		return self.by_id[Project].get(project_id)
+
+
+	def get_contents_under(self, project_id):
+		"""
+		Returns everything under a project, at any depth, as {'projects', 'workbooks', 'views', 'datasources'}.
+		'projects' holds the nested projects, not the project itself.
+		"""
+
+		projects = self.get_descendant_projects(project_id)
+		workbooks = self.get_workbooks(project_id, recursive=True)
+
+		return {
+			'projects': projects,
+			'workbooks': workbooks,
+			'views': [view for workbook in workbooks for view in self.views_by_workbook.get(workbook.id, [])],
+			'datasources': self.get_datasources(project_id, recursive=True),
+		}
@@ -1,7 +1,5 @@
 import os, logging
-import snowflake.connector
 from dotenv import load_dotenv
-from snowflake.connector.pandas_tools import write_pandas
 
 
 load_dotenv()
@@ -17,6 +15,8 @@ SNOWFLAKE_ROLE_NAME = os.getenv('SNOWFLAKE_ROLE_NAME')
 
 
 def snowflake_connect():
+	import snowflake.connector # Imported here so importing database (e.g. for its settings) doesn't load the connector
+
 	ctx = snowflake.connector.connect(
 		user=SNOWFLAKE_USER_NAME,
 		password=SNOWFLAKE_PASSWORD,
@@ -48,3 +48,13 @@ def snowflake_query_string(query):
 		return query_results_cursors
 	finally:
 		ctx.close()
+
+
+def write_pandas(conn, df, table_name, **kwargs):
+	"""
+	Writes a DataFrame to a Snowflake table. Same arguments and return value as snowflake.connector.pandas_tools.write_pandas.
+	"""
+
+	from snowflake.connector.pandas_tools import write_pandas as snowflake_write_pandas
+
+	return snowflake_write_pandas(conn, df, table_name, **kwargs)
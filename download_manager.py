@@ -0,0 +1,290 @@
+import os
+import time
+import argparse
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import common
+import tableau_online
+from tableau_online import Datasource, BandwidthLimiter, CONTENT_ERRORS, extract_hyper_from_tdsx_file
+
+
+TABLEAU_DOWNLOAD_WORKERS = int(os.getenv('TABLEAU_DOWNLOAD_WORKERS', 4)) # Datasources downloaded at once
+TABLEAU_EXTRACT_WORKERS = int(os.getenv('TABLEAU_EXTRACT_WORKERS', 2)) # Hyper files extracted at once
+TABLEAU_DOWNLOAD_BYTES_PER_SECOND = int(os.getenv('TABLEAU_DOWNLOAD_BYTES_PER_SECOND', 0)) # Combined cap on all downloads. 0 for no cap.
+
+
+def get_cmd_parameters():
+	parser = argparse.ArgumentParser()
+	"""
+		'output_folder'			Full path to destination directory. '/' required at end of path.
+		'datasource_ids'		(Optional) IDs of the datasources to download.
+		'filters'				(Optional) Datasource.find filter expressions, e.g. 'name:eq:TS Events'. Used if no IDs are given.
+		'max_workers'			(Optional) Number of datasources downloaded at once. Default is TABLEAU_DOWNLOAD_WORKERS or 4.
+		'max_extract_workers'	(Optional) Number of hyper files extracted at once. Default is TABLEAU_EXTRACT_WORKERS or 2.
+		'bytes_per_second'		(Optional) Combined download cap. Default is TABLEAU_DOWNLOAD_BYTES_PER_SECOND, or no cap.
+		'no_extract'			(Optional) Keep the tdsx zip files without extracting hyper files.
+		'delete_zip_file'		(Optional) Delete each tdsx zip file once its hyper file is extracted.
+		'skip_unchanged'		(Optional) Skip datasources unchanged since their last recorded download.
+	"""
+
+	parser.add_argument(
+		"-o",
+		"--output_folder",
+		type=str,
+		help="Full path to destination directory. '/' required at end of path.",
+		required=True
+	)
+
+	parser.add_argument(
+		"-i",
+		"--datasource_ids",
+		type=str,
+		nargs='+',
+		help="(Optional) IDs of the datasources to download."
+	)
+
+	parser.add_argument(
+		"-f",
+		"--filters",
+		type=str,
+		nargs='+',
+		help="(Optional) Datasource.find filter expressions, e.g. 'name:eq:TS Events'. Used if no IDs are given."
+	)
+
+	parser.add_argument(
+		"-w",
+		"--max_workers",
+		type=int,
+		default=TABLEAU_DOWNLOAD_WORKERS,
+		help="(Optional) Number of datasources downloaded at once."
+	)
+
+	parser.add_argument(
+		"-e",
+		"--max_extract_workers",
+		type=int,
+		default=TABLEAU_EXTRACT_WORKERS,
+		help="(Optional) Number of hyper files extracted at once."
+	)
+
+	parser.add_argument(
+		"-b",
+		"--bytes_per_second",
+		type=int,
+		default=TABLEAU_DOWNLOAD_BYTES_PER_SECOND,
+		help="(Optional) Combined download cap in bytes per second. 0 for no cap."
+	)
+
+	parser.add_argument(
+		"-n",
+		"--no_extract",
+		action='store_true',
+		help="(Optional) Keep the tdsx zip files without extracting hyper files."
+	)
+
+	parser.add_argument(
+		"-d",
+		"--delete_zip_file",
+		action='store_true',
+		help="(Optional) Delete each tdsx zip file once its hyper file is extracted."
+	)
+
+	parser.add_argument(
+		"-s",
+		"--skip_unchanged",
+		action='store_true',
+		help="(Optional) Skip datasources unchanged since their last recorded download."
+	)
+
+	args = parser.parse_args()
+
+	return args
+
+
+class DatasourceDownload:
+	__slots__ = ('datasource', 'file_name', 'tdsx_zip_file_path', 'full_hyper_file_path', 'skipped', 'num_bytes', 'download_seconds', 'extract_seconds', 'error')
+
+	def __init__(self, datasource, file_name):
+		"""
+		Outcome of one datasource download, with its size and timings for throughput reporting.
+		'file_name' is the base name of its tdsx and hyper files. 'error' holds the exception that failed the download or extraction, or None.
+		"""
+
+		self.datasource = datasource
+		self.file_name = file_name
+		self.tdsx_zip_file_path = None
+		self.full_hyper_file_path = None
+		self.skipped = False
+		self.num_bytes = 0
+		self.download_seconds = 0
+		self.extract_seconds = 0
+		self.error = None
+
+
+	def get_mb_per_second(self):
+		return self.num_bytes / 1024 ** 2 / max(self.download_seconds, 0.001)
+
+
+	def __str__(self):
+		if self.skipped == True:
+			return f"{self.datasource.name}: skipped, unchanged."
+		if self.error != None:
+			return f"{self.datasource.name}: failed. {type(self.error).__name__}: {self.error}"
+		extract = f" Extracted in {self.extract_seconds:.1f}s." if self.full_hyper_file_path != None else ''
+		return f"{self.datasource.name}: {self.num_bytes / 1024 ** 2:.1f} MB in {self.download_seconds:.1f}s ({self.get_mb_per_second():.1f} MB/s).{extract}"
+
+
+class DownloadManager:
+	def __init__(self, output_folder, site=None, max_workers=TABLEAU_DOWNLOAD_WORKERS, max_extract_workers=TABLEAU_EXTRACT_WORKERS, bytes_per_second=TABLEAU_DOWNLOAD_BYTES_PER_SECOND,
+			extract_as_hyper=True, delete_zip_file=False, skip_unchanged=False):
+		"""
+		Downloads many datasources at once through a bounded pool of threads, sharing one bytes/sec cap.
+		Finished tdsx files are handed to a separate pool that extracts their hyper files, so extraction overlaps the downloads still running.
+		'output_folder'			Full path to destination directory. '/' required at end of path.
+		'site'					(Optional) tableau_online.Site to download from. Default is tableau_online.site.
+		'max_workers'			(Optional) Number of datasources downloaded at once.
+		'max_extract_workers'	(Optional) Number of hyper files extracted at once.
+		'bytes_per_second'		(Optional) Combined download cap. 0 or None for no cap.
+		'extract_as_hyper'		(Optional) Boolean to extract each datasource's hyper file.
+		'delete_zip_file'		(Optional) Boolean to delete each tdsx zip file once its hyper file is extracted.
+		'skip_unchanged'		(Optional) Boolean to skip datasources unchanged since their last recorded download (see Datasource.is_unchanged).
+								A download is recorded only once its hyper file is extracted.
+
+		Usage:
+			download_manager = DownloadManager('/data/tableau/', bytes_per_second=50 * 1024 ** 2)
+			datasource_downloads = download_manager.download(filters=['projectName:eq:Admin Insights'])
+		"""
+
+		self.output_folder = output_folder
+		self.site = site if site != None else tableau_online.site
+		self.max_workers = max_workers
+		self.max_extract_workers = max_extract_workers
+		self.bandwidth_limiter = BandwidthLimiter(bytes_per_second) if bytes_per_second else None
+		self.extract_as_hyper = extract_as_hyper
+		self.delete_zip_file = delete_zip_file
+		self.skip_unchanged = skip_unchanged
+
+
+	def __str__(self):
+		return f"Output folder: {self.output_folder}. Max workers: {self.max_workers}. Max extract workers: {self.max_extract_workers}. Bandwidth cap: {self.bandwidth_limiter or 'none'}."
+
+
+	def download(self, datasources=None, filters=None):
+		"""
+		Downloads the datasources concurrently and extracts their hyper files as their downloads finish.
+		A failed datasource is logged and doesn't stop the others.
+		'datasources'	(Optional) List of Datasource objects.
+		'filters'		(Optional) Datasource.find filter expressions selecting the datasources, if none are given, e.g. ['name:in:[TS Events,TS Users]'].
+		Returns a list of DatasourceDownload, in the order of the datasources.
+		"""
+
+		if datasources == None:
+			datasources = Datasource.find(self.site, filters) or []
+
+		file_name_counts = Counter(_get_file_name(datasource) for datasource in datasources)
+		for file_name, count in file_name_counts.items():
+			if count > 1:
+				common.standard_logger.warning(f"{count} datasources are named {file_name}. Their files are named {file_name}-<datasource ID>, so they don't overwrite each other.")
+
+		datasource_downloads = [DatasourceDownload(datasource, _get_file_name(datasource, file_name_counts[_get_file_name(datasource)] == 1)) for datasource in datasources]
+		common.standard_logger.info(f'Downloading {len(datasource_downloads)} datasources. {self}')
+		common.ensure_dir(self.output_folder) # Once, before the threads that all write to it start
+		start_time = time.time()
+
+		with ThreadPoolExecutor(max_workers=self.max_workers) as download_executor, ThreadPoolExecutor(max_workers=self.max_extract_workers) as extract_executor:
+			download_futures = [download_executor.submit(self._download, datasource_download) for datasource_download in datasource_downloads]
+			extract_futures = []
+
+			for future in as_completed(download_futures):
+				datasource_download = future.result()
+				if datasource_download.tdsx_zip_file_path != None and self.extract_as_hyper == True:
+					extract_futures.append(extract_executor.submit(self._extract, datasource_download))
+				elif datasource_download.skipped == False:
+					self._record(datasource_download)
+
+			for future in as_completed(extract_futures):
+				self._record(future.result())
+
+		elapsed_seconds = max(time.time() - start_time, 0.001)
+		num_bytes = sum(datasource_download.num_bytes for datasource_download in datasource_downloads)
+		num_failed = sum(1 for datasource_download in datasource_downloads if datasource_download.error != None)
+		num_skipped = sum(1 for datasource_download in datasource_downloads if datasource_download.skipped == True)
+		common.standard_logger.info(f'Downloaded {len(datasource_downloads) - num_failed - num_skipped}/{len(datasource_downloads)} datasources. Skipped: {num_skipped}. Failed: {num_failed}. {num_bytes / 1024 ** 2:.1f} MB in {elapsed_seconds:.1f}s ({num_bytes / 1024 ** 2 / elapsed_seconds:.1f} MB/s).')
+
+		return datasource_downloads
+
+
+	def _download(self, datasource_download):
+		datasource = datasource_download.datasource
+		start_time = time.time()
+
+		try:
+			if self.skip_unchanged == True and datasource.is_unchanged(self.site):
+				common.standard_logger.info(f'Skipped downloading {datasource.name} datasource: unchanged since {datasource.updated_at}.')
+				datasource_download.skipped = True
+				return datasource_download
+
+			downloaded_file_paths = datasource.download(self.site, self.output_folder, bandwidth_limiter=self.bandwidth_limiter, file_name=datasource_download.file_name)
+			datasource_download.tdsx_zip_file_path = str(downloaded_file_paths['tdsx_zip_file_path'])
+			datasource_download.num_bytes = os.path.getsize(datasource_download.tdsx_zip_file_path)
+		except CONTENT_ERRORS as error:
+			datasource_download.error = error
+
+		datasource_download.download_seconds = time.time() - start_time
+
+		return datasource_download
+
+
+	def _extract(self, datasource_download):
+		start_time = time.time()
+
+		try:
+			datasource_download.full_hyper_file_path = extract_hyper_from_tdsx_file(datasource_download.tdsx_zip_file_path, self.output_folder, datasource_download.file_name, self.delete_zip_file)
+			if self.delete_zip_file == True:
+				datasource_download.tdsx_zip_file_path = None
+		except CONTENT_ERRORS as error:
+			datasource_download.error = error
+
+		datasource_download.extract_seconds = time.time() - start_time
+
+		return datasource_download
+
+
+	def _record(self, datasource_download):
+		"""
+		Logs a finished datasource and, if skipping unchanged datasources, records its download.
+		"""
+
+		if datasource_download.error != None:
+			common.standard_logger.error(str(datasource_download))
+			return
+
+		common.standard_logger.info(str(datasource_download))
+
+		if self.skip_unchanged == True:
+			datasource_download.datasource.record_download_state(self.site)
+
+
+def _get_file_name(datasource, is_unique_name=True):
+	"""
+	Returns the base name of a datasource's tdsx and hyper files: the name Datasource.download gives them by default, followed by the
+	datasource ID if another datasource in the run has the same name. Concurrent downloads never share a .part file.
+	"""
+
+	file_name = datasource.name.replace('/', '-')
+	return file_name if is_unique_name == True else f'{file_name}-{datasource.id}'
+
+
+if __name__ == "__main__":
+	common.standard_logger.debug("File is being run directly")
+
+	args = get_cmd_parameters()
+
+	if args.datasource_ids != None:
+		datasources = [Datasource.get(tableau_online.site, datasource_id) for datasource_id in args.datasource_ids]
+	else:
+		datasources = None
+
+	download_manager = DownloadManager(args.output_folder, max_workers=args.max_workers, max_extract_workers=args.max_extract_workers, bytes_per_second=args.bytes_per_second,
+		extract_as_hyper=not args.no_extract, delete_zip_file=args.delete_zip_file, skip_unchanged=args.skip_unchanged)
+	download_manager.download(datasources, args.filters)
@@ -238,6 +238,8 @@ def main(invoice_view_id, output_folder, vendor_names=None, seller_names=None, s
 
 	num_invoices_created = 0
 
+	threepn_seller_invoice_view = tableau_online.View.get(tableau_online.site, invoice_view_id)
+
 	for seller_vendor_week_combo in seller_vendor_week_combos:
 		common.standard_logger.debug(f'seller_vendor_week_combo: {seller_vendor_week_combo}')
 
@@ -254,7 +256,6 @@ def main(invoice_view_id, output_folder, vendor_names=None, seller_names=None, s
 		filters.append(week_filter)
 		filters.append(seller_filter)
 		filters.append(vendor_filter)
-		threepn_seller_invoice_view = tableau_online.View.get(tableau_online.site, invoice_view_id)
 
 		view_pdf = threepn_seller_invoice_view.get_pdf(filters)
 
@@ -0,0 +1,406 @@
+import os
+import json
+import time
+import argparse
+from fnmatch import fnmatch
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import common
+import tableau_online
+from tableau_online import Project, Workbook, View, CONTENT_ERRORS, get_permissions, get_permission_changes, delete_permission
+from content_graph import ContentGraph
+
+
+TABLEAU_PERMISSIONS_WORKERS = int(os.getenv('TABLEAU_PERMISSIONS_WORKERS', 8)) # Threads sending permission PUTs
+
+DEFAULT_PERMISSION_OBJECT_TYPES = ('workbook', 'datasource', 'flow')
+PERMISSION_MODES = ('Allow', 'Deny')
+
+# Log progress roughly this many times per run
+NUM_PROGRESS_UPDATES = 20
+
+
+def get_cmd_parameters():
+	parser = argparse.ArgumentParser()
+	"""
+		'policy_path'		Path of the JSON permissions policy. See load_policy.
+		'dry_run'			(Optional) Log the planned permission writes without sending them.
+		'no_diff'			(Optional) Write every capability in the policy, without reading current permissions to skip unchanged ones.
+		'max_workers'		(Optional) Number of permission writes sent at once. Default is TABLEAU_PERMISSIONS_WORKERS or 8.
+	"""
+
+	parser.add_argument(
+		"-p",
+		"--policy_path",
+		type=str,
+		help="Path of the JSON permissions policy.",
+		required=True
+	)
+
+	parser.add_argument(
+		"-d",
+		"--dry_run",
+		action='store_true',
+		help="(Optional) Log the planned permission writes without sending them."
+	)
+
+	parser.add_argument(
+		"-n",
+		"--no_diff",
+		action='store_true',
+		help="(Optional) Write every capability in the policy, without reading current permissions to skip unchanged ones."
+	)
+
+	parser.add_argument(
+		"-w",
+		"--max_workers",
+		type=int,
+		default=TABLEAU_PERMISSIONS_WORKERS,
+		help="(Optional) Number of permission writes sent at once."
+	)
+
+	args = parser.parse_args()
+
+	return args
+
+
+class PolicyError(Exception):
+	pass
+
+
+class PermissionWrite:
+	__slots__ = ('content', 'group_ids', 'capabilities', 'mode', 'object_type', 'workbook', 'replaced_capabilities')
+
+	def __init__(self, content, group_ids, capabilities, mode, object_type=None, workbook=None, replaced_capabilities=None):
+		"""
+		One planned permissions PUT giving one or more groups the same capabilities on one project, workbook or view.
+		'content'			Project, Workbook or View object receiving the permissions
+		'group_ids'			List of IDs of the groups for whom to add the permissions
+		'capabilities'		List of capability names
+		'mode'				'Allow' or 'Deny'
+		'object_type'		(Optional) For project default permissions: 'workbook', 'datasource' or 'flow'. None for the project's own permissions.
+		'workbook'			(Optional) The view's parent Workbook object, for view permissions.
+		'replaced_capabilities'		(Optional) Capabilities in 'capabilities' that the groups currently have in the other mode. They're deleted before the PUT.
+		"""
+
+		self.content = content
+		self.group_ids = group_ids
+		self.capabilities = capabilities
+		self.mode = mode
+		self.object_type = object_type
+		self.workbook = workbook
+		self.replaced_capabilities = replaced_capabilities if replaced_capabilities != None else []
+
+
+	def __str__(self):
+		target = type(self.content).__name__ + (f' default {self.object_type}' if self.object_type != None else '')
+		replaced = f" Replacing {_get_other_mode(self.mode)}: {', '.join(self.replaced_capabilities)}." if len(self.replaced_capabilities) > 0 else ''
+		return f"{target} {self.content.name} ({self.content.id}). Group IDs: {', '.join(self.group_ids)}. {self.mode}: {', '.join(self.capabilities)}.{replaced}"
+
+
+	def get_key(self):
+		"""
+		Returns (content type, content ID, default permissions object type) identifying the permissions this write changes.
+		"""
+
+		return (type(self.content).__name__, self.content.id, self.object_type)
+
+
+	def apply(self, site):
+		for group_id in self.group_ids:
+			for capability in self.replaced_capabilities:
+				delete_permission(site, self.content, 'group', group_id, capability, _get_other_mode(self.mode), self.object_type)
+
+		if isinstance(self.content, Project) and self.object_type != None:
+			project_default_permission = {'object_type': self.object_type, 'permission_capabilities': self.capabilities, 'permission_capability_mode': self.mode}
+			self.content.add_default_group_permissions(site, self.group_ids, [project_default_permission])
+		elif isinstance(self.content, View):
+			self.content.add_group_permissions(self.content, self.group_ids, self.capabilities, self.mode, workbook=self.workbook, site=site)
+		else:
+			# Views are planned as separate writes, so the workbook's own PUT doesn't cascade
+			self.content.add_group_permissions(site, self.group_ids, self.capabilities, self.mode)
+
+
+class PermissionsEngine:
+	def __init__(self, site=None, max_workers=TABLEAU_PERMISSIONS_WORKERS, content_graph=None):
+		"""
+		Plans the permission writes a policy requires and sends them through a bounded pool of threads.
+		'site'				(Optional) tableau_online.Site to act on. Default is tableau_online.site.
+		'max_workers'		(Optional) Number of permission writes sent at once.
+		'content_graph'		(Optional) content_graph.ContentGraph of the site. Built on first use if not given.
+
+		Usage:
+			engine = PermissionsEngine()
+			engine.apply(load_policy('permissions_policy.json'), dry_run=True)
+		"""
+
+		self.site = site if site != None else tableau_online.site
+		self.max_workers = max_workers
+		self.content_graph = content_graph
+
+
+	def __str__(self):
+		return f"Site: {self.site}. Max workers: {self.max_workers}"
+
+
+	def _get_content_graph(self):
+		if self.content_graph == None:
+			self.content_graph = ContentGraph.build(self.site)
+		return self.content_graph
+
+
+	def _get_group_ids(self, policy):
+		"""
+		Returns {group name or ID used in the policy: group ID}. Groups are listed once.
+		"""
+
+		group_ids = {}
+		for group in tableau_online.iter_groups(self.site):
+			group_ids[group.group_name] = group.group_id
+			group_ids[group.group_id] = group.group_id
+
+		for rule in policy['rules']:
+			for group_reference in rule['groups']:
+				if group_reference not in group_ids:
+					raise PolicyError(f'Group {group_reference} not found on site {self.site.site_name}.')
+
+		return group_ids
+
+
+	def plan(self, policy, diff=True):
+		"""
+		Returns the list of PermissionWrite objects needed to apply a policy, in rule order. Nothing is written.
+		Groups getting the same capabilities on the same object are batched into one write.
+		'policy'		Dict as returned by load_policy
+		'diff'			(Optional) Boolean to read the current permissions of every target (concurrently) and keep only the capabilities
+						that change. Writes that change nothing are dropped, so re-applying a policy to an unchanged site costs only reads.
+		"""
+
+		content_graph = self._get_content_graph()
+		group_ids = self._get_group_ids(policy)
+		capability_sets = policy.get('capability_sets', {})
+		permission_writes = []
+
+		for rule in policy['rules']:
+			projects = _get_rule_projects(content_graph, rule)
+			rule_group_ids = [group_ids[group_reference] for group_reference in rule['groups']]
+
+			for project in projects:
+				for group_id in rule_group_ids:
+					if 'project' in rule:
+						permission_writes.append(PermissionWrite(project, [group_id], _get_capabilities(rule['project'], capability_sets), rule['project']['mode']))
+
+					for default_permission in rule.get('default_permissions', []):
+						permission_writes.append(PermissionWrite(project, [group_id], _get_capabilities(default_permission, capability_sets), default_permission['mode'], default_permission['object_type']))
+
+				if project.content_permissions == 'LockedToProject' or ('workbooks' not in rule and 'views' not in rule):
+					continue
+
+				for workbook in content_graph.get_workbooks(project.id):
+					for group_id in rule_group_ids:
+						if 'workbooks' in rule:
+							permission_writes.append(PermissionWrite(workbook, [group_id], _get_capabilities(rule['workbooks'], capability_sets), rule['workbooks']['mode']))
+
+						# Views only have their own permissions when the workbook doesn't show them as tabs
+						if 'views' in rule and workbook.show_tabs == 'false':
+							for view in content_graph.get_views(workbook.id):
+								permission_writes.append(PermissionWrite(view, [group_id], _get_capabilities(rule['views'], capability_sets), rule['views']['mode'], workbook=workbook))
+
+		if diff == True:
+			num_writes_before_diff = len(permission_writes)
+			permission_writes = self._diff(permission_writes)
+			common.standard_logger.info(f'Skipped {num_writes_before_diff - len(permission_writes)} group permission writes that change nothing.')
+
+		permission_writes = _batch(permission_writes)
+		common.standard_logger.info(f'Planned {len(permission_writes)} permission writes.')
+
+		return permission_writes
+
+
+	def _diff(self, permission_writes):
+		"""
+		Reads the current permissions of each distinct target once and returns the writes reduced to the capabilities that change.
+		"""
+
+		permission_writes_by_key = {}
+		for permission_write in permission_writes:
+			permission_writes_by_key.setdefault(permission_write.get_key(), permission_write)
+
+		with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+			current_permissions_list = executor.map(lambda permission_write: get_permissions(self.site, permission_write.content, permission_write.object_type), permission_writes_by_key.values())
+			current_permissions_by_key = dict(zip(permission_writes_by_key.keys(), current_permissions_list))
+
+		changed_permission_writes = []
+
+		for permission_write in permission_writes:
+			current_capabilities = current_permissions_by_key[permission_write.get_key()].get(('group', permission_write.group_ids[0]), {})
+			capabilities_to_add, capabilities_to_replace = get_permission_changes(current_capabilities, permission_write.capabilities, permission_write.mode)
+
+			if len(capabilities_to_add) + len(capabilities_to_replace) > 0:
+				permission_write.capabilities = capabilities_to_add + capabilities_to_replace
+				permission_write.replaced_capabilities = capabilities_to_replace
+				changed_permission_writes.append(permission_write)
+
+		return changed_permission_writes
+
+
+	def execute(self, permission_writes, dry_run=False):
+		"""
+		Sends permission writes through the pool of threads, logging progress. A failed write is logged and doesn't stop the others.
+		'permission_writes'		List of PermissionWrite objects, e.g. from plan()
+		'dry_run'				(Optional) Boolean to send nothing.
+		Returns {'planned': int, 'written': int, 'failed': [(PermissionWrite, error)]}.
+		"""
+
+		if dry_run == True:
+			return {'planned': len(permission_writes), 'written': 0, 'failed': []}
+
+		num_written = 0
+		failed = []
+		progress_interval = max(1, len(permission_writes) // NUM_PROGRESS_UPDATES)
+		start_time = time.time()
+
+		with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+			futures = {executor.submit(permission_write.apply, self.site): permission_write for permission_write in permission_writes}
+
+			for num_done, future in enumerate(as_completed(futures), start=1):
+				try:
+					future.result()
+					num_written += 1
+				except CONTENT_ERRORS as error:
+					common.standard_logger.error(f'Failed to write {futures[future]} {type(error).__name__}: {error}')
+					failed.append((futures[future], error))
+
+				if num_done % progress_interval == 0 or num_done == len(permission_writes):
+					elapsed_seconds = time.time() - start_time
+					common.standard_logger.info(f'Permission writes: {num_done}/{len(permission_writes)} ({100 * num_done // len(permission_writes)}%). Failed: {len(failed)}. {num_done / max(elapsed_seconds, 0.001):.1f}/s.')
+
+		return {'planned': len(permission_writes), 'written': num_written, 'failed': failed}
+
+
+	def apply(self, policy, dry_run=False, diff=True):
+		"""
+		Plans a policy, logs the plan, then executes it. Returns the same summary as execute().
+		'dry_run'		(Optional) Boolean to only log the plan.
+		'diff'			(Optional) See plan().
+		"""
+
+		permission_writes = self.plan(policy, diff)
+
+		for permission_write in permission_writes:
+			common.standard_logger.info(f'Plan: {permission_write}')
+
+		return self.execute(permission_writes, dry_run)
+
+
+def load_policy(policy_path):
+	"""
+	Reads and validates a JSON permissions policy:
+
+	{
+		"capability_sets": {"workbook_editor": ["Read", "Filter", "ExportData", "Write"]},
+		"rules": [
+			{
+				"groups": ["BI"],									group names or IDs
+				"projects": ["*finance*"],							project name patterns (fnmatch, case-insensitive)
+				"include_nested_projects": true,					(optional) also apply to projects nested under matching ones
+				"project": {"capabilities": ["Read", "Write"], "mode": "Allow"},
+				"default_permissions": [{"object_type": "workbook", "capabilities": "workbook_editor", "mode": "Deny"}],
+				"workbooks": {"capabilities": "workbook_editor", "mode": "Allow"},
+				"views": {"capabilities": ["Read", "Filter"], "mode": "Allow"}		cascaded to views of workbooks that don't show tabs
+			}
+		]
+	}
+
+	"capabilities" is a list of capability names or the name of a capability set. Every section of a rule but "groups" and "projects" is optional.
+	Workbooks and views in projects whose permissions are locked to the project are skipped.
+	"""
+
+	with open(policy_path) as policy_file:
+		policy = json.load(policy_file)
+
+	_validate_policy(policy)
+
+	return policy
+
+
+def _validate_policy(policy):
+	if not isinstance(policy.get('rules'), list):
+		raise PolicyError('Policy must have a list of "rules".')
+
+	capability_sets = policy.get('capability_sets', {})
+
+	for rule_number, rule in enumerate(policy['rules'], start=1):
+		for key in ('groups', 'projects'):
+			if not isinstance(rule.get(key), list) or len(rule[key]) == 0:
+				raise PolicyError(f'Rule {rule_number} must have a non-empty list of "{key}".')
+
+		permission_sections = [rule[key] for key in ('project', 'workbooks', 'views') if key in rule] + rule.get('default_permissions', [])
+
+		for permission_section in permission_sections:
+			if permission_section.get('mode') not in PERMISSION_MODES:
+				raise PolicyError(f'Rule {rule_number}: mode must be one of {PERMISSION_MODES}, not {permission_section.get("mode")}.')
+			capabilities = permission_section.get('capabilities')
+			if isinstance(capabilities, str) and capabilities not in capability_sets:
+				raise PolicyError(f'Rule {rule_number}: capability set {capabilities} is not defined.')
+			if not isinstance(capabilities, (str, list)):
+				raise PolicyError(f'Rule {rule_number}: capabilities must be a list or the name of a capability set.')
+
+		for default_permission in rule.get('default_permissions', []):
+			if default_permission.get('object_type') not in DEFAULT_PERMISSION_OBJECT_TYPES:
+				raise PolicyError(f'Rule {rule_number}: default permission object_type must be one of {DEFAULT_PERMISSION_OBJECT_TYPES}.')
+
+
+def _batch(permission_writes):
+	"""
+	Merges the writes giving the same capabilities in the same mode on the same object into one write for all their groups, keeping the order of first appearance.
+	"""
+
+	batched_permission_writes = {}
+
+	for permission_write in permission_writes:
+		batch_key = (permission_write.get_key(), permission_write.mode, tuple(permission_write.capabilities), tuple(permission_write.replaced_capabilities))
+		batched_permission_write = batched_permission_writes.get(batch_key)
+
+		if batched_permission_write == None:
+			batched_permission_writes[batch_key] = permission_write
+		else:
+			batched_permission_write.group_ids = batched_permission_write.group_ids + [group_id for group_id in permission_write.group_ids if group_id not in batched_permission_write.group_ids]
+
+	return list(batched_permission_writes.values())
+
+
+def _get_other_mode(permission_mode):
+	return 'Deny' if permission_mode == 'Allow' else 'Allow'
+
+
+def _get_capabilities(permission_section, capability_sets):
+	capabilities = permission_section['capabilities']
+	return capability_sets[capabilities] if isinstance(capabilities, str) else capabilities
+
+
+def _get_rule_projects(content_graph, rule):
+	"""
+	Returns the projects whose names match any of the rule's patterns, plus their nested projects if the rule includes them. Each project appears once.
+	"""
+
+	patterns = [pattern.lower() for pattern in rule['projects']]
+	projects = {}
+
+	for project in content_graph.by_id[Project].values():
+		if any(fnmatch(project.name.lower(), pattern) for pattern in patterns):
+			projects[project.id] = project
+			if rule.get('include_nested_projects', False) == True:
+				for nested_project in content_graph.get_descendant_projects(project.id):
+					projects[nested_project.id] = nested_project
+
+	return list(projects.values())
+
+
+if __name__ == "__main__":
+	common.standard_logger.debug("File is being run directly")
+
+	args = get_cmd_parameters()
+
+	permissions_engine = PermissionsEngine(max_workers=args.max_workers)
+	summary = permissions_engine.apply(load_policy(args.policy_path), dry_run=args.dry_run, diff=not args.no_diff)
+	common.standard_logger.info(f"Planned: {summary['planned']}. Written: {summary['written']}. Failed: {len(summary['failed'])}.")
@@ -0,0 +1,336 @@
+import os
+import sqlite3
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+import common
+import tableau_online
+from tableau_online import Project, Workbook, View, Datasource, Group, ContentTable, CONTENT_ERRORS
+
+
+TABLEAU_SNAPSHOT_PATH = os.getenv('TABLEAU_SNAPSHOT_PATH', 'tableau_site_snapshot.sqlite3')
+TABLEAU_SNAPSHOT_WORKERS = int(os.getenv('TABLEAU_SNAPSHOT_WORKERS', 8)) # Threads fetching workbook and datasource connections
+
+# Overlap between incremental syncs so items updated while the previous sync was running aren't missed. Upserts make re-fetching harmless.
+SYNC_OVERLAP_MINUTES = 5
+
+# Table name -> content class. Each table has one column per attribute in the class's __slots__.
+CONTENT_TABLES = {'projects': Project, 'workbooks': Workbook, 'views': View, 'datasources': Datasource}
+
+# Table name -> content_type of its rows in the connections table
+CONNECTION_CONTENT_TYPES = {'workbooks': 'workbook', 'datasources': 'datasource'}
+
+CONNECTION_COLUMNS = ('connection_id', 'content_type', 'content_id', 'connection_type', 'server_address', 'server_port', 'user_name')
+
+
+def get_cmd_parameters():
+	parser = argparse.ArgumentParser()
+	"""
+		'snapshot_path'		(Optional) Path of the SQLite snapshot file. Default is TABLEAU_SNAPSHOT_PATH or 'tableau_site_snapshot.sqlite3'.
+		'full'				(Optional) Re-list everything and drop deleted content, instead of fetching only what changed since the last sync.
+	"""
+
+	parser.add_argument(
+		"-p",
+		"--snapshot_path",
+		type=str,
+		default=TABLEAU_SNAPSHOT_PATH,
+		help="(Optional) Path of the SQLite snapshot file."
+	)
+
+	parser.add_argument(
+		"-f",
+		"--full",
+		action='store_true',
+		help="(Optional) Re-list everything and drop deleted content, instead of fetching only what changed since the last sync."
+	)
+
+	args = parser.parse_args()
+
+	return args
+
+
+class SiteSnapshot:
+	def __init__(self, snapshot_path=TABLEAU_SNAPSHOT_PATH, site=None):
+		"""
+		Local SQLite copy of a site's projects, workbooks, views, datasources, groups and workbook and datasource connections.
+		sync() fetches only what changed since the last sync (updatedAt:gt:<last sync>), and the find_* and get_* methods answer from disk.
+		'snapshot_path'		(Optional) Path of the SQLite file. Created if missing.
+		'site'				(Optional) tableau_online.Site to sync from. Default is tableau_online.site.
+		"""
+
+		self.snapshot_path = snapshot_path
+		self.site = site if site != None else tableau_online.site
+		self.connection = sqlite3.connect(snapshot_path)
+		self.connection.row_factory = sqlite3.Row
+		self._create_tables()
+
+
+	def __str__(self):
+		counts = ', '.join(f'{table_name}: {self._count(table_name)}' for table_name in list(CONTENT_TABLES) + ['groups', 'connections'])
+		return f"Snapshot: {self.snapshot_path}. {counts}."
+
+
+	def close(self):
+		self.connection.close()
+
+
+	def _create_tables(self):
+		with self.connection:
+			for table_name, content_class in CONTENT_TABLES.items():
+				columns = ', '.join(f'{column_name} TEXT' if column_name != 'id' else 'id TEXT PRIMARY KEY' for column_name in content_class.__slots__)
+				self.connection.execute(f'CREATE TABLE IF NOT EXISTS {table_name} ({columns})')
+
+			self.connection.execute('CREATE TABLE IF NOT EXISTS groups (id TEXT PRIMARY KEY, name TEXT)')
+			self.connection.execute('CREATE TABLE IF NOT EXISTS connections (connection_id TEXT, content_type TEXT, content_id TEXT, connection_type TEXT, server_address TEXT, server_port TEXT, user_name TEXT, PRIMARY KEY (content_type, content_id, connection_id))')
+			self.connection.execute('CREATE TABLE IF NOT EXISTS sync_state (table_name TEXT PRIMARY KEY, last_sync_at TEXT)')
+
+			self.connection.execute('CREATE INDEX IF NOT EXISTS workbooks_project_id ON workbooks (project_id)')
+			self.connection.execute('CREATE INDEX IF NOT EXISTS workbooks_name ON workbooks (name)')
+			self.connection.execute('CREATE INDEX IF NOT EXISTS views_parent_workbook_id ON views (parent_workbook_id)')
+			self.connection.execute('CREATE INDEX IF NOT EXISTS projects_parent_project_id ON projects (parent_project_id)')
+			self.connection.execute('CREATE INDEX IF NOT EXISTS connections_server_address ON connections (server_address)')
+
+
+	def _count(self, table_name):
+		return self.connection.execute(f'SELECT COUNT(*) FROM {table_name}').fetchone()[0]
+
+
+	def get_last_sync_at(self, table_name):
+		"""
+		Returns the time of the last successful sync of a table as a Tableau timestamp, e.g. '2021-06-01T12:00:00Z', or None.
+		"""
+
+		row = self.connection.execute('SELECT last_sync_at FROM sync_state WHERE table_name = ?', (table_name,)).fetchone()
+		return row['last_sync_at'] if row != None else None
+
+
+	def sync(self, full=False):
+		"""
+		Brings the snapshot up to date. Returns {table name: number of rows fetched}.
+		'full'		(Optional) Boolean to re-list everything and delete rows for content no longer on the site. Incremental syncs can't see deletions.
+		"""
+
+		num_rows_fetched = {}
+
+		for table_name, content_class in CONTENT_TABLES.items():
+			num_rows_fetched[table_name] = self._sync_content_table(table_name, content_class, full)
+
+		num_rows_fetched['groups'] = self._sync_groups()
+
+		common.standard_logger.info(f'Synced snapshot {self.snapshot_path}: {num_rows_fetched}')
+
+		return num_rows_fetched
+
+
+	def _sync_content_table(self, table_name, content_class, full):
+		sync_started_at = datetime.utcnow()
+		last_sync_at = None if full == True else self.get_last_sync_at(table_name)
+		filters = [f'updatedAt:gt:{last_sync_at}'] if last_sync_at != None else None
+
+		if table_name == 'projects':
+			contents = self.site.iter_projects(filters)
+		elif table_name == 'workbooks':
+			contents = Workbook.iter_find(self.site, filters)
+		elif table_name == 'views':
+			contents = View.iter_find(self.site, filters)
+		else:
+			contents = Datasource.iter_find(self.site, filters)
+
+		column_names = content_class.__slots__
+		insert_statement = f"INSERT OR REPLACE INTO {table_name} ({', '.join(column_names)}) VALUES ({', '.join('?' for column_name in column_names)})"
+		fetched_ids = []
+		fetched_contents = []
+
+		with self.connection:
+			for content in contents:
+				self.connection.execute(insert_statement, [_to_column_value(getattr(content, column_name)) for column_name in column_names])
+				fetched_ids.append(content.id)
+
+				if table_name in CONNECTION_CONTENT_TYPES:
+					fetched_contents.append(content)
+
+			num_connection_failures = self._sync_connections(CONNECTION_CONTENT_TYPES.get(table_name), fetched_contents)
+
+			if full == True:
+				self._delete_missing(table_name, fetched_ids)
+
+			# If some connections couldn't be listed, the sync time isn't moved forward, so the next incremental sync fetches that content again
+			if num_connection_failures == 0:
+				next_sync_at = (sync_started_at - timedelta(minutes=SYNC_OVERLAP_MINUTES)).strftime('%Y-%m-%dT%H:%M:%SZ')
+				self.connection.execute('INSERT OR REPLACE INTO sync_state (table_name, last_sync_at) VALUES (?, ?)', (table_name, next_sync_at))
+
+		common.standard_logger.debug(f'Synced {len(fetched_ids)} {table_name} (updated since {last_sync_at}).')
+
+		return len(fetched_ids)
+
+
+	def _sync_groups(self):
+		# Groups have no updatedAt to filter on, and there are few of them, so they're always re-listed.
+		groups = list(tableau_online.iter_groups(self.site))
+
+		with self.connection:
+			self.connection.execute('DELETE FROM groups')
+			self.connection.executemany('INSERT INTO groups (id, name) VALUES (?, ?)', [(group.group_id, group.group_name) for group in groups])
+
+		return len(groups)
+
+
+	def _sync_connections(self, content_type, contents):
+		"""
+		Lists the connections of workbooks or datasources concurrently and stores them. Content whose connections can't be listed
+		(e.g. deleted since the listing) is logged and keeps its stored connections. Returns the number of failures.
+		"""
+
+		if len(contents) == 0:
+			return 0
+
+		num_failed = 0
+
+		with ThreadPoolExecutor(max_workers=TABLEAU_SNAPSHOT_WORKERS) as executor:
+			futures = {executor.submit(content.get_connections, self.site): content for content in contents}
+
+			for future in as_completed(futures):
+				content = futures[future]
+				try:
+					self._store_connections(content_type, content.id, future.result())
+				except CONTENT_ERRORS as error:
+					common.standard_logger.error(f'Failed to list the connections of {content_type} {content.name} ({content.id}). {type(error).__name__}: {error}')
+					num_failed += 1
+
+		return num_failed
+
+
+	def _store_connections(self, content_type, content_id, connections):
+		self.connection.execute('DELETE FROM connections WHERE content_type = ? AND content_id = ?', (content_type, content_id))
+		self.connection.executemany(
+			f"INSERT INTO connections ({', '.join(CONNECTION_COLUMNS)}) VALUES ({', '.join('?' for column_name in CONNECTION_COLUMNS)})",
+			[(connection['connection_id'], content_type, content_id, connection['connection_type'], connection['server_address'], connection['server_port'], connection['user_name']) for connection in connections]
+		)
+
+
+	def _delete_missing(self, table_name, fetched_ids):
+		self.connection.execute('CREATE TEMP TABLE IF NOT EXISTS _fetched_ids (id TEXT PRIMARY KEY)')
+		self.connection.execute('DELETE FROM _fetched_ids')
+		self.connection.executemany('INSERT OR IGNORE INTO _fetched_ids (id) VALUES (?)', [(fetched_id,) for fetched_id in fetched_ids])
+		self.connection.execute(f'DELETE FROM {table_name} WHERE id NOT IN (SELECT id FROM _fetched_ids)')
+
+		if table_name in CONNECTION_CONTENT_TYPES:
+			self.connection.execute('DELETE FROM connections WHERE content_type = ? AND content_id NOT IN (SELECT id FROM _fetched_ids)', (CONNECTION_CONTENT_TYPES[table_name],))
+
+
+	def _select(self, table_name, column_values):
+		"""
+		Returns the rows of a table whose columns equal all the given values. A list, set or tuple value matches any of its members.
+		"""
+
+		conditions = []
+		parameters = []
+
+		for column_name, value in column_values.items():
+			if isinstance(value, (list, set, tuple)):
+				value = list(value)
+				conditions.append(f"{column_name} IN ({', '.join('?' for item in value)})")
+				parameters.extend(value)
+			else:
+				conditions.append(f'{column_name} = ?')
+				parameters.append(value)
+
+		where_clause = (' WHERE ' + ' AND '.join(conditions)) if len(conditions) > 0 else ''
+		return self.connection.execute(f'SELECT * FROM {table_name}{where_clause}', parameters).fetchall()
+
+
+	def _find(self, table_name, column_values):
+		content_class = CONTENT_TABLES[table_name]
+		return [tableau_online._content_from_values(content_class, _from_row(content_class, row)) for row in self._select(table_name, column_values)]
+
+
+	def find_projects(self, **column_values):
+		"""
+		Returns the Project objects matching all column values, e.g. find_projects(parent_project_id=project.id).
+		"""
+
+		return self._find('projects', column_values)
+
+
+	def find_workbooks(self, **column_values):
+		"""
+		Returns the Workbook objects matching all column values, e.g. find_workbooks(project_id=project.id) or find_workbooks(name='3PN Ordering Report').
+		"""
+
+		return self._find('workbooks', column_values)
+
+
+	def find_views(self, **column_values):
+		"""
+		Returns the View objects matching all column values, e.g. find_views(parent_workbook_id=workbook.id).
+		"""
+
+		return self._find('views', column_values)
+
+
+	def find_datasources(self, **column_values):
+		"""
+		Returns the Datasource objects matching all column values, e.g. find_datasources(name='TS Events').
+		"""
+
+		return self._find('datasources', column_values)
+
+
+	def find_groups(self, **column_values):
+		"""
+		Returns the Group objects matching all column values, e.g. find_groups(name='BI').
+		"""
+
+		return [Group(row['id'], row['name']) for row in self._select('groups', column_values)]
+
+
+	def find_connections(self, **column_values):
+		"""
+		Returns connection dicts (as from Workbook.get_connections or Datasource.get_connections, plus content_type and content_id) matching all column values,
+		e.g. find_connections(server_address='old-postgres.example.com'). content_type is 'workbook' or 'datasource'.
+		"""
+
+		return [dict(row) for row in self._select('connections', column_values)]
+
+
+	def get(self, content_class, content_id):
+		"""
+		Returns one Project, Workbook, View or Datasource by ID, or None if it's not in the snapshot.
+		"""
+
+		table_name = [table_name for table_name, table_content_class in CONTENT_TABLES.items() if table_content_class == content_class][0]
+		contents = self._find(table_name, {'id': content_id})
+		return contents[0] if len(contents) > 0 else None
+
+
+	def as_table(self, content_class):
+		"""
+		Returns every row of a content type as a tableau_online.ContentTable.
+		"""
+
+		table_name = [table_name for table_name, table_content_class in CONTENT_TABLES.items() if table_content_class == content_class][0]
+		return ContentTable.from_objects(content_class, self._find(table_name, {}))
+
+
+def _to_column_value(value):
+	return str(value) if value != None and not isinstance(value, str) else value
+
+
+def _from_row(content_class, row):
+	values = dict(row)
+	# Counts are stored as text like the XML attributes they come from, except num_views, which is counted when parsing.
+	if 'num_views' in values and content_class == Workbook and values['num_views'] != None:
+		values['num_views'] = int(values['num_views'])
+	return values
+
+
+if __name__ == "__main__":
+	common.standard_logger.debug("File is being run directly")
+
+	args = get_cmd_parameters()
+
+	site_snapshot = SiteSnapshot(args.snapshot_path)
+	site_snapshot.sync(full=args.full)
+	common.standard_logger.info(site_snapshot)
+	site_snapshot.close()
@@ -1,12 +1,27 @@
 import os
+import sys
+import itertools
 import xml.etree.ElementTree as ET # Contains methods used to build and parse XML
 import requests # Contains methods used to make HTTP requests
+from requests.adapters import HTTPAdapter
 import common 
+import json
+import time
+import random
+import re
+import threading
+import email.utils
+import functools
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import zipfile
-import pantab
+import zlib
+import struct
+import hashlib
+import tempfile
 from dotenv import load_dotenv
-import urllib
+import urllib.parse
 
 
 load_dotenv()
@@ -19,8 +34,44 @@ TABLEAU_SITE_NAME = os.getenv('TABLEAU_SITE_NAME')
 TABLEAU_USER_NAME = os.getenv('TABLEAU_USER_NAME')
 TABLEAU_PASSWORD = os.getenv('TABLEAU_PASSWORD')
 
+TABLEAU_HTTP_POOL_SIZE = int(os.getenv('TABLEAU_HTTP_POOL_SIZE', 20))
+TABLEAU_HTTP_CONNECT_TIMEOUT = float(os.getenv('TABLEAU_HTTP_CONNECT_TIMEOUT', 10))
+TABLEAU_HTTP_READ_TIMEOUT = float(os.getenv('TABLEAU_HTTP_READ_TIMEOUT', 300))
+
+TABLEAU_HTTP_MAX_RETRIES = int(os.getenv('TABLEAU_HTTP_MAX_RETRIES', 5))
+TABLEAU_HTTP_BACKOFF_BASE_SECONDS = float(os.getenv('TABLEAU_HTTP_BACKOFF_BASE_SECONDS', 1))
+TABLEAU_HTTP_BACKOFF_MAX_SECONDS = float(os.getenv('TABLEAU_HTTP_BACKOFF_MAX_SECONDS', 60))
+TABLEAU_CIRCUIT_BREAKER_THRESHOLD = int(os.getenv('TABLEAU_CIRCUIT_BREAKER_THRESHOLD', 10)) # Consecutive failed attempts before calls are refused
+TABLEAU_CIRCUIT_BREAKER_RESET_SECONDS = float(os.getenv('TABLEAU_CIRCUIT_BREAKER_RESET_SECONDS', 120))
+
+# Tableau error codes of a 401 that signing in again fixes: invalid or expired auth token. Others (e.g. 401001 bad credentials) would fail again.
+AUTH_TOKEN_ERROR_CODES = ('401002',)
+
+TABLEAU_PAGE_SIZE = int(os.getenv('TABLEAU_PAGE_SIZE', 1000)) # 1000 is the max the REST API allows
+TABLEAU_PAGE_PREFETCH = int(os.getenv('TABLEAU_PAGE_PREFETCH', 4)) # Pages fetched in the background while the caller processes the current one
+TABLEAU_XML_CHUNK_SIZE = int(os.getenv('TABLEAU_XML_CHUNK_SIZE', 64 * 1024)) # Bytes fed to the streaming XML parser at a time
+
+TABLEAU_DOWNLOAD_CHUNK_SIZE = int(os.getenv('TABLEAU_DOWNLOAD_CHUNK_SIZE', 1024 * 1024)) # Bytes held in memory at a time while streaming a download to disk
+TABLEAU_DOWNLOAD_PROGRESS_SECONDS = float(os.getenv('TABLEAU_DOWNLOAD_PROGRESS_SECONDS', 10)) # Seconds between download progress log lines
+TABLEAU_DOWNLOAD_MAX_RESUMES = int(os.getenv('TABLEAU_DOWNLOAD_MAX_RESUMES', 5)) # Times an interrupted download is resumed before giving up
+
+TABLEAU_GET_CACHE_SIZE = int(os.getenv('TABLEAU_GET_CACHE_SIZE', 2048)) # Max objects kept by the Workbook/View/Datasource.get cache
+TABLEAU_GET_CACHE_TTL_SECONDS = {
+	'Workbook': float(os.getenv('TABLEAU_WORKBOOK_CACHE_TTL_SECONDS', 300)),
+	'View': float(os.getenv('TABLEAU_VIEW_CACHE_TTL_SECONDS', 300)),
+	'Datasource': float(os.getenv('TABLEAU_DATASOURCE_CACHE_TTL_SECONDS', 60)), # Extracts refresh, so updated_at/size go stale sooner
+}
+
+TABLEAU_AUTH_TOKEN_CACHE_PATH = os.getenv('TABLEAU_AUTH_TOKEN_CACHE_PATH', os.path.join(os.path.expanduser('~'), '.tableau_utils_auth_token.json'))
+TABLEAU_AUTH_TOKEN_TTL_MINUTES = float(os.getenv('TABLEAU_AUTH_TOKEN_TTL_MINUTES', 110)) # Tableau Online sessions idle out after 120 minutes
+
+TABLEAU_DOWNLOAD_STATE_PATH = os.getenv('TABLEAU_DOWNLOAD_STATE_PATH', os.path.join(os.path.expanduser('~'), '.tableau_utils_download_state.json'))
+
 xmlns = {'t': 'http://tableau.com/api'}
 
+_auth_token_cache_lock = threading.Lock() # Threads read-modify-write TABLEAU_AUTH_TOKEN_CACHE_PATH one at a time
+_download_state_lock = threading.Lock() # Same for TABLEAU_DOWNLOAD_STATE_PATH
+
 class ApiCallError(BaseException):
 	def __init__(self, code, summary, detail):
 		self.code = code
@@ -31,15 +82,333 @@ class ApiCallError(BaseException):
 		return f"Code: {self.code}. Summary: {self.summary}. Detail: {self.detail}."
 
 
+# Errors that fail one item of a bulk run (a permission write, a connection scan or update, a download) without stopping the others.
+# ApiCallError derives from BaseException, so catching Exception alone would let it stop the whole run.
+CONTENT_ERRORS = (Exception, ApiCallError)
+
+
 class UserDefinedFieldError(Exception):
 	pass
 
 
+class DownloadIntegrityError(Exception):
+	pass
+
+
+class HyperFileNotFoundError(Exception):
+	pass
+
+
+class CircuitBreakerOpenError(ApiCallError):
+	def __init__(self, retry_at):
+		super().__init__('circuit_open', 'Circuit breaker open', f'Too many consecutive failed calls to Tableau. Calls are refused until {time.ctime(retry_at)}.')
+		self.retry_at = retry_at
+
+
+class CircuitBreaker:
+	def __init__(self, failure_threshold=TABLEAU_CIRCUIT_BREAKER_THRESHOLD, reset_seconds=TABLEAU_CIRCUIT_BREAKER_RESET_SECONDS):
+		"""
+		Refuses calls for reset_seconds once failure_threshold consecutive attempts have failed. After that a single trial call
+		is let through: success closes the breaker, failure opens it again.
+		"""
+
+		self.failure_threshold = failure_threshold
+		self.reset_seconds = reset_seconds
+		self.num_consecutive_failures = 0
+		self.opened_at = None
+		self._lock = threading.Lock()
+
+
+	def __str__(self):
+		return f"Consecutive failures: {self.num_consecutive_failures}. Open: {self.opened_at != None}."
+
+
+	def before_call(self):
+		with self._lock:
+			if self.opened_at == None:
+				return
+			retry_at = self.opened_at + self.reset_seconds
+			if time.time() < retry_at:
+				raise CircuitBreakerOpenError(retry_at)
+			self.opened_at = time.time() # Half-open: let this call through, hold the others back for another period
+
+
+	def record_success(self):
+		with self._lock:
+			self.num_consecutive_failures = 0
+			self.opened_at = None
+
+
+	def record_failure(self):
+		with self._lock:
+			self.num_consecutive_failures += 1
+			if self.num_consecutive_failures >= self.failure_threshold:
+				if self.opened_at == None:
+					common.standard_logger.error(f'Circuit breaker opened after {self.num_consecutive_failures} consecutive failed calls.')
+				self.opened_at = time.time()
+
+
+class ApiClient:
+	# Error classes returned by _classify_response. Only these are retried.
+	RETRYABLE_ERROR_CLASSES = ('rate_limited', 'unavailable', 'server_error', 'network_error')
+	# Methods safe to replay after a 5xx or network error, when the server may already have applied the call
+	IDEMPOTENT_METHODS = ('GET', 'HEAD', 'PUT')
+	# Error classes retried for other methods (e.g. POST, DELETE): the server refused the call without applying it
+	NON_IDEMPOTENT_RETRYABLE_ERROR_CLASSES = ('rate_limited',)
+
+	def __init__(self, pool_size=TABLEAU_HTTP_POOL_SIZE, connect_timeout=TABLEAU_HTTP_CONNECT_TIMEOUT, read_timeout=TABLEAU_HTTP_READ_TIMEOUT, max_retries=TABLEAU_HTTP_MAX_RETRIES, circuit_breaker=None):
+		"""
+		Shared HTTP client that every Tableau REST call goes through, so TCP/TLS connections are pooled and kept alive between calls.
+		Rate-limited (429), unavailable (502/503/504) and failed (500, network error) calls are retried with jittered exponential
+		backoff, honouring Retry-After. Calls that aren't idempotent (POST, DELETE) are only retried when rate-limited.
+		'pool_size'				(Optional) Max number of keep-alive connections kept open per host. Should be at least the number of threads making calls.
+		'connect_timeout'		(Optional) Seconds to wait for a connection to be established.
+		'read_timeout'			(Optional) Seconds to wait between bytes received from the server.
+		'max_retries'			(Optional) Retries per call before the last response is returned (or the last network error raised).
+		'circuit_breaker'		(Optional) CircuitBreaker shared by all calls. Default is a new one using the TABLEAU_CIRCUIT_BREAKER_* settings.
+		"""
+
+		self.pool_size = pool_size
+		self.timeout = (connect_timeout, read_timeout)
+		self.max_retries = max_retries
+		self.circuit_breaker = circuit_breaker if circuit_breaker != None else CircuitBreaker()
+
+		self.retry_counts = Counter() # (endpoint, error class) -> number of retries
+		self._retry_counts_lock = threading.Lock()
+
+		self.session = requests.Session()
+		adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+		self.session.mount('https://', adapter)
+		self.session.mount('http://', adapter)
+		self.session.headers.update({'Accept-Encoding': 'gzip, deflate', 'Connection': 'keep-alive'})
+
+
+	def __str__(self):
+		return f"Pool size: {self.pool_size}. Timeout (connect, read): {self.timeout}. Max retries: {self.max_retries}. Circuit breaker: {self.circuit_breaker}"
+
+
+	def request(self, method, url, site=None, idempotent=None, **kwargs):
+		"""
+		Makes one HTTP call through the pooled session, retrying transient failures.
+		'method'			HTTP method, e.g. 'GET'
+		'url'				Full URL to call
+		'site'				(Optional) Site object whose auth token is sent as x-tableau-auth. If the server answers 401,
+							the site signs in again and the call is retried once.
+		'idempotent'		(Optional) Boolean to retry the call after a 5xx or network error, as it's safe to replay.
+							Default is True for GET, HEAD and PUT, False otherwise.
+		Returns the requests Response. Raises CircuitBreakerOpenError if the breaker is open.
+		"""
+
+		if idempotent == None:
+			idempotent = method.upper() in self.IDEMPOTENT_METHODS
+		retryable_error_classes = self.RETRYABLE_ERROR_CLASSES if idempotent == True else self.NON_IDEMPOTENT_RETRYABLE_ERROR_CLASSES
+
+		kwargs.setdefault('timeout', self.timeout)
+		headers = dict(kwargs.pop('headers', None) or {})
+		endpoint = _get_endpoint(method, url)
+		signed_in_again = False
+		attempt = 0
+
+		while True:
+			self.circuit_breaker.before_call()
+
+			if site != None:
+				auth_token = site.auth_token
+				headers['x-tableau-auth'] = auth_token
+
+			try:
+				server_response = self.session.request(method, url, headers=headers, **kwargs)
+				error_class = _classify_response(server_response)
+			except (requests.ConnectionError, requests.Timeout) as error:
+				server_response = None
+				error_class = 'network_error'
+				network_error = error
+
+			if error_class == 'auth' and site != None and signed_in_again == False:
+				common.standard_logger.info('Auth token rejected by server. Signing in again...')
+				server_response.close() # A streamed response holds its pooled connection until closed
+				site.sign_in(force=True, rejected_auth_token=auth_token)
+				signed_in_again = True
+				continue
+
+			if error_class not in self.RETRYABLE_ERROR_CLASSES:
+				self.circuit_breaker.record_success()
+				return server_response
+
+			self.circuit_breaker.record_failure()
+
+			if error_class not in retryable_error_classes:
+				common.standard_logger.error(f'{endpoint} failed with {error_class}. Not retried, as the call may already have been applied.')
+				if server_response == None:
+					raise network_error
+				return server_response
+
+			if attempt >= self.max_retries:
+				common.standard_logger.error(f'{endpoint} failed with {error_class} after {attempt} retries.')
+				if server_response == None:
+					raise network_error
+				return server_response
+
+			delay = _get_backoff_seconds(attempt, server_response)
+			with self._retry_counts_lock:
+				self.retry_counts[(endpoint, error_class)] += 1
+			common.standard_logger.warning(f'{endpoint} failed with {error_class}. Retry {attempt + 1}/{self.max_retries} in {delay:.1f}s...')
+			if server_response != None:
+				server_response.close()
+			time.sleep(delay)
+			attempt += 1
+
+
+	def get_retry_counts(self):
+		"""
+		Returns a snapshot of retries made so far as {endpoint: {error class: count}}, for monitoring.
+		"""
+
+		with self._retry_counts_lock:
+			retry_counts = dict(self.retry_counts)
+
+		retry_counts_by_endpoint = {}
+		for (endpoint, error_class), count in retry_counts.items():
+			retry_counts_by_endpoint.setdefault(endpoint, {})[error_class] = count
+
+		return retry_counts_by_endpoint
+
+
+	def get(self, url, **kwargs):
+		return self.request('GET', url, **kwargs)
+
+
+	def put(self, url, **kwargs):
+		return self.request('PUT', url, **kwargs)
+
+
+	def post(self, url, **kwargs):
+		return self.request('POST', url, **kwargs)
+
+
+	def delete(self, url, **kwargs):
+		return self.request('DELETE', url, **kwargs)
+
+
+	def close(self):
+		self.session.close()
+
+
+client = ApiClient()
+
+
+class GetCache:
+	def __init__(self, max_size=TABLEAU_GET_CACHE_SIZE, ttl_seconds=TABLEAU_GET_CACHE_TTL_SECONDS):
+		"""
+		Bounded LRU cache with a TTL per content type, used by Workbook.get, View.get and Datasource.get.
+		Entries are invalidated when this process changes the object (permissions, connections).
+		'max_size'			(Optional) Max number of objects kept. The least recently used is evicted first.
+		'ttl_seconds'		(Optional) Dict of content type name -> seconds an entry stays valid
+		"""
+
+		self.max_size = max_size
+		self.ttl_seconds = ttl_seconds
+		self.entries = OrderedDict() # (site ID, content type, content ID) -> (expires at, object)
+		self.hits = Counter() # content type -> number of hits
+		self.misses = Counter() # content type -> number of misses
+		self._lock = threading.Lock()
+
+
+	def __str__(self):
+		return f"Size: {len(self.entries)}/{self.max_size}. Hits: {dict(self.hits)}. Misses: {dict(self.misses)}."
+
+
+	def get(self, key):
+		"""
+		Returns the cached object for key, or None if it's missing or expired.
+		"""
+
+		content_type = key[1]
+
+		with self._lock:
+			entry = self.entries.get(key)
+			if entry == None or entry[0] <= time.time():
+				if entry != None:
+					del self.entries[key]
+				self.misses[content_type] += 1
+				return None
+
+			self.entries.move_to_end(key)
+			self.hits[content_type] += 1
+			return entry[1]
+
+
+	def set(self, key, content):
+		with self._lock:
+			self.entries[key] = (time.time() + self.ttl_seconds.get(key[1], 0), content)
+			self.entries.move_to_end(key)
+			while len(self.entries) > self.max_size:
+				self.entries.popitem(last=False)
+
+
+	def invalidate(self, key):
+		"""
+		Drops a cached object, e.g. after changing its permissions.
+		'key'		(site ID, content type, content ID)
+		"""
+
+		with self._lock:
+			self.entries.pop(key, None)
+
+
+	def clear(self):
+		with self._lock:
+			self.entries.clear()
+
+
+	def get_stats(self):
+		"""
+		Returns {'size', 'hits', 'misses'} with hits and misses per content type, for monitoring.
+		"""
+
+		with self._lock:
+			return {'size': len(self.entries), 'hits': dict(self.hits), 'misses': dict(self.misses)}
+
+
+get_cache = GetCache()
+
+
+def _cached_get(get):
+	"""
+	Wraps a get(self, site, content_id, *, refresh=False) classmethod so results are served from get_cache until their TTL passes.
+	Passing refresh=True skips the cache. refresh is keyword-only, so it can't be passed by position and missed.
+	"""
+
+	@functools.wraps(get)
+	def cached_get(self, site, content_id, *, refresh=False):
+		key = (site.site_id, self.__name__, content_id)
+
+		if refresh == False:
+			content = get_cache.get(key)
+			if content != None:
+				return content
+
+		content = get(self, site, content_id, refresh=refresh)
+		get_cache.set(key, content)
+		return content
+
+	return cached_get
+
+
+def invalidate_content(site, content_type, content_id):
+	"""
+	Forgets everything cached about an object that this process just changed, so the next get() fetches it from the server.
+	'site'				Site object the object is on. Entries for the same ID on other sites are kept.
+	'content_type'		'Workbook', 'View' or 'Datasource'
+	"""
+
+	get_cache.invalidate((site.site_id, content_type, content_id))
+
+
 class User:
 	def __init__(self, user_id, user_name):
 		self.user_id = user_id
 		self.user_name = user_name
-		self.auth_token = auth_token
 		
 
 	def __str__(self):
@@ -57,42 +426,112 @@ class Group:
 
 
 class Site:
-	def __init__(self, site_id, site_name, server_address, auth_token):
-		self.site_id = site_id
+	def __init__(self, site_id, site_name, server_address, auth_token, user_name=None, password=None, user_id=None):
+		"""
+		Site signed into. If auth_token is None, sign-in is deferred until the first API call needs the token,
+		and a token cached by a previous run (see TABLEAU_AUTH_TOKEN_CACHE_PATH) is reused while it's still valid.
+		'site_id'			ID of the site. May be None if auth_token is None.
+		'site_name'			Content URL of the site
+		'server_address'	Server address, e.g. https://us-west-2b.online.tableau.com
+		'auth_token'		Authentication token, or None to sign in lazily
+		'user_name'			(Optional) User to sign in as. Default is TABLEAU_USER_NAME.
+		'password'			(Optional) Password of the user. Default is TABLEAU_PASSWORD.
+		'user_id'			(Optional) ID of the signed-in user
+		"""
+
 		self.site_name = site_name
 		self.server_address = server_address
-		self.auth_token = auth_token
-		
+		self.user_name = user_name if user_name != None else TABLEAU_USER_NAME
+		self.password = password if password != None else TABLEAU_PASSWORD
+		self._site_id = site_id
+		self._auth_token = auth_token
+		self._user_id = user_id
+		self._sign_in_lock = threading.Lock() # Threads sharing the site sign in one at a time
+
 
 	def __str__(self):
-		return f"Server Address: {self.server_address}. Site ID: {self.site_id}. Site Name: {self.site_name}"
+		return f"Server Address: {self.server_address}. Site ID: {self._site_id}. Site Name: {self.site_name}"
 
 
-	def get_views(self):
+	@property
+	def site_id(self):
+		if self._site_id == None:
+			self.sign_in()
+		return self._site_id
+
+
+	@property
+	def auth_token(self):
+		if self._auth_token == None:
+			self.sign_in()
+		return self._auth_token
+
+
+	@property
+	def user_id(self):
+		if self._user_id == None:
+			self.sign_in()
+		return self._user_id
+
+
+	def sign_in(self, force=False, rejected_auth_token=None):
+		"""
+		Signs in to the site, reusing the cached auth token unless it's expired or force is True.
+		Threads sharing the site sign in one at a time, and a thread that waited reuses the token the previous one got.
+		'force'					(Optional) Boolean to skip the token cache and do a credential sign-in, e.g. after the server rejected the token.
+		'rejected_auth_token'	(Optional) The auth token the server rejected. If the site already holds a different one, another thread
+								has signed in again since, so nothing is done.
+		"""
+
+		cache_key = f'{self.server_address}|{self.site_name}|{self.user_name}'
+
+		with self._sign_in_lock:
+			if rejected_auth_token != None and self._auth_token != None and self._auth_token != rejected_auth_token:
+				common.standard_logger.debug(f'Auth token for site {self.site_name} already renewed by another thread.')
+				return
+
+			if force == False and rejected_auth_token == None and self._auth_token != None and self._site_id != None and self._user_id != None:
+				return # Signed in by another thread while this one waited for the lock
+
+			if force == False:
+				cached_token = _read_auth_token_cache(cache_key)
+				if cached_token != None:
+					common.standard_logger.debug(f'Reusing cached auth token for site {self.site_name}.')
+					self._auth_token = cached_token['token']
+					self._site_id = cached_token['site_id']
+					self._user_id = cached_token['user_id']
+					return
+
+			common.standard_logger.info(f'Signing in to site {self.site_name}...')
+			self._auth_token, self._site_id, self._user_id = sign_in(self.server_address, self.user_name, self.password, self.site_name)
+
+			_write_auth_token_cache(cache_key, {'token': self._auth_token, 'site_id': self._site_id, 'user_id': self._user_id, 'expires_at': time.time() + TABLEAU_AUTH_TOKEN_TTL_MINUTES * 60})
+
+
+	def forget_auth_token(self):
+		"""
+		Drops the in-memory and cached auth token, e.g. after signing out.
+		"""
+
+		_write_auth_token_cache(f'{self.server_address}|{self.site_name}|{self.user_name}', None)
+		self._auth_token = None
+
+
+	def get_views(self, filters=None, sort=None, fields=None, as_table=False):
 		"""
 		Queries all existing views on the current site.
 		'server'            specified server address
 		'site_id'           ID of the site that the user is signed into
+		'filters'			(Optional) Filter expressions evaluated by the server, e.g. ['workbookName:eq:3PN Seller Invoice']. See _add_query_string.
+		'sort'				(Optional) Sort expressions, e.g. ['name:asc']
+		'fields'			(Optional) Fields to return, e.g. ['id', 'name', 'workbook.id']
+		'as_table'			(Optional) Boolean to return a columnar ContentTable instead of a list of objects. Use for full-site snapshots.
 		"""
 
-		url = site.server_address + f"/api/{TABLEAU_API_VERSION}/sites/{site.site_id}/views?pageSize=1000"
-		server_response = requests.get(url, headers={'x-tableau-auth': auth_token})
-		_check_status(server_response, 200)
-		server_response = ET.fromstring(_encode_for_display(server_response.text))
-
-		view_tree = server_response.findall('.//t:view', namespaces=xmlns)
-
-		views_list = []
-		counter = 0
+		if as_table == True:
+			return ContentTable.from_objects(View, self.iter_views(filters, sort, fields))
 
-		for view_element in view_tree:
-			workbooks = view_element.findall('.//t:workbook', namespaces=xmlns)
-			workbook_id = workbooks[0].get('id')
-			view = View(view_element, workbook_id)
-			counter += 1
-			if counter == 1:
-				Workbook.find(view)
-			views_list.append(view)
+		views_list = list(self.iter_views(filters, sort, fields))
 
 		if len(views_list) == 0:
 			common.standard_logger.info('No views returned')
@@ -100,42 +539,53 @@ class Site:
 			return views_list
 
 
-	def get_projects(self):
+	def iter_views(self, filters=None, sort=None, fields=None):
 		"""
-		Queries all existing projects on the current site.
+		Yields every view on the site, page by page, while the following pages are fetched in the background.
+		'filters', 'sort', 'fields'		(Optional) See get_views.
 		"""
 
-		url = f"{self.server_address}/api/{TABLEAU_API_VERSION}/sites/{self.site_id}/projects?pageSize=1000&fields=_all_"
+		url = _add_query_string(f"{self.server_address}/api/{TABLEAU_API_VERSION}/sites/{self.site_id}/views", filters, sort, fields)
+
+		for view_element in _iter_pages(self, url, 'view'):
+			yield View.from_element(view_element)
 
-		server_response = requests.get(url, headers={'x-tableau-auth': auth_token})
-		_check_status(server_response, 200)
-		server_response = ET.fromstring(_encode_for_display(server_response.text))
-		
-		# Find all projects
-		project_elements = server_response.findall('.//t:project', namespaces=xmlns)
 
-		projects_list = []
+	def get_projects(self, filters=None, sort=None, fields=None, as_table=False):
+		"""
+		Queries all existing projects on the current site.
+		'filters'			(Optional) Filter expressions evaluated by the server, e.g. ['name:eq:Finance', 'parentProjectId:eq:<id>']. See _add_query_string.
+		'sort'				(Optional) Sort expressions, e.g. ['name:asc']
+		'fields'			(Optional) Fields to return. Default is '_all_', which includes the owner and content counts.
+		'as_table'			(Optional) Boolean to return a columnar ContentTable instead of a list of objects. Use for full-site snapshots.
+		"""
 
-		for project_element in project_elements:
-			content_counts_element = project_element.findall('.//t:contentsCounts', namespaces=xmlns)[0]
-			
-			project_count = content_counts_element.get('projectCount')
-			workbook_count = content_counts_element.get('workbookCount')
-			view_count = content_counts_element.get('viewCount')
-			datasource_count = content_counts_element.get('datasourceCount')
+		if as_table == True:
+			return ContentTable.from_objects(Project, self.iter_projects(filters, sort, fields))
 
-			owner_element = project_element.findall('.//t:owner', namespaces=xmlns)[0]
-			owner_email_address = owner_element.get('email')
+		return list(self.iter_projects(filters, sort, fields))
 
-			project = Project(project_element, owner_email_address, project_count, workbook_count, view_count, datasource_count)
-			common.standard_logger.debug(f'Project: {project}')
 
-			projects_list.append(project)
+	def iter_projects(self, filters=None, sort=None, fields=None):
+		"""
+		Yields every project on the site, page by page, while the following pages are fetched in the background.
+		'filters', 'sort', 'fields'		(Optional) See get_projects.
+		"""
+
+		if fields == None:
+			fields = '_all_'
+
+		url = _add_query_string(f"{self.server_address}/api/{TABLEAU_API_VERSION}/sites/{self.site_id}/projects", filters, sort, fields)
 
-		return projects_list
+		for project_element in _iter_pages(self, url, 'project'):
+			project = Project.from_element(project_element)
+			common.standard_logger.debug(f'Project: {project}')
+			yield project
 
 
 class Project:
+	__slots__ = ('id', 'name', 'owner_email_address', 'content_permissions', 'description', 'is_top_level_project', 'parent_project_id', 'controlling_permissions_project_id', 'num_views', 'num_workbooks', 'num_projects', 'num_datasources', 'created_at', 'updated_at')
+
 	def __init__(self, project_element, owner_email_address, num_projects, num_workbooks, num_views, num_datasources):
 		self.id = project_element.get('id')
 		self.name = project_element.get('name')
@@ -157,77 +607,107 @@ class Project:
 		return f"Name: {self.name}. ID: {self.id}. Owner: {self.owner_email_address}. Content permissions: {self.content_permissions}. Num projects: {self.num_projects}. Num workbooks: {self.num_workbooks}. Num datasources: {self.num_datasources}. Num views: {self.num_views}. Is top-level project: {self.is_top_level_project}. Description: {self.description}. Created at: {self.created_at}. Updated at: {self.updated_at}."
 
 
-	def add_group_permissions(self, site, group_id, project_permission_capabilities, permission_mode):
+	@classmethod
+	def from_element(self, project_element):
+		"""
+		Builds a project from a <project> element of a projects listing queried with fields=_all_.
+		"""
+
+		content_counts_element = project_element.find('.//t:contentsCounts', namespaces=xmlns)
+		owner_element = project_element.find('.//t:owner', namespaces=xmlns)
+
+		project_count = content_counts_element.get('projectCount') if content_counts_element is not None else None
+		workbook_count = content_counts_element.get('workbookCount') if content_counts_element is not None else None
+		view_count = content_counts_element.get('viewCount') if content_counts_element is not None else None
+		datasource_count = content_counts_element.get('datasourceCount') if content_counts_element is not None else None
+		owner_email_address = owner_element.get('email') if owner_element is not None else None
+
+		return Project(project_element, owner_email_address, project_count, workbook_count, view_count, datasource_count)
+
+
+	@classmethod
+	def find(self, site, filters=None, sort=None, fields=None, as_table=False):
+		"""
+		Queries existing projects on the site. Same as site.get_projects.
+		'site'										Site object of the site signed into.
+		'filters', 'sort', 'fields', 'as_table'		(Optional) See Site.get_projects.
+		"""
+
+		return site.get_projects(filters, sort, fields, as_table)
+
+
+	@classmethod
+	def iter_find(self, site, filters=None, sort=None, fields=None):
+		"""
+		Yields existing projects on the site, page by page. Same as site.iter_projects.
+		"""
+
+		return site.iter_projects(filters, sort, fields)
+
+
+	def add_group_permissions(self, site, group_id, project_permission_capabilities, permission_mode, user_ids=None):
 		"""
-		Adds permissions for one project.
+		Adds permissions for one project, for any number of groups and users in one request.
 		'site'                    				Site object
-		'group_id'                  			ID of the group for whom to add the permission
+		'group_id'                  			ID of the group for whom to add the permission, or a list of group IDs
 		'project_permission_capabilities'   	List of permissions to add to a project. Available options: 'ProjectLeader' (available for "Allow" only), 'Read', 'Write'
 		'permission_mode'           			Mode to set for the permissions_capabilities (available options: Allow or Deny)
+		'user_ids'								(Optional) List of IDs of users who also get the permissions
 		"""
 
 		common.standard_logger.info(f'Adding Project Permissions to project {self.name}...')
 
 		url = f"{site.server_address}/api/{TABLEAU_API_VERSION}/sites/{site.site_id}/projects/{self.id}/permissions"
 
-		xml_request = ET.Element('tsRequest')
-		permissions_element = ET.SubElement(xml_request, 'permissions')
-		project_element = ET.SubElement(permissions_element, 'project', id=self.id)
-		grantee_capabilities_element = ET.SubElement(permissions_element, 'granteeCapabilities')
-		group_element = ET.SubElement(grantee_capabilities_element, 'group', id=group_id)
-		capabilities_element = ET.SubElement(grantee_capabilities_element, 'capabilities')
-
-		for project_permission_capability in project_permission_capabilities:
-			capability_element = ET.SubElement(capabilities_element, 'capability', name=project_permission_capability, mode=permission_mode)
-
-		xml_request = ET.tostring(xml_request)
+		xml_request = _get_permissions_request('project', self.id, group_id, user_ids, project_permission_capabilities, permission_mode)
 		# common.standard_logger.info(xml_request)
 
-		server_response = requests.put(url, data=xml_request, headers={'x-tableau-auth': auth_token})
+		server_response = client.put(url, data=xml_request, site=site)
 		_check_status(server_response, 200)
 
 		common.standard_logger.info(f'Added Project Permissions to project {self.name}.')
 
 
-	def add_default_group_permissions(self, site, group_id, project_default_permissions):
+	def add_default_group_permissions(self, site, group_id, project_default_permissions, user_ids=None):
 		"""
-		Adds default (cascading to future objects) permissions for one project.
+		Adds default (cascading to future objects) permissions for one project. Each object type is one request covering every group
+		and user, and the object types' requests are sent concurrently.
 		'site'                    								Site object
-		'group_id'                  							ID of the group for whom to add the permission
+		'group_id'                  							ID of the group for whom to add the permission, or a list of group IDs
 		'default_project_workbook_permission_capabilities'   	List of default workbook permissions to add to a project. Available options: 'AddComment', 'ChangeHierarchy', 'ChangePermissions', 'Delete', 'ExportData', 'ExportImage', 'ExportXml', 'Filter', 'Read', 'ShareView', 'ViewComments', 'ViewUnderlyingData', 'WebAuthoring', 'Write'
 		'default_project_datasource_permission_capabilities'   	List of default datasource permissions to add to a project. Available options: 'ChangePermissions', 'Connect', 'Delete', 'ExportXml', 'Read', 'Write
 		'permission_mode'           							Mode to set for the permissions_capabilities (available options: Allow or Deny)
 		'object_types'											List of object types to apply the permissions to. Avialable options: 'datasources', 'flows', 'workbooks'
 		'project_default_permissions'							List of permissions objects with the following properties: object_type (string ('datasource', 'flow', or 'workbook')), permission_capabilities (list), permission_capability_mode (string ('Approve' or 'Deny')).
+		'user_ids'												(Optional) List of IDs of users who also get the permissions
 		"""
 
 		common.standard_logger.info(f'Adding default Project Permissions to project {self.name}...')
 
 		base_url = f"{site.server_address}/api/{TABLEAU_API_VERSION}/sites/{site.site_id}/projects/{self.id}/default-permissions"
 
-		for project_default_permission in project_default_permissions:
+		def add_object_type_permissions(project_default_permission):
 			url = base_url + f"/{project_default_permission['object_type']}s"
 
-			xml_request = ET.Element('tsRequest')
-			permissions_element = ET.SubElement(xml_request, 'permissions')
-			project_element = ET.SubElement(permissions_element, 'project', id=self.id)
-			grantee_capabilities_element = ET.SubElement(permissions_element, 'granteeCapabilities')
-			group_element = ET.SubElement(grantee_capabilities_element, 'group', id=group_id)
-			capabilities_element = ET.SubElement(grantee_capabilities_element, 'capabilities')
-
-			for project_default_permission_capability in project_default_permission['permission_capabilities']:
-				capability_element = ET.SubElement(capabilities_element, 'capability', name=project_default_permission_capability, mode=project_default_permission['permission_capability_mode'])
-
-			xml_request = ET.tostring(xml_request)
+			xml_request = _get_permissions_request('project', self.id, group_id, user_ids, project_default_permission['permission_capabilities'], project_default_permission['permission_capability_mode'])
 			# common.standard_logger.info(xml_request)
 
-			server_response = requests.put(url, data=xml_request, headers={'x-tableau-auth': auth_token})
+			server_response = client.put(url, data=xml_request, site=site)
 			_check_status(server_response, 200)
 
 			common.standard_logger.info(f"Added default Project Permissions to project {self.name} for object_type {project_default_permission['object_type']}.")
 
+		if len(project_default_permissions) == 0:
+			return
+
+		with ThreadPoolExecutor(max_workers=len(project_default_permissions)) as executor:
+			# list() re-raises the first failed request's ApiCallError
+			list(executor.map(add_object_type_permissions, project_default_permissions))
+
 
 class Workbook:
+	__slots__ = ('name', 'webpage_url', 'id', 'show_tabs', 'project_id', 'owner', 'num_views', 'created_at', 'updated_at')
+
 	def __init__(self, workbook_element, project_id, owner_email_address, num_views):
 		self.name = workbook_element.get('name')
 		self.webpage_url = workbook_element.get('webpageUrl')
@@ -244,36 +724,45 @@ class Workbook:
 		return f"Name: {self.name}. ID: {self.id}. URL: {self.webpage_url}. Project ID: {self.project_id}. Owner: {self.owner}. Show Tabs: {self.show_tabs}. Created At: {self.created_at}. Updated At: {self.updated_at}."
 
 
-	def add_group_permissions(self, site, group_id, workbook_permission_capabilities, permission_mode, view_permission_capabilities=None, cascade_to_views=False):
+	@classmethod
+	def from_element(self, workbook_element):
+		"""
+		Builds a workbook from a <workbook> element and its <project>, <owner> and <view> children.
+		"""
+
+		project_element = workbook_element.find('.//t:project', namespaces=xmlns)
+		owner_element = workbook_element.find('.//t:owner', namespaces=xmlns)
+		view_elements = workbook_element.findall('.//t:view', namespaces=xmlns)
+
+		num_views = len(view_elements)
+		owner_email_address = owner_element.get('name') if owner_element is not None else None
+		project_id = project_element.get('id') if project_element is not None else None
+
+		return Workbook(workbook_element, project_id, owner_email_address, num_views)
+
+
+	def add_group_permissions(self, site, group_id, workbook_permission_capabilities, permission_mode, view_permission_capabilities=None, cascade_to_views=False, user_ids=None):
 		"""
-		Adds permissions for one workbook for one group.
+		Adds permissions for one workbook, for any number of groups and users in one request.
 		'site'                    				Site object
-		'group_id'                  			ID of the group for whom to add the permission
+		'group_id'                  			ID of the group for whom to add the permission, or a list of group IDs
 		'workbook_permission_capabilities'   	List of permissions to add. Available options: 'AddComment', 'ChangeHierarchy', 'ChangePermissions', 'Delete', 'ExportData', 'ExportImage', 'ExportXml', 'Filter', 'Read', 'ShareView', 'ViewComments', 'ViewUnderlyingData', 'WebAuthoring', 'Write'
 		'view_permission_capabilities'			List of permissions to add to a view if cascade_to_views is True. Available options: 'AddComment', 'ChangeHierarchy', 'ChangePermissions', 'Delete', 'ExportData', 'ExportImage', 'Filter', 'Read', 'ShareView', 'ViewComments', 'ViewUnderlyingData', 'WebAuthoring'
 		'permission_mode'           			Mode to set for the permissions_capabilities (available options: Allow or Deny)
 		'cascade_to_views'						Boolean to control if permissions are also cascaded to workbook's views
+		'user_ids'								(Optional) List of IDs of users who also get the permissions
 		"""
 
 		common.standard_logger.info(f'Adding Workbook Permissions to workbook {self.name}...')
 
 		url = f"{site.server_address}/api/{TABLEAU_API_VERSION}/sites/{site.site_id}/workbooks/{self.id}/permissions"
 
-		xml_request = ET.Element('tsRequest')
-		permissions_element = ET.SubElement(xml_request, 'permissions')
-		workbook_element = ET.SubElement(permissions_element, 'workbook', id=self.id)
-		grantee_capabilities_element = ET.SubElement(permissions_element, 'granteeCapabilities')
-		group_element = ET.SubElement(grantee_capabilities_element, 'group', id=group_id)
-		capabilities_element = ET.SubElement(grantee_capabilities_element, 'capabilities')
-
-		for workbook_permission_capability in workbook_permission_capabilities:
-			capability_element = ET.SubElement(capabilities_element, 'capability', name=workbook_permission_capability, mode=permission_mode)
-
-		xml_request = ET.tostring(xml_request)
+		xml_request = _get_permissions_request('workbook', self.id, group_id, user_ids, workbook_permission_capabilities, permission_mode)
 		# common.standard_logger.info(xml_request)
 
-		server_response = requests.put(url, data=xml_request, headers={'x-tableau-auth': auth_token})
+		server_response = client.put(url, data=xml_request, site=site)
 		_check_status(server_response, 200)
+		invalidate_content(site, 'Workbook', self.id)
 
 		common.standard_logger.info(f'Added Workbook Permissions to workbook {self.name}.')
 
@@ -282,16 +771,16 @@ class Workbook:
 
 			for view in views:
 				# common.standard_logger.info(f'view: {view}')
-				view.add_group_permissions(view, group_id, view_permission_capabilities, permission_mode)	
+				view.add_group_permissions(view, group_id, view_permission_capabilities, permission_mode, workbook=self, site=site, user_ids=user_ids)
 
 
 	def get_connections(self, site):
 		common.standard_logger.debug('Getting workbook connections...')
 
 		url = f"{site.server_address}/api/{TABLEAU_API_VERSION}/sites/{site.site_id}/workbooks/{self.id}/connections"
-		server_response = requests.get(url, headers={'x-tableau-auth': auth_token})
+		server_response = client.get(url, site=site)
 		_check_status(server_response, 200)
-		server_response = ET.fromstring(_encode_for_display(server_response.text))
+		server_response = ET.fromstring(server_response.content)
 
 		common.standard_logger.debug('Finished querying for connections.')
 
@@ -304,15 +793,7 @@ class Workbook:
 		num_data_source_connections = 0
 
 		for connection in workbook_connections:
-			data_source_connection = {}
-
-			data_source_connection['connection_id'] = connection.get('id')
-			data_source_connection['server_address'] = connection.get('serverAddress')
-			data_source_connection['connection_type'] = connection.get('type')
-			data_source_connection['server_port'] = connection.get('serverPort')
-			data_source_connection['user_name'] = connection.get('userName')
-
-			data_source_connections.append(data_source_connection)
+			data_source_connections.append(_connection_from_element(connection))
 
 		num_data_source_connections = len(data_source_connections)
 
@@ -326,29 +807,29 @@ class Workbook:
 		# 	raise LookupError(error)
 
 
-	def get_views(self, site):
+	def get_views(self, site, with_usage=False, fields=None):
 		"""
-		Queries all existing views on the current site.
+		Queries all existing views of the workbook. Views are built straight from the listing, with no extra call per view.
 		'site'           site that the user is signed into
+		'with_usage'	 (Optional) Boolean to also get each view's total view count (View.total_view_count).
+		'fields'		 (Optional) Fields to return, e.g. ['id', 'name', 'contentUrl']
 		"""
 
 		url = f"{site.server_address}/api/{TABLEAU_API_VERSION}/sites/{site.site_id}/workbooks/{self.id}/views"
+		if with_usage == True:
+			url += '?includeUsageStatistics=true'
+		url = _add_query_string(url, fields=fields)
 
-		# common.standard_logger.info(f'url: {url}')
-
-		server_response = requests.get(url, headers={'x-tableau-auth': auth_token})
-		# common.standard_logger.info(f'_check_status: {_check_status}')
+		server_response = client.get(url, site=site)
 		_check_status(server_response, 200)
-		# common.standard_logger.info(f'server_response: {server_response}')
-		server_response = ET.fromstring(_encode_for_display(server_response.text))
+		server_response = ET.fromstring(server_response.content)
 
 		view_tree = server_response.findall('.//t:view', namespaces=xmlns)
 
 		views_list = []
 
 		for view_element in view_tree:
-			view_id = view_element.get('id')
-			view = View.get(site, view_id)
+			view = View.from_element(view_element, self.id)
 			views_list.append(view)
 
 		if len(views_list) == 0:
@@ -358,14 +839,17 @@ class Workbook:
 
 
 	@classmethod
-	def get(self, site, workbook_id):
+	@_cached_get
+	def get(self, site, workbook_id, *, refresh=False):
 		"""
-		Finds an existing workbook by ID
+		Finds an existing workbook by ID. A workbook fetched or listed on this site within its get_cache TTL is
+		returned from get_cache without calling the server.
 		'server'            specified server address
 		'auth_token'        authentication token that grants user access to API calls
 		'user_id'           ID of user with access to workbooks
 		'site_id'           ID of the site that the user is signed into
 		'workbook_id'       (Optional) ID of workbook
+		'refresh'			(Optional) Boolean to query the server even if the workbook is in get_cache.
 		Returns a workbook object.
 		"""
 
@@ -373,96 +857,94 @@ class Workbook:
 
 		# common.standard_logger.info(f'url: {url}')
 		
-		server_response = requests.get(url, headers={'x-tableau-auth': auth_token})
+		server_response = client.get(url, site=site)
 		_check_status(server_response, 200)
-		server_response = ET.fromstring(_encode_for_display(server_response.text))
+		server_response = ET.fromstring(server_response.content)
 
 		workbook_element = server_response.findall('.//t:workbook', namespaces=xmlns)[0]
-		project_element = server_response.findall('.//t:project', namespaces=xmlns)[0]
-		owner_element = server_response.findall('.//t:owner', namespaces=xmlns)[0]
-		view_elements = server_response.findall('.//t:view', namespaces=xmlns)
-
-		num_views = len(view_elements)
-		owner_email_address = owner_element.get('name')
-		project_id = project_element.get('id')
-
-		workbook = Workbook(workbook_element, project_id, owner_email_address, num_views)
-
-		# common.standard_logger.info(f'self: {self}')
-
-		# common.standard_logger.info(f'workbook: {workbook}')
 
-		return workbook
+		return Workbook.from_element(workbook_element)
 
 
 	@classmethod
-	def find(self, entity = None):
+	def find(self, entity = None, filters=None, sort=None, fields=None, as_table=False):
 		"""
 		Queries all existing workbooks for the given entity type
 		'server'            specified server address
 		'site_id'           ID of the site that the user is signed into
 		entity       		Site object, View object, or User object
-		Returns tuples for each workbook, containing its id and name.
+		'filters'			(Optional) Filter expressions evaluated by the server, e.g. ['projectName:eq:Finance', 'updatedAt:gt:2021-06-01T00:00:00Z']. See _add_query_string.
+		'sort'				(Optional) Sort expressions, e.g. ['updatedAt:desc']
+		'fields'			(Optional) Fields to return, e.g. ['id', 'name', 'project.id']. Not supported for a User entity.
+		'as_table'			(Optional) Boolean to return a columnar ContentTable instead of a list of objects. Use for full-site snapshots.
+		Returns a list of Workbook objects.
 		"""
 
-		base_url = f"{site.server_address}/api/{TABLEAU_API_VERSION}/sites/{site.site_id}/"
-
 		common.standard_logger.debug(f'self: {self}')
 
+		if isinstance(entity, View):
+			common.standard_logger.debug('it is a View')
+			return [Workbook.get(site, entity.parent_workbook_id)]
+
+		if as_table == True:
+			return ContentTable.from_objects(Workbook, Workbook.iter_find(entity, filters, sort, fields))
+
+		return list(Workbook.iter_find(entity, filters, sort, fields))
+
+
+	@classmethod
+	def iter_find(self, entity = None, filters=None, sort=None, fields=None):
+		"""
+		Yields all existing workbooks of a Site or User, page by page, while the following pages are fetched in the background.
+		entity       					Site object or User object
+		'filters', 'sort', 'fields'		(Optional) See find.
+		"""
+
 		if isinstance(entity, Site):
 			common.standard_logger.debug('it is a Site')
-			url = base_url + 'workbooks?pageSize=1000'
-		elif isinstance(entity, View):
-			common.standard_logger.debug('it is a View')
-			parent_workbook_id = entity.parent_workbook_id
-			url = base_url + f'workbooks/{parent_workbook_id}'
+			url = f"{entity.server_address}/api/{TABLEAU_API_VERSION}/sites/{entity.site_id}/workbooks"
+			workbooks_site = entity
 		elif isinstance(entity, User):
 			common.standard_logger.debug('it is a User')
-			user_id = entity.id
-			url = base_url + f'users/{user_id}//workbooks?pageSize=1000' # two // intentional?
+			url = f"{site.server_address}/api/{TABLEAU_API_VERSION}/sites/{site.site_id}/users/{entity.user_id}/workbooks"
+			workbooks_site = site
 		else:
 			raise Exception('Bad entity type!')
 
+		url = _add_query_string(url, filters, sort, fields)
 		common.standard_logger.debug(f'Workbook.find url: {url}')
-		
-		server_response = requests.get(url, headers={'x-tableau-auth': auth_token})
-		_check_status(server_response, 200)
-		server_response = ET.fromstring(_encode_for_display(server_response.text))
-
-		# Find all workbook ids
-		workbook_elements = server_response.findall('.//t:workbook', namespaces=xmlns)
-		# common.standard_logger.info('workbook_elements: {}'.format(workbook_elements))
-
-		# Tuples to store each workbook information:(workbook_id, workbook_name)
-		# workbooks = [workbook.get('id') for workbook in workbook_elements]
 
-		workbooks_list = []
-
-		for workbook_element in workbook_elements:
-			project_element = workbook_element.findall('.//t:project', namespaces=xmlns)[0]
-			owner_element = workbook_element.findall('.//t:owner', namespaces=xmlns)[0]
-			view_elements = workbook_element.findall('.//t:view', namespaces=xmlns)
-
-			num_views = len(view_elements)
-			owner_email_address = owner_element.get('name')
-			project_id = project_element.get('id')
-
-			workbook = Workbook(workbook_element, project_id, owner_email_address, num_views)
-			# common.standard_logger.info('Workbook: {}'.format(workbook))
-
-			workbooks_list.append(workbook)
-
-		return workbooks_list
+		for workbook_element in _iter_pages(workbooks_site, url, 'workbook'):
+			workbook = Workbook.from_element(workbook_element)
+			if fields == None: # Only complete workbooks go in get_cache, with the same TTL and size bound as fetched ones
+				get_cache.set((workbooks_site.site_id, 'Workbook', workbook.id), workbook)
+			yield workbook
 
 
 class View:
+	__slots__ = ('name', 'id', 'url', 'parent_workbook_id', 'project_id', 'created_at', 'updated_at', 'total_view_count')
+
 	def __init__(self, view_element, parent_workbook_id):
 		self.name = view_element.get('name')
 		self.id = view_element.get('id')
 		self.url = view_element.get('contentUrl')
 		self.parent_workbook_id = parent_workbook_id
-		self.server = site.server_address
-		self.site_id = site.site_id
+		project_element = view_element.find('t:project', namespaces=xmlns)
+		self.project_id = project_element.get('id') if project_element is not None else None
+		self.created_at = view_element.get('createdAt')
+		self.updated_at = view_element.get('updatedAt')
+		usage_element = view_element.find('t:usage', namespaces=xmlns)
+		self.total_view_count = usage_element.get('totalViewCount') if usage_element is not None else None
+
+
+	@property
+	def server(self):
+		return site.server_address
+
+
+	@property
+	def site_id(self):
+		return site.site_id
 
 
 	def __str__(self):
@@ -470,21 +952,36 @@ class View:
 
 
 	@classmethod
-	def get(self, site, view_id):
+	def from_element(self, view_element, parent_workbook_id=None):
 		"""
-		Finds an existing view by ID
-		'site'				Site object of the site signed into.
-		'view_id'       	ID of view
-		Returns a view object.
+		Builds a view from a <view> element. The parent workbook ID is read from its <workbook> child unless given.
 		"""
 
-		url = f"{site.server_address}/api/{TABLEAU_API_VERSION}/sites/{site.site_id}/views/{view_id}"
+		if parent_workbook_id == None:
+			workbook_element = view_element.find('.//t:workbook', namespaces=xmlns)
+			parent_workbook_id = workbook_element.get('id') if workbook_element is not None else None
 
-		# common.standard_logger.info(f'url: {url}')
+		return View(view_element, parent_workbook_id)
+
+
+	@classmethod
+	@_cached_get
+	def get(self, site, view_id, *, refresh=False):
+		"""
+		Finds an existing view by ID
+		'site'				Site object of the site signed into.
+		'view_id'       	ID of view
+		'refresh'			(Optional) Boolean to query the server even if the view is in get_cache.
+		Returns a view object.
+		"""
+
+		url = f"{site.server_address}/api/{TABLEAU_API_VERSION}/sites/{site.site_id}/views/{view_id}"
+
+		# common.standard_logger.info(f'url: {url}')
 		
-		server_response = requests.get(url, headers={'x-tableau-auth': auth_token})
+		server_response = client.get(url, site=site)
 		_check_status(server_response, 200)
-		server_response = ET.fromstring(_encode_for_display(server_response.text))
+		server_response = ET.fromstring(server_response.content)
 
 		# Find all workbook ids
 		view_element = server_response.findall('.//t:view', namespaces=xmlns)[0]
@@ -495,73 +992,70 @@ class View:
 
 		# common.standard_logger.info(f'workbook: {workbook}')
 
-		workbook_element = view_element.findall('.//t:workbook', namespaces=xmlns)
-		workbook_id = workbook_element[0].get('id')
-		view = View(view_element, workbook_id)
+		view = View.from_element(view_element)
 
 		return view
 
 
-	def add_group_permissions(self, view, group_id, view_permission_capabilities, permission_mode):
+	def add_group_permissions(self, view, group_id, view_permission_capabilities, permission_mode, workbook=None, site=None, user_ids=None, workbooks=None):
 		"""
-		Adds permissions for one view for one group.
+		Adds permissions for one view, for any number of groups and users in one request.
 		'view'                   		View object to receive the permissions
-		'group_id'                  	ID of the group for whom to add the permission
+		'group_id'                  	ID of the group for whom to add the permission, or a list of group IDs
 		'view_permission_capabilities'  List of permissions to add to a view. Available options: 'AddComment', 'ChangeHierarchy', 'ChangePermissions', 'Delete', 'ExportData', 'ExportImage', 'Filter', 'Read', 'ShareView', 'ViewComments', 'ViewUnderlyingData', 'WebAuthoring'
 		'permission_mode'           	Mode to set for the permissions_capabilities (available options: Allow or Deny)
+		'workbook'						(Optional) The view's parent Workbook object, if the caller already has it. Otherwise it's looked up with Workbook.get.
+		'site'							(Optional) Site object. Default is the module's site.
+		'user_ids'						(Optional) List of IDs of users who also get the permissions
+		'workbooks'						(Optional) Dict of workbook ID -> Workbook shared by every call of one run. The parent workbook is looked up
+										there before Workbook.get, and added once fetched, so each parent is fetched at most once per run,
+										however long the run or however many workbooks get_cache holds.
 		"""
 
-		workbook = Workbook.get(site, view.parent_workbook_id)
+		if site == None:
+			site = globals()['site']
+
+		if workbook == None and workbooks != None:
+			workbook = workbooks.get(view.parent_workbook_id)
+
+		if workbook == None:
+			workbook = Workbook.get(site, view.parent_workbook_id)
+			if workbooks != None:
+				workbooks[view.parent_workbook_id] = workbook
 
 		if workbook.show_tabs == 'false':
 			url = f"{site.server_address}/api/{TABLEAU_API_VERSION}/sites/{site.site_id}/views/{view.id}/permissions"
-			xml_request = ET.Element('tsRequest')
-			permissions_element = ET.SubElement(xml_request, 'permissions')
-			view_element = ET.SubElement(permissions_element, 'view', id=view.id)
-			grantee_capabilities_element = ET.SubElement(permissions_element, 'granteeCapabilities')
-			group_element = ET.SubElement(grantee_capabilities_element, 'group', id=group_id)
-			capabilities_element = ET.SubElement(grantee_capabilities_element, 'capabilities')
-			for view_permission_capability in view_permission_capabilities:
-				capability_element = ET.SubElement(capabilities_element, 'capability', name=view_permission_capability, mode=permission_mode)
-
-			xml_request = ET.tostring(xml_request)
+			xml_request = _get_permissions_request('view', view.id, group_id, user_ids, view_permission_capabilities, permission_mode)
 			common.standard_logger.debug(f"view.add_group_permissions.xml_request: {xml_request}")
 
 			common.standard_logger.info('Adding View Permissions to view {}...'.format(view.name))
 
 			try:
-				server_response = requests.put(url, data=xml_request, headers={'x-tableau-auth': auth_token})
+				server_response = client.put(url, data=xml_request, site=site)
 				_check_status(server_response, 200)
+				invalidate_content(site, 'View', view.id)
 				common.standard_logger.info(f'Added View Permissions to view {self.name}.')
 			except ApiCallError as error:
-					common.standard_logger.error('error: {}', error)
+				common.standard_logger.error(f'Failed to add View Permissions to view {view.name}. {error}')
+				raise
 		
 		else:
 			common.standard_logger.info(f'View permissions not added because they are locked to Workbook (workbook.show_tabs = false) for workbook {workbook}.')
 
 		
 	@classmethod
-	def find(self, site):
+	def find(self, site, filters=None, sort=None, fields=None, as_table=False):
 		"""
 		Queries all existing views on the current site.
 		'server'            specified server address
 		'site'           	site that the user is signed into
+		'filters', 'sort', 'fields', 'as_table'		(Optional) See Site.get_views.
 		"""
 
-		url = f"{site.server_address}/api/{TABLEAU_API_VERSION}/sites/{site.site_id}/views?pageSize=1000"
-		server_response = requests.get(url, headers={'x-tableau-auth': auth_token})
-		_check_status(server_response, 200)
-		server_response = ET.fromstring(_encode_for_display(server_response.text))
-
-		view_tree = server_response.findall('.//t:view', namespaces=xmlns)
+		if as_table == True:
+			return site.get_views(filters, sort, fields, as_table)
 
-		views_list = []
-
-		for view_element in view_tree:
-			workbooks = view_element.findall('.//t:workbook', namespaces=xmlns)
-			workbook_id = workbooks[0].get('id')
-			view = View(view_element, workbook_id)
-			views_list.append(view)
+		views_list = list(View.iter_find(site, filters, sort, fields))
 
 		if len(views_list) == 0:
 			common.standard_logger.info('No views returned')
@@ -569,6 +1063,17 @@ class View:
 			return views_list
 
 
+	@classmethod
+	def iter_find(self, site, filters=None, sort=None, fields=None):
+		"""
+		Yields all existing views on the site, page by page, while the following pages are fetched in the background.
+		'site'           	site that the user is signed into
+		'filters', 'sort', 'fields'		(Optional) See Site.get_views.
+		"""
+
+		return site.iter_views(filters, sort, fields)
+
+
 	def get_pdf(self, filters=None):
 		"""
 		filters is a list of key:value filters
@@ -580,29 +1085,12 @@ class View:
 
 		common.standard_logger.debug(f'url: {url}')
 
-		num_filters = len(filters)
-		counter = 0
-		
 		if filters != None:
-			url += '?'
-			for filter in filters:
-				if filter['filter_name'] == 'Brand':
-					brand =  filter['filter_value']
-				elif filter['filter_name'] == 'Seller':
-					seller =  filter['filter_value']
-				
-				url_appendage = 'vf_' + urllib.parse.quote_plus(filter['filter_name']) + '=' + urllib.parse.quote_plus(filter['filter_value']) # URL encode filter names and values
-				common.standard_logger.debug(f'url_appendage: {url_appendage}')
-				
-				counter += 1
-				if counter < num_filters:
-					url_appendage += '&'
-				
-				url += url_appendage
+			url += '?' + _get_view_filters_query_string(filters)
 		
 		common.standard_logger.debug(f'url: {url}')
 		
-		server_response = requests.get(url, headers={'x-tableau-auth': auth_token})
+		server_response = client.get(url, site=site)
 		_check_status(server_response, 200)
 
 		pdf = server_response.content
@@ -611,30 +1099,56 @@ class View:
 
 
 class Datasource:
+	__slots__ = ('name', 'id', 'url', 'project_id', 'num_connected_workbooks', 'type', 'created_at', 'updated_at', 'size')
 
 	def __init__(self, datasource_element):
 		self.name = datasource_element.get('name')
 		self.id = datasource_element.get('id')
 		self.url = datasource_element.get('contentUrl')
+		project_element = datasource_element.find('t:project', namespaces=xmlns)
+		self.project_id = project_element.get('id') if project_element is not None else None
 		self.num_connected_workbooks = datasource_element.get('connected-workbooks-count-number')
-		self.type = datasource_element.get('datasource-type')
-		self.created_at = datasource_element.get('datetime-created')
-		self.updated_at = datasource_element.get('datetime-updated')
-		self.size = datasource_element.get('data-source-size-number')
-		self.server = site.server_address
-		self.site_id = site.site_id
+		self.type = datasource_element.get('type')
+		self.created_at = datasource_element.get('createdAt')
+		self.updated_at = datasource_element.get('updatedAt')
+		self.size = datasource_element.get('size')
+
+
+	@property
+	def server(self):
+		return site.server_address
+
+
+	@property
+	def site_id(self):
+		return site.site_id
 
 
 	def __str__(self):
 		return f"Name: {self.name}. ID: {self.id}. URL: {self.url}"
 
 
+	def get_connections(self, site):
+		"""
+		Queries the connections of the datasource. Returns a list of dicts like Workbook.get_connections.
+		"""
+
+		url = f"{site.server_address}/api/{TABLEAU_API_VERSION}/sites/{site.site_id}/datasources/{self.id}/connections"
+		server_response = client.get(url, site=site)
+		_check_status(server_response, 200)
+		server_response = ET.fromstring(server_response.content)
+
+		return [_connection_from_element(connection_element) for connection_element in server_response.findall('.//t:connection', namespaces=xmlns)]
+
+
 	@classmethod
-	def get(self, site, datasource_id):
+	@_cached_get
+	def get(self, site, datasource_id, *, refresh=False):
 		"""
 		Finds an existing datasource by ID
 		'site'					Site object of the site signed into.
 		'datasource_id'       	ID of datasource
+		'refresh'				(Optional) Boolean to query the server even if the datasource is in get_cache.
 		Returns a datasource object.
 		"""
 
@@ -642,9 +1156,9 @@ class Datasource:
 
 		# common.standard_logger.info(f'url: {url}')
 		
-		server_response = requests.get(url, headers={'x-tableau-auth': auth_token})
+		server_response = client.get(url, site=site)
 		_check_status(server_response, 200)
-		server_response = ET.fromstring(_encode_for_display(server_response.text))
+		server_response = ET.fromstring(server_response.content)
 
 		# Find all datasource ids
 		datasource_element = server_response.findall('.//t:datasource', namespaces=xmlns)[0]
@@ -655,59 +1169,108 @@ class Datasource:
 
 
 	@classmethod
-	def find(self, site):
+	def find(self, site, filters=None, sort=None, fields=None, as_table=False):
 		"""
 		Queries all existing datasources on the current site.
 		'site'           	site that the user is signed into
+		'filters'			(Optional) Filter expressions evaluated by the server, e.g. ['name:eq:TS Events']. See _add_query_string.
+		'sort'				(Optional) Sort expressions, e.g. ['name:asc']
+		'fields'			(Optional) Fields to return, e.g. ['id', 'name', 'updatedAt']
+		'as_table'			(Optional) Boolean to return a columnar ContentTable instead of a list of objects. Use for full-site snapshots.
 		"""
 
-		url = f"{site.server_address}/api/{TABLEAU_API_VERSION}/sites/{site.site_id}/datasources?pageSize=1000"
-		server_response = requests.get(url, headers={'x-tableau-auth': auth_token})
-		_check_status(server_response, 200)
-		server_response = ET.fromstring(_encode_for_display(server_response.text))
-
-		datasource_tree = server_response.findall('.//t:datasource', namespaces=xmlns)
+		if as_table == True:
+			return ContentTable.from_objects(Datasource, Datasource.iter_find(site, filters, sort, fields))
 
-		datasources_list = []
-
-		for datasource_element in datasource_tree:
-			datasource = Datasource(datasource_element)
-			datasources_list.append(datasource)
+		datasources_list = list(Datasource.iter_find(site, filters, sort, fields))
 
 		if len(datasources_list) == 0:
 			common.standard_logger.info('No datasources returned')
 		else:
 			return datasources_list
 
-	def download(self, site, output_folder='/', extract_as_hyper=False, hyper_output_file_name=None, delete_zip_file=False):
+
+	@classmethod
+	def iter_find(self, site, filters=None, sort=None, fields=None):
+		"""
+		Yields all existing datasources on the site, page by page, while the following pages are fetched in the background.
+		'site'           	site that the user is signed into
+		'filters', 'sort', 'fields'		(Optional) See find.
 		"""
-		Downloads & saves tdsx zip file.
+
+		url = _add_query_string(f"{site.server_address}/api/{TABLEAU_API_VERSION}/sites/{site.site_id}/datasources", filters, sort, fields)
+
+		for datasource_element in _iter_pages(site, url, 'datasource'):
+			yield Datasource(datasource_element)
+
+	def is_unchanged(self, site):
+		"""
+		Returns True if the datasource has the same updated_at and size as when record_download_state was last called for it,
+		i.e. there's nothing new to download. Get the datasource with Datasource.get(site, datasource_id, refresh=True) first.
+		"""
+
+		download_state = _read_download_state(_get_download_state_key(site, self.id))
+
+		return self.updated_at != None and download_state == {'updated_at': self.updated_at, 'size': self.size}
+
+
+	def record_download_state(self, site):
+		"""
+		Records the datasource's updated_at and size (see TABLEAU_DOWNLOAD_STATE_PATH) so later runs can skip it while it's unchanged.
+		Call it once everything done with the download succeeded, e.g. after loading it into Snowflake.
+		"""
+
+		_write_download_state(_get_download_state_key(site, self.id), {'updated_at': self.updated_at, 'size': self.size})
+
+
+	def download(self, site, output_folder='/', extract_as_hyper=False, hyper_output_file_name=None, delete_zip_file=False, chunk_size=TABLEAU_DOWNLOAD_CHUNK_SIZE, expected_sha256=None, skip_unchanged=False, stream_hyper=False, bandwidth_limiter=None, file_name=None):
+		"""
+		Downloads & saves tdsx zip file. The file is streamed to disk chunk by chunk, so memory use doesn't grow with its size.
+		Interrupted downloads resume where they stopped, and the file is verified before it's extracted. See _download_to_file.
 		'site'           			site that the user is signed into
 		'output_folder'				Full path to destination directory to save datasource. '/' required at end of path.
 		'extract_as_hyper'			(Optional) Boolean option to extract hyper from downloaded zip file.
 		'hyper_output_file_name'	(Optional) Desired datasource file name.
 		'delete_zip_file'			(Optional) Boolean choice whether to delete original zip file or not.
+		'chunk_size'				(Optional) Bytes read from the network and written to disk at a time.
+		'expected_sha256'			(Optional) Hex SHA-256 the file must have. Raises DownloadIntegrityError if it doesn't.
+		'skip_unchanged'			(Optional) Boolean to download nothing if the datasource is unchanged since the last recorded download (see is_unchanged),
+									and to record this download once it's complete. Returns None paths and 'skipped': True when skipped.
+		'stream_hyper'				(Optional) Boolean to extract the .hyper straight from the download stream without writing the tdsx zip file,
+									roughly halving disk writes and scratch space. tdsx_zip_file_path is None. Archives the stream can't be read from
+									(and downloads with expected_sha256, which needs the whole archive) fall back to downloading the zip file first.
+		'bandwidth_limiter'			(Optional) BandwidthLimiter shared by concurrent downloads to cap their combined bytes/sec.
+		'file_name'					(Optional) Name of the tdsx zip file, without '.zip'. Default is the datasource name with '/' replaced by '-'.
 		"""
 
+		if skip_unchanged == True and self.is_unchanged(site):
+			common.standard_logger.info(f"Skipped downloading {self.name} datasource: unchanged since {self.updated_at}.")
+			return {'tdsx_zip_file_path': None, 'full_hyper_file_path': None, 'skipped': True}
+
 		url = f"{site.server_address}/api/{TABLEAU_API_VERSION}/sites/{site.site_id}/datasources/{self.id}/content"
 		common.standard_logger.info(f"Downloading {self.name} datasource..")
-		server_response = requests.get(url, headers={'x-tableau-auth': auth_token})
-		_check_status(server_response, 200)
 
-		hyper_zip_download = server_response.content
-
-		file_name = self.name
-		file_name = file_name.replace('/', '-')
+		if file_name == None:
+			file_name = self.name.replace('/', '-')
 		common.ensure_dir(output_folder)
 		full_file_path_string = output_folder + file_name + '.zip'
 		full_file_path = Path(full_file_path_string)
 
+		if stream_hyper == True:
+			hyper_file_name = hyper_output_file_name if hyper_output_file_name != None else file_name
+			if hyper_file_name.endswith('.hyper') == False:
+				hyper_file_name += '.hyper'
+
+			if expected_sha256 == None and _download_hyper_from_stream(site, url, output_folder + hyper_file_name, chunk_size, bandwidth_limiter) == True:
+				if skip_unchanged == True:
+					self.record_download_state(site)
+				return {'tdsx_zip_file_path': None, 'full_hyper_file_path': output_folder + hyper_file_name, 'skipped': False}
+
+			extract_as_hyper = True
+			delete_zip_file = True
+
 		common.standard_logger.info(f"Writing downloaded file to {full_file_path_string}")
-		try:
-			full_file_path.write_bytes(hyper_zip_download)
-			common.standard_logger.info(f"Write complete.")
-		except Exception as error:
-			common.standard_logger.error(f"Write failed. Error: {error}")		
+		_download_to_file(site, url, full_file_path_string, chunk_size, expected_sha256, bandwidth_limiter=bandwidth_limiter)
 
 		full_hyper_file_path = None
 		if extract_as_hyper == True:
@@ -716,8 +1279,551 @@ class Datasource:
 		if delete_zip_file == True:	
 			os.remove(full_file_path_string)
 			common.standard_logger.info(f"Deleted original file: {full_file_path_string}")
-			
-		return {'tdsx_zip_file_path': full_file_path, 'full_hyper_file_path': full_hyper_file_path}
+
+		if skip_unchanged == True:
+			self.record_download_state(site)
+
+		return {'tdsx_zip_file_path': full_file_path, 'full_hyper_file_path': full_hyper_file_path, 'skipped': False}
+
+
+class ContentTable:
+	# Columns holding few distinct values (ids of parents, owners, types) are interned so each value is stored once.
+	INTERNED_COLUMNS = ('project_id', 'parent_workbook_id', 'parent_project_id', 'owner', 'owner_email_address', 'type', 'show_tabs', 'content_permissions')
+
+	def __init__(self, content_class, columns=None):
+		"""
+		Columnar snapshot of many Project, Workbook, View or Datasource objects: one list per attribute instead of one object per row,
+		so a full-site listing takes a fraction of the memory and can be filtered a column at a time.
+		'content_class'		Project, Workbook, View or Datasource
+		'columns'			(Optional) Dict of column name -> list of values. Default is empty columns for every attribute of content_class.
+		"""
+
+		self.content_class = content_class
+		self.columns = columns if columns != None else {column_name: [] for column_name in content_class.__slots__}
+
+
+	def __str__(self):
+		return f"ContentTable of {len(self)} {self.content_class.__name__}(s). Columns: {', '.join(self.columns)}."
+
+
+	def __len__(self):
+		return len(self.columns['id'])
+
+
+	def __iter__(self):
+		"""
+		Yields the rows back as content_class objects.
+		"""
+
+		column_names = list(self.columns)
+		for row_values in zip(*self.columns.values()):
+			yield _content_from_values(self.content_class, dict(zip(column_names, row_values)))
+
+
+	def __getitem__(self, column_name):
+		return self.columns[column_name]
+
+
+	@classmethod
+	def from_objects(self, content_class, contents):
+		"""
+		Builds a table from an iterable of content_class objects, e.g. Workbook.iter_find(site), one object at a time.
+		"""
+
+		content_table = ContentTable(content_class)
+		for content in contents:
+			content_table.append(content)
+		return content_table
+
+
+	def append(self, content):
+		for column_name, column in self.columns.items():
+			value = getattr(content, column_name)
+			if column_name in self.INTERNED_COLUMNS and isinstance(value, str):
+				value = sys.intern(value)
+			column.append(value)
+
+
+	def mask(self, column_name, predicate):
+		"""
+		Returns a list of booleans, one per row, of predicate(value) over one column. Combine masks with and_masks.
+		'column_name'		Column to test, e.g. 'updated_at'
+		'predicate'			Function of one value returning a boolean, e.g. lambda updated_at: updated_at > '2021-06-01'
+		"""
+
+		return [bool(predicate(value)) for value in self.columns[column_name]]
+
+
+	def filter(self, mask):
+		"""
+		Returns a new table with the rows whose mask value is True.
+		"""
+
+		return ContentTable(self.content_class, {column_name: list(itertools.compress(column, mask)) for column_name, column in self.columns.items()})
+
+
+	def where(self, **column_values):
+		"""
+		Returns a new table with the rows whose columns equal all the given values, e.g. table.where(project_id=project.id).
+		A list or set value matches any of its members.
+		"""
+
+		mask = [True] * len(self)
+		for column_name, value in column_values.items():
+			accepted_values = set(value) if isinstance(value, (list, set, tuple)) else {value}
+			mask = and_masks(mask, self.mask(column_name, accepted_values.__contains__))
+		return self.filter(mask)
+
+
+	def to_dataframe(self):
+		import pandas # Imported here so listing content doesn't require pandas
+		return pandas.DataFrame(self.columns)
+
+
+def _content_from_values(content_class, values):
+	"""
+	Rebuilds a Project, Workbook, View or Datasource from a dict of its attribute values (e.g. a stored row) without an XML element.
+	Attributes missing from values are set to None.
+	"""
+
+	content = object.__new__(content_class)
+	for attribute_name in content_class.__slots__:
+		setattr(content, attribute_name, values.get(attribute_name))
+	return content
+
+
+def and_masks(*masks):
+	"""
+	Combines ContentTable masks row by row with a logical AND.
+	"""
+
+	return [all(row_values) for row_values in zip(*masks)]
+
+
+class BandwidthLimiter:
+	def __init__(self, bytes_per_second):
+		"""
+		Token bucket capping the combined throughput of the downloads sharing it, across threads.
+		'bytes_per_second'		Bytes per second allowed on average. Up to one second's worth can be read in a burst.
+		"""
+
+		self.bytes_per_second = bytes_per_second
+		self.num_tokens = bytes_per_second
+		self.last_refill_time = time.monotonic()
+		self._lock = threading.Lock()
+
+
+	def __str__(self):
+		return f"{self.bytes_per_second / 1024 ** 2:.1f} MB/s"
+
+
+	def consume(self, num_bytes):
+		"""
+		Takes num_bytes of tokens, sleeping until the bucket has refilled enough if it's short.
+		The bucket can go into debt for a chunk bigger than it holds, so the wait is just longer, and callers are served in order.
+		"""
+
+		with self._lock:
+			now = time.monotonic()
+			self.num_tokens = min(self.bytes_per_second, self.num_tokens + (now - self.last_refill_time) * self.bytes_per_second)
+			self.last_refill_time = now
+			self.num_tokens -= num_bytes
+			delay = -self.num_tokens / self.bytes_per_second if self.num_tokens < 0 else 0
+
+		if delay > 0:
+			time.sleep(delay)
+
+
+def _iter_limited_content(server_response, chunk_size, bandwidth_limiter=None):
+	"""
+	Yields the chunks of a streamed response, waiting on bandwidth_limiter (if given) before each one.
+	"""
+
+	for chunk in server_response.iter_content(chunk_size=chunk_size):
+		if bandwidth_limiter != None:
+			bandwidth_limiter.consume(len(chunk))
+		yield chunk
+
+
+def _download_to_file(site, url, full_file_path_string, chunk_size=TABLEAU_DOWNLOAD_CHUNK_SIZE, expected_sha256=None, max_resumes=TABLEAU_DOWNLOAD_MAX_RESUMES, bandwidth_limiter=None):
+	"""
+	Streams a download to '<full_file_path_string>.part' chunk by chunk, logging progress and throughput, and renames it to
+	full_file_path_string once it's complete and verified, so the file only appears whole.
+	If the connection drops, the download resumes where it stopped with an HTTP Range request, up to max_resumes times.
+	A .part file left by an earlier run is resumed too. Each resume sends If-Range with the ETag or Last-Modified saved next to the .part file,
+	so if the file changed on the server (e.g. an extract refresh) the server sends it whole and the download restarts from the beginning,
+	as it does when the server ignores the range. A .part file with no saved validator isn't resumed.
+	The file is requested without content encoding, so byte offsets and sizes match what's written to disk.
+	The file is verified before the rename: its size against the server's, the CRC of every member if it's a zip (e.g. a .tdsx),
+	and its SHA-256 if expected_sha256 is given. Raises DownloadIntegrityError if a check fails.
+	Reads wait on bandwidth_limiter, if given, so concurrent downloads share a bytes/sec cap.
+	Returns the number of bytes in the file.
+	"""
+
+	part_file_path_string = full_file_path_string + '.part'
+	validator_file_path_string = part_file_path_string + '.validator'
+	num_resumes = 0
+	start_time = time.time()
+
+	while True:
+		num_bytes_on_disk = os.path.getsize(part_file_path_string) if os.path.exists(part_file_path_string) else 0
+		validator = _read_download_validator(validator_file_path_string)
+		headers = {'Accept-Encoding': 'identity'}
+		if num_bytes_on_disk > 0 and validator != None:
+			headers.update({'Range': f'bytes={num_bytes_on_disk}-', 'If-Range': validator})
+
+		try:
+			server_response = client.get(url, site=site, stream=True, headers=headers)
+
+			if server_response.status_code == 416: # The .part file is already as long as (or longer than) the file
+				server_response.close()
+				os.remove(part_file_path_string)
+				continue
+
+			try:
+				if server_response.status_code != 206:
+					_check_status(server_response, 200)
+					num_bytes_on_disk = 0 # Full response: the file changed, the server doesn't support ranges, or there's no validator, so start over
+					_write_download_validator(validator_file_path_string, server_response)
+
+				total_size = _get_download_size(server_response, num_bytes_on_disk)
+			except BaseException:
+				server_response.close() # Past here _write_chunks closes it
+				raise
+
+			if num_bytes_on_disk > 0:
+				common.standard_logger.info(f'Resuming download at {num_bytes_on_disk / 1024 ** 2:.1f} MB...')
+
+			_write_chunks(server_response, part_file_path_string, num_bytes_on_disk, total_size, chunk_size, bandwidth_limiter)
+			break
+		except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as error:
+			if num_resumes >= max_resumes:
+				common.standard_logger.error(f'Download failed after {num_resumes} resumes. Keeping {part_file_path_string} to resume later.')
+				raise
+			delay = _get_backoff_seconds(num_resumes)
+			common.standard_logger.warning(f'Download interrupted ({error}). Resume {num_resumes + 1}/{max_resumes} in {delay:.1f}s...')
+			time.sleep(delay)
+			num_resumes += 1
+
+	num_bytes_written = os.path.getsize(part_file_path_string)
+
+	try:
+		_verify_download(part_file_path_string, total_size, expected_sha256)
+	except DownloadIntegrityError:
+		os.remove(part_file_path_string) # Resuming a corrupt file would keep it corrupt
+		_remove_download_validator(validator_file_path_string)
+		raise
+
+	os.replace(part_file_path_string, full_file_path_string)
+	_remove_download_validator(validator_file_path_string)
+
+	elapsed_seconds = max(time.time() - start_time, 0.001)
+	common.standard_logger.info(f'Write complete. {num_bytes_written / 1024 ** 2:.1f} MB in {elapsed_seconds:.1f}s ({num_bytes_written / 1024 ** 2 / elapsed_seconds:.1f} MB/s). Resumes: {num_resumes}.')
+
+	return num_bytes_written
+
+
+def _read_download_validator(validator_file_path_string):
+	"""
+	Returns the ETag or Last-Modified saved for a .part file, or None.
+	"""
+
+	if not os.path.exists(validator_file_path_string):
+		return None
+
+	with open(validator_file_path_string) as validator_file:
+		return validator_file.read().strip() or None
+
+
+def _write_download_validator(validator_file_path_string, server_response):
+	"""
+	Saves the response's strong ETag, or else its Last-Modified, for If-Range on later resumes. Weak ETags (W/"...") can't be used with If-Range.
+	Without either, any saved validator is removed, so the .part file isn't resumed.
+	"""
+
+	etag = server_response.headers.get('ETag')
+	validator = etag if etag != None and not etag.startswith('W/') else server_response.headers.get('Last-Modified')
+
+	if validator == None:
+		_remove_download_validator(validator_file_path_string)
+		return
+
+	with open(validator_file_path_string, 'w') as validator_file:
+		validator_file.write(validator)
+
+
+def _remove_download_validator(validator_file_path_string):
+	if os.path.exists(validator_file_path_string):
+		os.remove(validator_file_path_string)
+
+
+def _get_download_size(server_response, num_bytes_on_disk):
+	"""
+	Returns the full size of the file being downloaded, from Content-Range ('bytes 100-999/1000') or Content-Length, or None if the server doesn't say.
+	"""
+
+	content_range = server_response.headers.get('Content-Range', '')
+	if '/' in content_range and content_range.split('/')[-1].isdigit():
+		return int(content_range.split('/')[-1])
+
+	content_length = server_response.headers.get('Content-Length')
+	return num_bytes_on_disk + int(content_length) if content_length != None else None
+
+
+def _write_chunks(server_response, part_file_path_string, num_bytes_on_disk, total_size, chunk_size, bandwidth_limiter=None):
+	"""
+	Appends the body of a streamed response to the .part file after its first num_bytes_on_disk bytes, logging progress every TABLEAU_DOWNLOAD_PROGRESS_SECONDS.
+	"""
+
+	num_bytes_written = num_bytes_on_disk
+	start_time = time.time()
+	last_progress_time = start_time
+
+	try:
+		with open(part_file_path_string, 'r+b' if num_bytes_on_disk > 0 else 'wb') as part_file:
+			part_file.seek(num_bytes_on_disk)
+			part_file.truncate()
+
+			for chunk in _iter_limited_content(server_response, chunk_size, bandwidth_limiter):
+				part_file.write(chunk)
+				num_bytes_written += len(chunk)
+
+				if time.time() - last_progress_time >= TABLEAU_DOWNLOAD_PROGRESS_SECONDS:
+					last_progress_time = time.time()
+					percent_done = f' ({100 * num_bytes_written // total_size}%)' if total_size else ''
+					common.standard_logger.info(f'Downloaded {num_bytes_written / 1024 ** 2:.1f} MB{percent_done} at {(num_bytes_written - num_bytes_on_disk) / 1024 ** 2 / (last_progress_time - start_time):.1f} MB/s...')
+	finally:
+		server_response.close()
+
+
+def _verify_download(file_path_string, expected_size=None, expected_sha256=None):
+	"""
+	Raises DownloadIntegrityError if a downloaded file doesn't have the expected size or SHA-256, or if it's a zip with a member that fails its CRC check.
+	"""
+
+	file_size = os.path.getsize(file_path_string)
+	if expected_size != None and file_size != expected_size:
+		raise DownloadIntegrityError(f'{file_path_string} is {file_size} bytes, expected {expected_size}.')
+
+	if zipfile.is_zipfile(file_path_string):
+		try:
+			with zipfile.ZipFile(file_path_string) as downloaded_zip_file:
+				bad_member_name = downloaded_zip_file.testzip()
+		except (zipfile.BadZipFile, zlib.error) as error:
+			raise DownloadIntegrityError(f'{file_path_string} is not a valid zip file: {error}')
+		if bad_member_name != None:
+			raise DownloadIntegrityError(f'{bad_member_name} in {file_path_string} fails its CRC check.')
+
+	if expected_sha256 != None:
+		sha256 = hashlib.sha256()
+		with open(file_path_string, 'rb') as downloaded_file:
+			for chunk in iter(lambda: downloaded_file.read(TABLEAU_DOWNLOAD_CHUNK_SIZE), b''):
+				sha256.update(chunk)
+		if sha256.hexdigest() != expected_sha256.lower():
+			raise DownloadIntegrityError(f'SHA-256 of {file_path_string} is {sha256.hexdigest()}, expected {expected_sha256}.')
+
+
+class _ChunkReader:
+	def __init__(self, chunks):
+		"""
+		Reads exact byte counts from an iterator of chunks (e.g. Response.iter_content), holding at most one chunk plus what was pushed back.
+		"""
+
+		self.chunks = chunks
+		self.buffer = b''
+		self.num_bytes_read = 0
+
+
+	def read_some(self, max_size):
+		"""
+		Returns between 1 and max_size bytes, or b'' at the end of the stream.
+		"""
+
+		while len(self.buffer) == 0:
+			self.buffer = next(self.chunks, None)
+			if self.buffer == None:
+				self.buffer = b''
+				return b''
+
+		data = self.buffer[:max_size]
+		self.buffer = self.buffer[max_size:]
+		self.num_bytes_read += len(data)
+		return data
+
+
+	def read_up_to(self, size):
+		"""
+		Returns size bytes, or fewer only at the end of the stream.
+		"""
+
+		data = b''
+		while len(data) < size:
+			chunk = self.read_some(size - len(data))
+			if len(chunk) == 0:
+				break
+			data += chunk
+		return data
+
+
+	def read(self, size):
+		"""
+		Returns exactly size bytes. Raises DownloadIntegrityError if the stream ends first.
+		"""
+
+		data = self.read_up_to(size)
+		if len(data) < size:
+			raise DownloadIntegrityError(f'Download ended after {self.num_bytes_read} bytes, in the middle of a zip entry.')
+		return data
+
+
+	def unread(self, data):
+		self.buffer = data + self.buffer
+		self.num_bytes_read -= len(data)
+
+
+def _download_hyper_from_stream(site, url, full_hyper_file_path, chunk_size=TABLEAU_DOWNLOAD_CHUNK_SIZE, bandwidth_limiter=None):
+	"""
+	Downloads a tdsx and writes its .hyper member to full_hyper_file_path as the zip streams in, by reading the zip's local file headers
+	in order, so the archive itself is never written to disk. The member's CRC-32 is checked before its '.part' file is renamed into place.
+	Returns True if the .hyper was extracted, or False if the caller should download the whole archive instead: the body isn't a zip,
+	has no .hyper, uses encryption or an unsupported compression method, the connection dropped or the stream ended early (a partial
+	member can't be resumed), or the member failed its CRC check. The whole archive is then resumable and verified before extraction.
+	"""
+
+	part_file_path_string = full_hyper_file_path + '.part'
+	start_time = time.time()
+
+	server_response = client.get(url, site=site, stream=True, headers={'Accept-Encoding': 'identity'})
+
+	try:
+		_check_status(server_response, 200)
+	except BaseException:
+		server_response.close()
+		raise
+
+	try:
+		with open(part_file_path_string, 'wb') as part_file:
+			reader = _ChunkReader(_iter_limited_content(server_response, chunk_size, bandwidth_limiter))
+			is_extracted = _extract_hyper_member(reader, part_file, chunk_size)
+	except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as error:
+		common.standard_logger.warning(f'Download interrupted ({error}). Downloading the whole archive instead...')
+		is_extracted = False
+	except DownloadIntegrityError as error:
+		common.standard_logger.warning(f'{error} Downloading the whole archive instead...')
+		is_extracted = False
+	except BaseException:
+		os.remove(part_file_path_string)
+		raise
+	finally:
+		server_response.close() # Also stops reading the rest of the archive once the .hyper is out
+
+	if is_extracted == False:
+		os.remove(part_file_path_string)
+		return False
+
+	os.replace(part_file_path_string, full_hyper_file_path)
+
+	elapsed_seconds = max(time.time() - start_time, 0.001)
+	num_bytes_read = reader.num_bytes_read
+	common.standard_logger.info(f'Created {full_hyper_file_path} from the download stream. Read {num_bytes_read / 1024 ** 2:.1f} MB in {elapsed_seconds:.1f}s ({num_bytes_read / 1024 ** 2 / elapsed_seconds:.1f} MB/s).')
+
+	return True
+
+
+def _extract_hyper_member(reader, hyper_file, chunk_size):
+	"""
+	Reads zip entries from reader until the first .hyper member, writing its uncompressed bytes to hyper_file. Returns False if it can't.
+	"""
+
+	while True:
+		if reader.read_up_to(4) != b'PK\x03\x04': # Not a local file header: not a zip, or the central directory came before any .hyper
+			return False
+
+		version, flags, compression_method, modified_time, modified_date, crc, compressed_size, uncompressed_size, file_name_length, extra_field_length = struct.unpack('<HHHHHIIIHH', reader.read(26))
+		file_name = reader.read(file_name_length).decode('utf-8' if flags & 0x800 else 'cp437')
+		extra_field = reader.read(extra_field_length)
+
+		is_zip64 = compressed_size == 0xFFFFFFFF or uncompressed_size == 0xFFFFFFFF
+		if is_zip64:
+			compressed_size = _get_zip64_compressed_size(extra_field, compressed_size, uncompressed_size)
+
+		has_data_descriptor = flags & 0x8 != 0
+		is_hyper = file_name.endswith('.hyper')
+
+		if flags & 0x1 or compression_method not in (0, 8) or (compression_method == 0 and has_data_descriptor) or compressed_size == None:
+			return False
+
+		output_file = hyper_file if is_hyper else None
+		if compression_method == 8:
+			member_crc = _inflate_member(reader, output_file, chunk_size)
+		else:
+			member_crc = _copy_member(reader, output_file, compressed_size, chunk_size)
+
+		if has_data_descriptor:
+			signature_or_crc = reader.read(4)
+			crc = struct.unpack('<I', reader.read(4) if signature_or_crc == b'PK\x07\x08' else signature_or_crc)[0]
+			reader.read(16 if is_zip64 else 8) # Compressed and uncompressed sizes
+
+		if is_hyper:
+			if member_crc != crc:
+				raise DownloadIntegrityError(f'{file_name} fails its CRC check.')
+			return True
+
+
+def _get_zip64_compressed_size(extra_field, compressed_size, uncompressed_size):
+	# The zip64 extra field (ID 1) holds the uncompressed size, then the compressed size, but only those that are 0xFFFFFFFF in the header
+	position = 0
+	while position + 4 <= len(extra_field):
+		header_id, data_size = struct.unpack('<HH', extra_field[position:position + 4])
+		if header_id == 1:
+			data_position = position + 4 + (8 if uncompressed_size == 0xFFFFFFFF else 0)
+			if compressed_size == 0xFFFFFFFF:
+				return struct.unpack('<Q', extra_field[data_position:data_position + 8])[0]
+			return compressed_size
+		position += 4 + data_size
+	return None
+
+
+def _inflate_member(reader, output_file, chunk_size):
+	"""
+	Decompresses one deflated member, writing it to output_file (or discarding it if None), and returns its CRC-32.
+	Deflate marks its own end, so this works when the header doesn't give the compressed size. Bytes read past the end are pushed back.
+	"""
+
+	decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+	member_crc = 0
+
+	while not decompressor.eof:
+		compressed_data = reader.read_some(chunk_size)
+		if len(compressed_data) == 0:
+			raise DownloadIntegrityError(f'Download ended after {reader.num_bytes_read} bytes, in the middle of a zip entry.')
+
+		data = decompressor.decompress(compressed_data)
+		member_crc = zlib.crc32(data, member_crc)
+		if output_file != None:
+			output_file.write(data)
+
+	reader.unread(decompressor.unused_data)
+
+	return member_crc
+
+
+def _copy_member(reader, output_file, compressed_size, chunk_size):
+	"""
+	Copies one stored (uncompressed) member to output_file (or discards it if None) and returns its CRC-32.
+	"""
+
+	member_crc = 0
+	num_bytes_left = compressed_size
+
+	while num_bytes_left > 0:
+		data = reader.read(min(chunk_size, num_bytes_left))
+		num_bytes_left -= len(data)
+		member_crc = zlib.crc32(data, member_crc)
+		if output_file != None:
+			output_file.write(data)
+
+	return member_crc
 
 
 def extract_hyper_from_tdsx_file(input_file_path, output_folder_path, output_file_name=None, delete_zip_file=False):
@@ -727,6 +1833,7 @@ def extract_hyper_from_tdsx_file(input_file_path, output_folder_path, output_fil
 	'output_folder_path'			Destination directory to save datasource.
 	'output_file_name'				(Optional) Desired datasource file name.
 	'delete_zip_file'				(Optional) Boolean choice whether to delete original zip file or not. 
+	Raises HyperFileNotFoundError if the zip has no .hyper file (a live-connection datasource). The zip is kept.
 	"""
 
 	input_file_name = input_file_path.split('/')[-1].split('.')[0]
@@ -736,6 +1843,8 @@ def extract_hyper_from_tdsx_file(input_file_path, output_folder_path, output_fil
 	if output_file_name.endswith('.hyper') == False:
 		output_file_name += '.hyper'
 
+	full_hyper_file_path = None
+
 	with zipfile.ZipFile(input_file_path) as hyper_zip_file:
 		for zip_info in hyper_zip_file.infolist():
 			if zip_info.filename[-1] == '/' or not zip_info.filename.endswith('.hyper'):
@@ -744,6 +1853,9 @@ def extract_hyper_from_tdsx_file(input_file_path, output_folder_path, output_fil
 			zip_info.filename = output_file_name #Remove subfolders from filename.
 			hyper_zip_file.extract(zip_info, output_folder_path)
 			common.standard_logger.info(f"Created {full_hyper_file_path}")
+
+	if full_hyper_file_path == None:
+		raise HyperFileNotFoundError(f'{input_file_path} has no .hyper file. The datasource may use a live connection instead of an extract.')
 	
 	if delete_zip_file == True:
 		os.remove(input_file_path)
@@ -760,6 +1872,8 @@ def convert_hyper_file_to_dataframe(input_file_path, table_name, delete_hyper_fi
 	'delete_hyper_file'		(Optional) Boolean choice whether to delete original hyper file or not.
 	"""
 
+	import pantab # Imported here so scripts that never read Hyper files don't load pantab, pandas and the Hyper API
+
 	common.standard_logger.info(f"Converting Hyper {input_file_path} to DataFrame...")
 	df_data = pantab.frame_from_hyper(input_file_path, table=table_name)
 
@@ -770,16 +1884,116 @@ def convert_hyper_file_to_dataframe(input_file_path, table_name, delete_hyper_fi
 	return df_data
 
 
+def _connection_from_element(connection_element):
+	"""
+	Returns the dict describing one <connection> element of a connections listing.
+	"""
+
+	data_source_connection = {}
+
+	data_source_connection['connection_id'] = connection_element.get('id')
+	data_source_connection['server_address'] = connection_element.get('serverAddress')
+	data_source_connection['connection_type'] = connection_element.get('type')
+	data_source_connection['server_port'] = connection_element.get('serverPort')
+	data_source_connection['user_name'] = connection_element.get('userName')
+
+	return data_source_connection
+
+
+def _get_view_filters_query_string(filters):
+	"""
+	Returns the vf_<name>=<value> query string for a list of {'filter_name', 'filter_value'} view filters, URL-encoded.
+	"""
+
+	url_appendages = []
+
+	for filter in filters:
+		url_appendage = 'vf_' + urllib.parse.quote_plus(filter['filter_name']) + '=' + urllib.parse.quote_plus(filter['filter_value']) # URL encode filter names and values
+		common.standard_logger.debug(f'url_appendage: {url_appendage}')
+		url_appendages.append(url_appendage)
+
+	return '&'.join(url_appendages)
+
+
 def _encode_for_display(text):
 	"""
-	Encodes strings so they can display as ASCII in a Windows terminal window.
-	This function also encodes strings for processing by xml.etree.ElementTree functions.
+	Encodes strings so they can display as ASCII in a Windows terminal window. For display only: responses are parsed
+	from their raw UTF-8 bytes so non-ASCII names survive (log output is made display-safe by common.DisplaySafeFormatter).
 	Returns an ASCII-encoded version of the text.
-	Unicode characters are converted to ASCII placeholders (for example, "?").
+	Unicode characters are converted to backslash escapes (for example, "\\xe9").
 	"""
 	return text.encode('ascii', errors="backslashreplace").decode('utf-8')
 
 
+def _get_endpoint(method, url):
+	"""
+	Returns a low-cardinality name for the endpoint called, e.g. 'GET /sites/{id}/workbooks/{id}/views', for retry counters.
+	"""
+
+	path = urllib.parse.urlsplit(url).path
+	path = re.sub(r'^/api/[^/]+', '', path)
+	path = re.sub(r'/[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}(?=/|$)', '/{id}', path)
+	path = re.sub(r'/[0-9a-fA-F]{32}(?=/|$)', '/{id}', path) # Site IDs without dashes
+	return f'{method} {path}'
+
+
+def _classify_response(server_response):
+	"""
+	Classifies a response as None (success or redirect), 'auth', 'rate_limited', 'unavailable', 'server_error' or 'client_error'.
+	A 401 is classified by Tableau's detailed error code in the body (e.g. 401002 for an expired or invalid session): only an
+	auth token problem is 'auth', which signs in again. Bad credentials (401001) or a failed site switch (401003) would fail again,
+	so they're 'client_error'. 403 and 409 errors (e.g. 403004 forbidden, 409004 conflict) aren't transient, so they're 'client_error'
+	and never retried, as are other 4xx errors except 429.
+	"""
+
+	status_code = server_response.status_code
+	if status_code < 400:
+		return None
+	if status_code == 401:
+		error_code = _get_error_code(server_response)
+		return 'auth' if error_code == None or error_code in AUTH_TOKEN_ERROR_CODES else 'client_error'
+	if status_code == 429:
+		return 'rate_limited'
+	if status_code in (502, 503, 504):
+		return 'unavailable'
+	if status_code >= 500:
+		return 'server_error'
+	return 'client_error'
+
+
+def _get_error_code(server_response):
+	"""
+	Returns the code of the <error> element in a Tableau error response, e.g. '401002', or None if the body has none (e.g. an HTML error page).
+	"""
+
+	try:
+		error_element = ET.fromstring(server_response.content).find('t:error', namespaces=xmlns)
+	except ET.ParseError:
+		return None
+	return error_element.get('code') if error_element is not None else None
+
+
+def _get_backoff_seconds(attempt, server_response=None):
+	"""
+	Returns seconds to wait before retry number attempt + 1: the server's Retry-After if given,
+	otherwise full-jitter exponential backoff capped at TABLEAU_HTTP_BACKOFF_MAX_SECONDS.
+	"""
+
+	if server_response != None:
+		retry_after = server_response.headers.get('Retry-After')
+		if retry_after:
+			try:
+				return min(float(retry_after), TABLEAU_HTTP_BACKOFF_MAX_SECONDS)
+			except ValueError:
+				try:
+					retry_at = email.utils.parsedate_to_datetime(retry_after).timestamp()
+					return min(max(retry_at - time.time(), 0), TABLEAU_HTTP_BACKOFF_MAX_SECONDS)
+				except (TypeError, ValueError):
+					pass
+
+	return random.uniform(0, min(TABLEAU_HTTP_BACKOFF_MAX_SECONDS, TABLEAU_HTTP_BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+
 def _check_status(server_response, success_code):
 	"""
 	Checks the server response for possible errors.
@@ -789,7 +2003,10 @@ def _check_status(server_response, success_code):
 	"""
 
 	if server_response.status_code != success_code:
-		parsed_response = ET.fromstring(server_response.text)
+		try:
+			parsed_response = ET.fromstring(server_response.content)
+		except ET.ParseError: # e.g. an HTML error page from a load balancer
+			raise ApiCallError(str(server_response.status_code), 'unknown summary', _encode_for_display(server_response.text[:500]))
 
 		# Obtain the 3 xml tags from the response: error, summary, and detail tags
 		error_element = parsed_response.find('t:error', namespaces=xmlns)
@@ -831,14 +2048,11 @@ def sign_in(server, username, password, site_name):
 
 	# Make the request to server
 	common.standard_logger.debug(f"XML_Request: {xml_request}")
-	server_response = requests.post(signin_url, data=xml_request)
+	server_response = client.post(signin_url, data=xml_request, idempotent=True) # Replaying a sign-in only creates another session
 	_check_status(server_response, 200)
 
-	# ASCII encode server response to enable displaying to console
-	server_response = _encode_for_display(server_response.text)
-
 	# Reads and parses the response
-	parsed_response = ET.fromstring(server_response)
+	parsed_response = ET.fromstring(server_response.content)
 
 	# Gets the auth token and site ID
 	token = parsed_response.find('t:credentials', namespaces=xmlns).get('token')
@@ -855,7 +2069,8 @@ def sign_out(site):
 	"""
 	
 	url = f"{site.server_address}/api/{TABLEAU_API_VERSION}/auth/signout"
-	server_response = requests.post(url, headers={'x-tableau-auth': site.auth_token})
+	server_response = client.post(url, headers={'x-tableau-auth': site.auth_token})
+	site.forget_auth_token()
 	_check_status(server_response, 204)
 
 	common.standard_logger.info('Signed out.')
@@ -863,28 +2078,435 @@ def sign_out(site):
 	return
 
 
-def get_groups(site):
+def get_groups(site, filters=None, sort=None):
 	"""
 	Queries all existing user groups on the current site.
 	'site'           Site that the user is signed into
+	'filters'		 (Optional) Filter expressions evaluated by the server, e.g. ['name:eq:Finance Upworkers']. See _add_query_string.
+	'sort'			 (Optional) Sort expressions, e.g. ['name:asc']
+	Returns a list of Group objects.
+	"""
+
+	groups_list = []
+
+	for group in iter_groups(site, filters, sort):
+		common.standard_logger.info(f'Group.ID: {group.group_id}. Group.name: {group.group_name}')
+		groups_list.append(group)
+
+	return groups_list
+
+
+def iter_groups(site, filters=None, sort=None):
+	"""
+	Yields all existing user groups on the site, page by page, while the following pages are fetched in the background.
+	'site'           		Site that the user is signed into
+	'filters', 'sort'		(Optional) See get_groups.
+	"""
+
+	url = _add_query_string(f"{site.server_address}/api/{TABLEAU_API_VERSION}/sites/{site.site_id}/groups", filters, sort)
+
+	for group_element in _iter_pages(site, url, 'group'):
+		yield Group(group_element.get('id'), group_element.get('name'))
+
+
+def get_users(site, filters=None, sort=None, fields=None):
+	"""
+	Queries all existing users on the current site.
+	'site'           Site that the user is signed into
+	'filters'		 (Optional) Filter expressions evaluated by the server, e.g. ['siteRole:eq:Creator']. See _add_query_string.
+	'sort'			 (Optional) Sort expressions, e.g. ['name:asc']
+	'fields'		 (Optional) Fields to return, e.g. ['id', 'name']
+	Returns a list of User objects.
+	"""
+
+	return list(iter_users(site, filters, sort, fields))
+
+
+def iter_users(site, filters=None, sort=None, fields=None):
+	"""
+	Yields all existing users on the site, page by page, while the following pages are fetched in the background.
+	'site'           				Site that the user is signed into
+	'filters', 'sort', 'fields'		(Optional) See get_users.
 	"""
 
-	url = f"{site.server_address}/api/{TABLEAU_API_VERSION}/sites/{site.site_id}/groups?pageSize=300"
-	server_response = requests.get(url, headers={'x-tableau-auth': auth_token})
+	url = _add_query_string(f"{site.server_address}/api/{TABLEAU_API_VERSION}/sites/{site.site_id}/users", filters, sort, fields)
+
+	for user_element in _iter_pages(site, url, 'user'):
+		yield User(user_element.get('id'), user_element.get('name'))
+
+
+def update_connection(site, content, connection_id, server_address=None, server_port=None, user_name=None, password=None, embed_password='True'):
+	"""
+	Updates one connection of a workbook or published datasource. For workbooks, Tableau updates every connection of the same type at once.
+	'site'				Site object
+	'content'			Workbook or Datasource object
+	'connection_id'		ID of the connection, as in get_connections
+	'server_address', 'server_port', 'user_name', 'password'		(Optional) New values. Attributes left as None aren't changed.
+	'embed_password'	(Optional) 'True' or 'False'. Default is 'True'.
+	"""
+
+	url = f"{site.server_address}/api/{TABLEAU_API_VERSION}/sites/{site.site_id}/{type(content).__name__.lower()}s/{content.id}/connections/{connection_id}"
+
+	xml_request = ET.Element('tsRequest')
+	connection_element = ET.SubElement(xml_request, 'connection')
+	if server_address:
+		connection_element.set('serverAddress', server_address)
+	if server_port:
+		connection_element.set('serverPort', server_port)
+	if user_name:
+		connection_element.set('userName', user_name)
+	if password:
+		connection_element.set('password', password)
+
+	connection_element.set('embedPassword', embed_password)
+
+	server_response = client.put(url, data=ET.tostring(xml_request), site=site)
 	_check_status(server_response, 200)
-	server_response = ET.fromstring(_encode_for_display(server_response.text))
+	invalidate_content(site, type(content).__name__, content.id)
 
-	group_tree = server_response.findall('.//t:group', namespaces=xmlns)
+	common.standard_logger.debug(f'Updated connection {connection_id} of {content.name}.')
 
-	for group_element in group_tree:
-		group_id = group_element.get('id')
-		group_name = group_element.get('name')
-		group = Group(group_id, group_name)
-		common.standard_logger.info(f'Group.ID: {group.group_id}. Group.name: {group.group_name}')
+
+def _get_permissions_request(content_type, content_id, group_ids, user_ids, capabilities, permission_mode):
+	"""
+	Builds a permissions tsRequest giving every group and user the same capabilities, one <granteeCapabilities> element per grantee.
+	'content_type'		'project', 'workbook', 'view' or 'datasource'
+	'group_ids'			Group ID, list of group IDs or None
+	'user_ids'			List of user IDs or None
+	"""
+
+	if isinstance(group_ids, str):
+		group_ids = [group_ids]
+
+	grantees = [('group', group_id) for group_id in (group_ids or [])] + [('user', user_id) for user_id in (user_ids or [])]
+
+	xml_request = ET.Element('tsRequest')
+	permissions_element = ET.SubElement(xml_request, 'permissions')
+	ET.SubElement(permissions_element, content_type, id=content_id)
+
+	for grantee_type, grantee_id in grantees:
+		grantee_capabilities_element = ET.SubElement(permissions_element, 'granteeCapabilities')
+		ET.SubElement(grantee_capabilities_element, grantee_type, id=grantee_id)
+		capabilities_element = ET.SubElement(grantee_capabilities_element, 'capabilities')
+		for capability in capabilities:
+			ET.SubElement(capabilities_element, 'capability', name=capability, mode=permission_mode)
+
+	return ET.tostring(xml_request)
+
+
+def _get_permissions_url(site, content, object_type=None):
+	"""
+	Returns the permissions URL of a Project, Workbook, View or Datasource, or of a project's default permissions for object_type ('workbook', 'datasource' or 'flow').
+	"""
+
+	content_url = f"{site.server_address}/api/{TABLEAU_API_VERSION}/sites/{site.site_id}/{type(content).__name__.lower()}s/{content.id}"
+
+	if object_type != None:
+		return content_url + f"/default-permissions/{object_type}s"
+
+	return content_url + '/permissions'
+
+
+def get_permissions(site, content, object_type=None):
+	"""
+	Queries the explicit permissions of a Project, Workbook, View or Datasource.
+	'site'				Site object
+	'content'			Project, Workbook, View or Datasource object
+	'object_type'		(Optional) For a project, 'workbook', 'datasource' or 'flow' to get its default permissions for that object type instead.
+	Returns {(grantee type ('group' or 'user'), grantee ID): {capability name: mode}}.
+	"""
+
+	server_response = client.get(_get_permissions_url(site, content, object_type), site=site)
+	_check_status(server_response, 200)
+	server_response = ET.fromstring(server_response.content)
+
+	permissions = {}
+
+	for grantee_capabilities_element in server_response.findall('.//t:granteeCapabilities', namespaces=xmlns):
+		grantee_element = grantee_capabilities_element.find('t:group', namespaces=xmlns)
+		grantee_type = 'group'
+		if grantee_element is None:
+			grantee_element = grantee_capabilities_element.find('t:user', namespaces=xmlns)
+			grantee_type = 'user'
+
+		capabilities = permissions.setdefault((grantee_type, grantee_element.get('id')), {})
+		for capability_element in grantee_capabilities_element.findall('.//t:capability', namespaces=xmlns):
+			capabilities[capability_element.get('name')] = capability_element.get('mode')
+
+	return permissions
+
+
+def get_permission_changes(current_capabilities, capabilities, permission_mode):
+	"""
+	Compares the capabilities a grantee has with the ones it should have.
+	'current_capabilities'		{capability name: mode} of the grantee, as in one value of get_permissions
+	'capabilities'				List of capability names the grantee should have in permission_mode
+	'permission_mode'			'Allow' or 'Deny'
+	Returns (capabilities to add, capabilities to replace because they're set in the other mode). Both are empty if nothing needs to be written.
+	"""
+
+	capabilities_to_add = [capability for capability in capabilities if capability not in current_capabilities]
+	capabilities_to_replace = [capability for capability in capabilities if capability in current_capabilities and current_capabilities[capability] != permission_mode]
+
+	return capabilities_to_add, capabilities_to_replace
+
+
+def delete_permission(site, content, grantee_type, grantee_id, capability_name, permission_mode, object_type=None):
+	"""
+	Removes one capability of one grantee from a Project, Workbook, View or Datasource (or from a project's default permissions for object_type).
+	Tableau won't add a capability in one mode while the grantee has it in the other, so it has to be removed first.
+	'grantee_type'		'group' or 'user'
+	'permission_mode'	Mode the capability currently has: 'Allow' or 'Deny'
+	"""
+
+	url = _get_permissions_url(site, content, object_type) + f"/{grantee_type}s/{grantee_id}/{capability_name}/{permission_mode}"
+
+	server_response = client.delete(url, site=site)
+	_check_status(server_response, 204)
+
+	if isinstance(content, (Workbook, View, Datasource)):
+		invalidate_content(site, type(content).__name__, content.id)
+
+
+def _add_query_string(url, filters=None, sort=None, fields=None):
+	"""
+	Appends filter, sort and fields query parameters so the server does the filtering, sorting and projection.
+	'filters'		List of 'field:operator:value' strings or (field, operator, value) tuples, e.g. 'name:eq:Sales' or ('projectName', 'in', ['A', 'B']).
+					Operators: eq, in, gt, gte, lt, lte, has. Values are URL-encoded; dates are ISO 8601, e.g. 'updatedAt:gt:2021-06-01T00:00:00Z'.
+	'sort'			List of 'field:direction' strings or (field, direction) tuples, e.g. 'name:asc'.
+	'fields'		List of field names, or a string such as '_all_' or '_default_,owner.email'.
+	Returns the URL with the query string added.
+	"""
+
+	query_parameters = []
+
+	if filters:
+		filter_expressions = []
+		for filter in filters:
+			field, operator, value = filter.split(':', 2) if isinstance(filter, str) else filter
+			if isinstance(value, (list, tuple)):
+				value = '[' + ','.join(urllib.parse.quote(str(item), safe='') for item in value) + ']'
+			else:
+				value = urllib.parse.quote(str(value), safe='')
+			filter_expressions.append(f'{field}:{operator}:{value}')
+		query_parameters.append('filter=' + ','.join(filter_expressions))
+
+	if sort:
+		sort_expressions = [sort_expression if isinstance(sort_expression, str) else ':'.join(sort_expression) for sort_expression in sort]
+		query_parameters.append('sort=' + ','.join(sort_expressions))
+
+	if fields:
+		query_parameters.append('fields=' + (fields if isinstance(fields, str) else ','.join(fields)))
+
+	if len(query_parameters) == 0:
+		return url
+
+	separator = '&' if '?' in url else '?'
+	return url + separator + '&'.join(query_parameters)
+
+
+def _iter_page_elements(site, url, element_name, page_number, page_size, pagination=None):
+	"""
+	Streams one page of a listing and yields its <element_name> elements as they are parsed. See _iter_response_elements.
+	"""
+
+	separator = '&' if '?' in url else '?'
+	server_response = client.get(f'{url}{separator}pageSize={page_size}&pageNumber={page_number}', site=site, stream=True)
+
+	try:
+		_check_status(server_response, 200)
+		yield from _iter_response_elements(server_response, element_name, pagination)
+	finally:
+		server_response.close() # Returns the connection to the pool even if the caller stops early
+
+
+def _get_page_elements(site, url, element_name, page_number, page_size):
+	return list(_iter_page_elements(site, url, element_name, page_number, page_size))
+
+
+def _iter_pages(site, url, element_name, page_size=TABLEAU_PAGE_SIZE, prefetch=TABLEAU_PAGE_PREFETCH):
+	"""
+	Yields the <element_name> elements of every page of a paginated listing, in order. The first page is streamed, and
+	as soon as its pagination/@totalAvailable is parsed up to 'prefetch' of the following pages are fetched in the
+	background while the caller processes the current one.
+	'site'				Site object
+	'url'				Listing URL without pageSize/pageNumber
+	'element_name'		Name of the listed elements, e.g. 'workbook'
+	"""
+
+	pagination = {}
+	num_pages = None
+	next_page_number = 2
+	page_futures = []
+	executor = ThreadPoolExecutor(max_workers=max(1, prefetch))
+
+	def submit_pages():
+		nonlocal next_page_number
+		while next_page_number <= num_pages and len(page_futures) < max(1, prefetch):
+			page_futures.append(executor.submit(_get_page_elements, site, url, element_name, next_page_number, page_size))
+			next_page_number += 1
+
+	try:
+		for element in _iter_page_elements(site, url, element_name, 1, page_size, pagination):
+			if num_pages == None and 'totalAvailable' in pagination:
+				num_pages = -(-int(pagination['totalAvailable']) // page_size)
+				common.standard_logger.debug(f"{url}: {pagination['totalAvailable']} {element_name}(s) over {num_pages} page(s).")
+				submit_pages()
+			yield element
+
+		if num_pages == None and 'totalAvailable' in pagination: # Pagination came after the elements, or the page was empty
+			num_pages = -(-int(pagination['totalAvailable']) // page_size)
+
+		if num_pages == None:
+			return
+
+		submit_pages()
+		while len(page_futures) > 0:
+			page_elements = page_futures.pop(0).result()
+			submit_pages()
+			yield from page_elements
+	finally:
+		for page_future in page_futures:
+			page_future.cancel()
+		executor.shutdown(wait=False)
+
+
+def _iter_response_elements(server_response, element_name, pagination=None):
+	"""
+	Incrementally parses a streamed listing response and yields each <element_name> child of the listing
+	(tsResponse > workbooks > workbook) as soon as its end tag is read. Yielded elements are detached from the
+	tree, so memory stays bounded by one element rather than the whole response.
+	'server_response'		requests Response made with stream=True
+	'element_name'			Name of the listed elements, e.g. 'workbook'
+	'pagination'			(Optional) Dict updated with the attributes of the <pagination> element when it's parsed
+	"""
+
+	element_tag = f"{{{xmlns['t']}}}{element_name}"
+	pagination_tag = f"{{{xmlns['t']}}}pagination"
+	parser = ET.XMLPullParser(events=('start', 'end'))
+	element_stack = []
+
+	def read_elements():
+		for event, element in parser.read_events():
+			if event == 'start':
+				element_stack.append(element)
+				continue
+
+			element_stack.pop()
+			if element.tag == pagination_tag and pagination != None:
+				pagination.update(element.attrib)
+			elif element.tag == element_tag and len(element_stack) == 2:
+				element_stack[-1].remove(element)
+				yield element
+
+	for chunk in server_response.iter_content(chunk_size=TABLEAU_XML_CHUNK_SIZE):
+		parser.feed(chunk)
+		yield from read_elements()
+
+	parser.close()
+	yield from read_elements()
+
+
+def _read_auth_token_cache(cache_key):
+	"""
+	Returns the cached token entry {'token', 'site_id', 'user_id', 'expires_at'} for cache_key, or None if missing or expired.
+	"""
+
+	try:
+		with open(TABLEAU_AUTH_TOKEN_CACHE_PATH) as cache_file:
+			cached_tokens = json.load(cache_file)
+	except (OSError, ValueError):
+		return None
+
+	cached_token = cached_tokens.get(cache_key)
+	if cached_token == None or cached_token.get('expires_at', 0) <= time.time():
+		return None
+
+	return cached_token
+
+
+def _write_auth_token_cache(cache_key, cached_token):
+	"""
+	Stores (or removes, if cached_token is None) the token entry for cache_key. The file is written atomically and readable by the owner only.
+	"""
+
+	with _auth_token_cache_lock:
+		try:
+			with open(TABLEAU_AUTH_TOKEN_CACHE_PATH) as cache_file:
+				cached_tokens = json.load(cache_file)
+		except (OSError, ValueError):
+			cached_tokens = {}
+
+		if cached_token == None:
+			if cache_key not in cached_tokens:
+				return
+			cached_tokens.pop(cache_key)
+		else:
+			cached_tokens[cache_key] = cached_token
+
+		_write_json_atomically(TABLEAU_AUTH_TOKEN_CACHE_PATH, cached_tokens, 'auth token cache')
+
+
+def _write_json_atomically(file_path, content, description):
+	"""
+	Writes content as JSON to a temp file unique to this call, readable by the owner only, then moves it over file_path.
+	'description'	What the file is, for the warning logged if it can't be written, e.g. 'auth token cache'
+	"""
+
+	try:
+		file_descriptor, temp_file_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(file_path)), prefix=f'{os.path.basename(file_path)}.', suffix='.tmp')
+		try:
+			with os.fdopen(file_descriptor, 'w') as json_file:
+				json.dump(content, json_file)
+			os.replace(temp_file_path, file_path)
+		except BaseException:
+			os.remove(temp_file_path)
+			raise
+	except OSError as error:
+		common.standard_logger.warning(f'Could not write {description} {file_path}. Error: {error}')
+
+
+def _get_download_state_key(site, datasource_id):
+	return f'{site.server_address}|{site.site_name}|{datasource_id}'
+
+
+def _read_download_state(state_key):
+	"""
+	Returns the recorded {'updated_at', 'size'} of a downloaded datasource, or None.
+	"""
+
+	try:
+		with open(TABLEAU_DOWNLOAD_STATE_PATH) as state_file:
+			return json.load(state_file).get(state_key)
+	except (OSError, ValueError):
+		return None
+
+
+def _write_download_state(state_key, download_state):
+	"""
+	Stores the download state for state_key. The file is written atomically, and by one thread at a time so none loses another's entry.
+	"""
+
+	with _download_state_lock:
+		try:
+			with open(TABLEAU_DOWNLOAD_STATE_PATH) as state_file:
+				download_states = json.load(state_file)
+		except (OSError, ValueError):
+			download_states = {}
+
+		download_states[state_key] = download_state
+
+		_write_json_atomically(TABLEAU_DOWNLOAD_STATE_PATH, download_states, 'download state')
+
+
+site = Site(None, TABLEAU_SITE_NAME, TABLEAU_SERVER_ADDRESS, None)
 
 
-auth_token, site_id, user_id = sign_in(TABLEAU_SERVER_ADDRESS, TABLEAU_USER_NAME, TABLEAU_PASSWORD, TABLEAU_SITE_NAME)
-site = Site(site_id, TABLEAU_SITE_NAME, TABLEAU_SERVER_ADDRESS, auth_token)
+def __getattr__(name):
+	# auth_token, site_id and user_id used to be module globals set by signing in at import time.
+	if name in ('auth_token', 'site_id', 'user_id'):
+		return getattr(site, name)
+	raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def main():
@@ -0,0 +1,286 @@
+import asyncio
+import functools
+import os
+import xml.etree.ElementTree as ET # Contains methods used to build and parse XML
+import aiohttp # Contains methods used to make asynchronous HTTP requests
+import common
+import tableau_online
+from tableau_online import TABLEAU_API_VERSION, xmlns, Project, Workbook, View, Datasource
+
+
+TABLEAU_ASYNC_MAX_CONCURRENCY = int(os.getenv('TABLEAU_ASYNC_MAX_CONCURRENCY', 20))
+
+
+class _AsyncResponse:
+	def __init__(self, status_code, headers, content):
+		"""
+		Fully-read aiohttp response, shaped like a requests Response so tableau_online's _check_status and _classify_response work on it.
+		"""
+
+		self.status_code = status_code
+		self.headers = headers
+		self.content = content
+
+
+	@property
+	def text(self):
+		return self.content.decode('utf-8', errors='replace')
+
+
+class AsyncSite:
+	def __init__(self, site=None, max_concurrency=TABLEAU_ASYNC_MAX_CONCURRENCY, max_retries=tableau_online.TABLEAU_HTTP_MAX_RETRIES):
+		"""
+		Asynchronous client for the Tableau REST API. Keeps up to max_concurrency requests in flight; use with asyncio.gather
+		to sweep thousands of workbooks and views. Retries, backoff, the circuit breaker and re-authentication follow tableau_online.ApiClient.
+		'site'				(Optional) tableau_online.Site to act on. Default is tableau_online.site.
+		'max_concurrency'	(Optional) Max number of requests in flight at once.
+		'max_retries'		(Optional) Retries per call for rate-limited, unavailable and failed calls.
+
+		Usage:
+			async with AsyncSite() as async_site:
+				workbooks = await async_site.find_workbooks()
+				views_lists = await asyncio.gather(*[async_site.get_views(workbook) for workbook in workbooks])
+		"""
+
+		self.site = site if site != None else tableau_online.site
+		self.max_concurrency = max_concurrency
+		self.max_retries = max_retries
+		self.circuit_breaker = tableau_online.client.circuit_breaker
+		self.session = None
+		self._semaphore = None
+		self._sign_in_lock = None
+
+
+	def __str__(self):
+		return f"Site: {self.site}. Max concurrency: {self.max_concurrency}"
+
+
+	async def __aenter__(self):
+		await self.open()
+		return self
+
+
+	async def __aexit__(self, exc_type, exc_value, traceback):
+		await self.close()
+
+
+	async def open(self):
+		self._semaphore = asyncio.Semaphore(self.max_concurrency)
+		self._sign_in_lock = asyncio.Lock()
+
+		connector = aiohttp.TCPConnector(limit=self.max_concurrency)
+		timeout = aiohttp.ClientTimeout(sock_connect=tableau_online.TABLEAU_HTTP_CONNECT_TIMEOUT, sock_read=tableau_online.TABLEAU_HTTP_READ_TIMEOUT)
+		self.session = aiohttp.ClientSession(connector=connector, timeout=timeout, auto_decompress=True)
+
+		# Signing in is blocking, so do it (or load the cached token) once up front, off the event loop.
+		await asyncio.get_running_loop().run_in_executor(None, lambda: self.site.auth_token)
+
+
+	async def close(self):
+		if self.session != None:
+			await self.session.close()
+			self.session = None
+
+
+	def _get_base_url(self):
+		return f"{self.site.server_address}/api/{TABLEAU_API_VERSION}/sites/{self.site.site_id}"
+
+
+	async def _sign_in_again(self, rejected_auth_token):
+		async with self._sign_in_lock:
+			if self.site.auth_token == rejected_auth_token: # Another request may have signed in already
+				common.standard_logger.info('Auth token rejected by server. Signing in again...')
+				await asyncio.get_running_loop().run_in_executor(None, lambda: self.site.sign_in(force=True, rejected_auth_token=rejected_auth_token))
+
+
+	async def _request(self, method, url, success_code=200, **kwargs):
+		"""
+		Makes one API call, holding a concurrency slot only while the request is in flight (not while backing off).
+		Returns an _AsyncResponse. Throws an ApiCallError exception if the API call fails.
+		"""
+
+		endpoint = tableau_online._get_endpoint(method, url)
+		signed_in_again = False
+		attempt = 0
+
+		while True:
+			self.circuit_breaker.before_call()
+			auth_token = self.site.auth_token
+			headers = {'x-tableau-auth': auth_token}
+
+			try:
+				async with self._semaphore:
+					async with self.session.request(method, url, headers=headers, **kwargs) as response:
+						server_response = _AsyncResponse(response.status, response.headers, await response.read())
+				error_class = tableau_online._classify_response(server_response)
+			except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as error:
+				server_response = None
+				error_class = 'network_error'
+				network_error = error
+
+			if error_class == 'auth' and signed_in_again == False:
+				await self._sign_in_again(auth_token)
+				signed_in_again = True
+				continue
+
+			if error_class not in tableau_online.ApiClient.RETRYABLE_ERROR_CLASSES:
+				self.circuit_breaker.record_success()
+				tableau_online._check_status(server_response, success_code)
+				return server_response
+
+			self.circuit_breaker.record_failure()
+
+			if attempt >= self.max_retries:
+				common.standard_logger.error(f'{endpoint} failed with {error_class} after {attempt} retries.')
+				if server_response == None:
+					raise network_error
+				tableau_online._check_status(server_response, success_code)
+				return server_response
+
+			delay = tableau_online._get_backoff_seconds(attempt, server_response)
+			with tableau_online.client._retry_counts_lock:
+				tableau_online.client.retry_counts[(endpoint, error_class)] += 1
+			common.standard_logger.warning(f'{endpoint} failed with {error_class}. Retry {attempt + 1}/{self.max_retries} in {delay:.1f}s...')
+			await asyncio.sleep(delay)
+			attempt += 1
+
+
+	async def _get_elements(self, url, element_name):
+		server_response = await self._request('GET', url)
+		parsed_response = ET.fromstring(server_response.content)
+		return parsed_response.findall(f'.//t:{element_name}', namespaces=xmlns)
+
+
+	async def _get_all_elements(self, url, element_name, page_size=tableau_online.TABLEAU_PAGE_SIZE):
+		"""
+		Returns the <element_name> elements of every page of a paginated listing, in order. The first page gives
+		pagination/@totalAvailable; all remaining pages are then requested at once, bounded by the concurrency limit.
+		"""
+
+		separator = '&' if '?' in url else '?'
+		page_url = f'{url}{separator}pageSize={page_size}&pageNumber='
+
+		server_response = await self._request('GET', page_url + '1')
+		parsed_response = ET.fromstring(server_response.content)
+		elements = parsed_response.findall(f'.//t:{element_name}', namespaces=xmlns)
+
+		pagination_element = parsed_response.find('t:pagination', namespaces=xmlns)
+		if pagination_element is None:
+			return elements
+
+		num_pages = -(-int(pagination_element.get('totalAvailable', 0)) // page_size)
+		for page_elements in await asyncio.gather(*[self._get_elements(page_url + str(page_number), element_name) for page_number in range(2, num_pages + 1)]):
+			elements.extend(page_elements)
+
+		return elements
+
+
+	async def get_projects(self):
+		"""
+		Queries all existing projects on the site. Returns a list of Project objects.
+		"""
+
+		project_elements = await self._get_all_elements(f"{self._get_base_url()}/projects?fields=_all_", 'project')
+		return [Project.from_element(project_element) for project_element in project_elements]
+
+
+	async def find_workbooks(self):
+		"""
+		Queries all existing workbooks on the site. Returns a list of Workbook objects.
+		"""
+
+		workbook_elements = await self._get_all_elements(f"{self._get_base_url()}/workbooks", 'workbook')
+		return [Workbook.from_element(workbook_element) for workbook_element in workbook_elements]
+
+
+	async def get_workbook(self, workbook_id):
+		"""
+		Finds an existing workbook by ID. Returns a Workbook object.
+		"""
+
+		workbook_elements = await self._get_elements(f"{self._get_base_url()}/workbooks/{workbook_id}", 'workbook')
+		return Workbook.from_element(workbook_elements[0])
+
+
+	async def get_views(self, workbook=None, with_usage=False):
+		"""
+		Queries the views of one workbook, or of the whole site if workbook is None. Returns a list of View objects.
+		'workbook'		(Optional) Workbook object
+		'with_usage'	(Optional) Boolean to also get each workbook view's total view count (View.total_view_count).
+		"""
+
+		if workbook == None:
+			view_elements = await self._get_all_elements(f"{self._get_base_url()}/views", 'view')
+			return [View.from_element(view_element) for view_element in view_elements]
+
+		url = f"{self._get_base_url()}/workbooks/{workbook.id}/views"
+		if with_usage == True:
+			url += '?includeUsageStatistics=true'
+
+		view_elements = await self._get_elements(url, 'view')
+		return [View.from_element(view_element, workbook.id) for view_element in view_elements]
+
+
+	async def get_view(self, view_id):
+		"""
+		Finds an existing view by ID. Returns a View object.
+		"""
+
+		view_elements = await self._get_elements(f"{self._get_base_url()}/views/{view_id}", 'view')
+		return View.from_element(view_elements[0])
+
+
+	async def get_connections(self, workbook):
+		"""
+		Queries the connections of one workbook. Returns a list of dicts like Workbook.get_connections.
+		"""
+
+		connection_elements = await self._get_elements(f"{self._get_base_url()}/workbooks/{workbook.id}/connections", 'connection')
+		return [tableau_online._connection_from_element(connection_element) for connection_element in connection_elements]
+
+
+	async def get_pdf(self, view, filters=None):
+		"""
+		Returns the PDF bytes of a view.
+		'view'			View object
+		'filters'		(Optional) List of {'filter_name', 'filter_value'} view filters
+		"""
+
+		url = f"{self._get_base_url()}/views/{view.id}/pdf"
+		if filters != None:
+			url += '?' + tableau_online._get_view_filters_query_string(filters)
+
+		server_response = await self._request('GET', url)
+		return server_response.content
+
+
+	async def find_datasources(self):
+		"""
+		Queries all existing datasources on the site. Returns a list of Datasource objects.
+		"""
+
+		datasource_elements = await self._get_all_elements(f"{self._get_base_url()}/datasources", 'datasource')
+		return [Datasource(datasource_element) for datasource_element in datasource_elements]
+
+
+	async def get_datasource(self, datasource_id):
+		"""
+		Finds an existing datasource by ID. Returns a Datasource object.
+		"""
+
+		datasource_elements = await self._get_elements(f"{self._get_base_url()}/datasources/{datasource_id}", 'datasource')
+		return Datasource(datasource_elements[0])
+
+
+	async def download(self, datasource, output_folder='/', extract_as_hyper=False, hyper_output_file_name=None, delete_zip_file=False):
+		"""
+		Downloads & saves a datasource's tdsx zip file. Arguments and return value are the same as Datasource.download.
+		The download runs Datasource.download in a worker thread, so it's streamed to disk in chunks, resumed if the connection drops
+		and verified, like a synchronous download, without blocking the event loop. It counts towards max_concurrency.
+		"""
+
+		loop = asyncio.get_running_loop()
+		download = functools.partial(datasource.download, self.site, output_folder, extract_as_hyper, hyper_output_file_name, delete_zip_file)
+
+		async with self._semaphore:
+			return await loop.run_in_executor(None, download)
@@ -0,0 +1,7 @@
+import os
+import sys
+
+
+# The modules under test are top-level scripts in the repository root
+REPOSITORY_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPOSITORY_PATH)
@@ -0,0 +1,189 @@
+from unittest import mock
+import requests
+import pytest
+import tableau_online
+from tableau_online import ApiClient, CircuitBreaker, CircuitBreakerOpenError, Site, xmlns
+
+
+SITE_ID = '9a8b7c6d-1234-4abc-8def-0123456789ab'
+URL = f'https://tableau.example.com/api/3.13/sites/{SITE_ID}/workbooks'
+
+
+def get_response(status_code, headers=None, body=b''):
+	response = requests.models.Response()
+	response.status_code = status_code
+	response.headers.update(headers or {})
+	response._content = body
+	response._content_consumed = True
+	response.close = mock.Mock()
+	return response
+
+
+def get_error_body(code):
+	return f'<tsResponse xmlns="{xmlns["t"]}"><error code="{code}"><summary>Error</summary><detail>Error {code}</detail></error></tsResponse>'.encode()
+
+
+@pytest.fixture
+def sleeps():
+	with mock.patch.object(tableau_online.time, 'sleep') as sleep:
+		yield sleep
+
+
+def serve(client, *responses):
+	"""
+	Answers the client's calls with responses in order. An exception in responses is raised instead, like a network error.
+	"""
+
+	responses = list(responses)
+
+	def request(method, url, headers=None, **kwargs):
+		sent_headers.append(dict(headers or {}))
+		response = responses.pop(0)
+		if isinstance(response, Exception):
+			raise response
+		return response
+
+	sent_headers = []
+	request_mock = mock.patch.object(client.session, 'request', side_effect=request)
+	request_mock.sent_headers = sent_headers
+	return request_mock
+
+
+def test_server_errors_are_retried_until_success(sleeps):
+	client = ApiClient(max_retries=3)
+	failures = [get_response(503), get_response(500)]
+
+	with serve(client, *failures, get_response(200)) as request:
+		server_response = client.get(URL)
+
+	assert server_response.status_code == 200
+	assert request.call_count == 3
+	assert all(failure.close.called for failure in failures) # Each retried response gives its connection back
+	assert client.get_retry_counts() == {'GET /sites/{id}/workbooks': {'unavailable': 1, 'server_error': 1}}
+
+
+def test_last_response_returned_after_max_retries(sleeps):
+	client = ApiClient(max_retries=2)
+
+	with serve(client, get_response(503), get_response(503), get_response(504)) as request:
+		server_response = client.get(URL)
+
+	assert server_response.status_code == 504
+	assert request.call_count == 3
+
+
+def test_network_error_raised_after_max_retries(sleeps):
+	client = ApiClient(max_retries=1)
+
+	with serve(client, requests.ConnectionError('reset'), requests.Timeout('timed out')), pytest.raises(requests.Timeout):
+		client.get(URL)
+
+
+def test_client_errors_are_not_retried(sleeps):
+	client = ApiClient()
+
+	for status_code, body in ((403, get_error_body('403004')), (404, get_error_body('404004')), (409, get_error_body('409004')), (401, get_error_body('401001'))):
+		with serve(client, get_response(status_code, body=body)) as request:
+			assert client.get(URL).status_code == status_code
+		assert request.call_count == 1
+
+	assert sleeps.call_count == 0
+
+
+def test_non_idempotent_calls_are_only_retried_when_rate_limited(sleeps):
+	client = ApiClient(max_retries=3)
+
+	with serve(client, get_response(503)) as request:
+		assert client.post(URL).status_code == 503
+	assert request.call_count == 1
+
+	with serve(client, requests.ConnectionError('reset')) as request, pytest.raises(requests.ConnectionError):
+		client.delete(URL)
+	assert request.call_count == 1
+
+	with serve(client, get_response(429), get_response(201)) as request:
+		assert client.post(URL).status_code == 201
+	assert request.call_count == 2
+
+	with serve(client, get_response(503), get_response(201)) as request:
+		assert client.post(URL, idempotent=True).status_code == 201
+	assert request.call_count == 2
+
+
+def test_retry_after_seconds_and_date_are_honoured(sleeps):
+	client = ApiClient(max_retries=2)
+	retry_at = tableau_online.email.utils.formatdate(tableau_online.time.time() + 30, usegmt=True)
+
+	with serve(client, get_response(429, {'Retry-After': '7'}), get_response(503, {'Retry-After': retry_at}), get_response(200)):
+		client.get(URL)
+
+	assert sleeps.call_args_list[0] == mock.call(7.0)
+	assert 25 < sleeps.call_args_list[1].args[0] <= 30
+
+
+def test_retry_after_is_capped():
+	assert tableau_online._get_backoff_seconds(0, get_response(429, {'Retry-After': '3600'})) == tableau_online.TABLEAU_HTTP_BACKOFF_MAX_SECONDS
+
+
+def test_backoff_is_jittered_exponential_and_capped():
+	with mock.patch.object(tableau_online.random, 'uniform', side_effect=lambda low, high: high):
+		backoff_seconds = [tableau_online._get_backoff_seconds(attempt) for attempt in range(10)]
+
+	assert backoff_seconds[:4] == [tableau_online.TABLEAU_HTTP_BACKOFF_BASE_SECONDS * 2 ** attempt for attempt in range(4)]
+	assert max(backoff_seconds) == tableau_online.TABLEAU_HTTP_BACKOFF_MAX_SECONDS
+
+
+def test_expired_token_signs_in_again_once(sleeps):
+	client = ApiClient()
+	site = Site('site-1', 'site', 'https://tableau.example.com', 'old-token', user_id='user-1')
+	expired = get_response(401, body=get_error_body('401002'))
+
+	def sign_in(force=False, rejected_auth_token=None):
+		site._auth_token = 'new-token'
+
+	server = serve(client, expired, get_response(200))
+	with server, mock.patch.object(site, 'sign_in', side_effect=sign_in) as site_sign_in:
+		assert client.get(URL, site=site).status_code == 200
+
+	site_sign_in.assert_called_once_with(force=True, rejected_auth_token='old-token')
+	assert expired.close.called
+	assert [headers['x-tableau-auth'] for headers in server.sent_headers] == ['old-token', 'new-token']
+
+
+def test_circuit_breaker_opens_then_half_opens(sleeps):
+	circuit_breaker = CircuitBreaker(failure_threshold=3, reset_seconds=60)
+	client = ApiClient(max_retries=5, circuit_breaker=circuit_breaker)
+	now = 1000.0
+
+	with mock.patch.object(tableau_online.time, 'time', side_effect=lambda: now):
+		with serve(client, *[get_response(503)] * 3) as request, pytest.raises(CircuitBreakerOpenError):
+			client.get(URL)
+		assert request.call_count == 3 # The third failure opened the breaker, so the fourth attempt was refused
+		assert circuit_breaker.opened_at == now
+
+		with serve(client) as request, pytest.raises(CircuitBreakerOpenError):
+			client.get(URL)
+		assert request.call_count == 0
+
+		now += 61 # Half-open: one trial call goes through
+		with serve(client, get_response(200)):
+			assert client.get(URL).status_code == 200
+		assert circuit_breaker.opened_at == None and circuit_breaker.num_consecutive_failures == 0
+
+
+def test_failed_trial_call_opens_circuit_breaker_again():
+	circuit_breaker = CircuitBreaker(failure_threshold=2, reset_seconds=60)
+	now = 1000.0
+
+	with mock.patch.object(tableau_online.time, 'time', side_effect=lambda: now):
+		circuit_breaker.record_failure()
+		circuit_breaker.record_failure()
+		now += 61
+		circuit_breaker.before_call() # Let through as the trial call
+		with pytest.raises(CircuitBreakerOpenError):
+			circuit_breaker.before_call() # Others wait while the trial call is out
+		circuit_breaker.record_failure()
+
+		assert circuit_breaker.opened_at == now
+		with pytest.raises(CircuitBreakerOpenError):
+			circuit_breaker.before_call()
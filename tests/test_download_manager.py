@@ -0,0 +1,41 @@
+import io
+import zipfile
+import xml.etree.ElementTree as ET
+from unittest import mock
+import requests
+import tableau_online
+from tableau_online import Site, Datasource, xmlns
+from download_manager import DownloadManager
+
+
+SERVER_ADDRESS = 'https://tableau.example.com'
+
+
+def get_tdsx(datasource_id):
+	tdsx = io.BytesIO()
+	with zipfile.ZipFile(tdsx, 'w') as tdsx_zip_file:
+		tdsx_zip_file.writestr('Data/Extracts/extract.hyper', f'hyper of {datasource_id}' * 1000)
+		tdsx_zip_file.writestr('datasource.tds', '<datasource/>')
+	return tdsx.getvalue()
+
+
+def get_datasource(datasource_id, name):
+	return Datasource(ET.fromstring(f'<datasource xmlns="{xmlns["t"]}" id="{datasource_id}" name="{name}"/>'))
+
+
+def test_same_named_datasources_download_to_separate_files(tmp_path):
+	site = Site('site-1', 'site', SERVER_ADDRESS, 'auth-token', user_id='user-1')
+	datasources = [get_datasource('ds-1', 'Sales'), get_datasource('ds-2', 'Sales'), get_datasource('ds-3', 'Users')]
+
+	def request(method, url, **kwargs):
+		response = requests.models.Response()
+		response.status_code = 200
+		response.raw = io.BytesIO(get_tdsx(url.split('/')[-2]))
+		return response
+
+	with mock.patch.object(tableau_online.client.session, 'request', side_effect=request):
+		datasource_downloads = DownloadManager(f'{tmp_path}/', site, max_workers=3).download(datasources)
+
+	assert [datasource_download.error for datasource_download in datasource_downloads] == [None, None, None]
+	assert sorted(path.name for path in tmp_path.iterdir()) == ['Sales-ds-1.hyper', 'Sales-ds-1.zip', 'Sales-ds-2.hyper', 'Sales-ds-2.zip', 'Users.hyper', 'Users.zip']
+	assert (tmp_path / 'Sales-ds-2.hyper').read_text() == 'hyper of ds-2' * 1000
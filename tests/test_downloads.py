@@ -0,0 +1,327 @@
+import io
+import zipfile
+from unittest import mock
+import requests
+import pytest
+import tableau_online
+from tableau_online import Site, DownloadIntegrityError, _download_to_file, _download_hyper_from_stream
+
+
+URL = 'https://tableau.example.com/api/3.13/sites/site-1/datasources/ds-1/content'
+HYPER_DATA = b''.join(f'row {row_number},'.encode() for row_number in range(20000))
+ETAG = '"etag-1"'
+
+
+class DroppingStream(io.BytesIO):
+	"""
+	Response body that raises ConnectionError, like a dropped connection, once drop_after bytes have been read.
+	"""
+
+	def __init__(self, data, drop_after):
+		super().__init__(data)
+		self.drop_after = drop_after
+
+
+	def read(self, size=-1):
+		if self.tell() >= self.drop_after:
+			raise requests.ConnectionError('Connection dropped')
+		return super().read(min(size, self.drop_after - self.tell()) if size >= 0 else self.drop_after - self.tell())
+
+
+class UnseekableFile(io.RawIOBase):
+	# zipfile writes data descriptors after each member when it can't seek back to the local header
+	def __init__(self):
+		self.data = io.BytesIO()
+
+
+	def writable(self):
+		return True
+
+
+	def write(self, data):
+		return self.data.write(data)
+
+
+def get_tdsx(compression=zipfile.ZIP_DEFLATED, data_descriptors=False, zip64=False, hyper_data=HYPER_DATA):
+	"""
+	Returns a tdsx-like zip with a .tds member followed by the .hyper member, built by zipfile.
+	"""
+
+	output_file = UnseekableFile() if data_descriptors == True else io.BytesIO()
+
+	with zipfile.ZipFile(output_file, 'w', compression=compression) as tdsx_zip_file:
+		tdsx_zip_file.writestr('Ventas.tds', b'<datasource/>' * 50)
+		hyper_zip_info = zipfile.ZipInfo('Data/Extracts/Ventas.hyper')
+		hyper_zip_info.compress_type = compression
+		with tdsx_zip_file.open(hyper_zip_info, 'w', force_zip64=zip64) as hyper_member:
+			hyper_member.write(hyper_data)
+
+	return output_file.data.getvalue() if data_descriptors == True else output_file.getvalue()
+
+
+def get_corrupt_tdsx():
+	# A stored .hyper member with one byte changed, so it fails its CRC check
+	tdsx = bytearray(get_tdsx(zipfile.ZIP_STORED))
+	tdsx[tdsx.index(b'row 100,')] ^= 0xFF
+	return bytes(tdsx)
+
+
+def get_response(status_code, body=b'', headers=None, raw=None):
+	response = requests.models.Response()
+	response.status_code = status_code
+	response.headers.update(headers or {})
+	response.raw = raw if raw != None else io.BytesIO(body)
+	return response
+
+
+class FakeServer:
+	def __init__(self, content, etag=ETAG, supports_ranges=True, drop_after=None):
+		"""
+		Serves content at URL like Tableau's file endpoints: 206 for a Range whose If-Range matches, 416 for a range past the end,
+		otherwise 200 with the whole file. The first drop_after bytes of the first response are sent before the connection drops.
+		"""
+
+		self.content = content
+		self.etag = etag
+		self.supports_ranges = supports_ranges
+		self.drop_after = drop_after
+		self.requests = [] # Headers of each request
+		self.responses = []
+
+
+	def request(self, method, url, headers=None, **kwargs):
+		headers = dict(headers or {})
+		self.requests.append(headers)
+		response = self.get_response(headers)
+		response.close = mock.Mock(wraps=response.close)
+		self.responses.append(response)
+		return response
+
+
+	def get_response(self, headers):
+		response_headers = {'ETag': self.etag} if self.etag != None else {}
+
+		if 'Range' in headers and self.supports_ranges == True and headers.get('If-Range') == self.etag:
+			start = int(headers['Range'].split('=')[1].rstrip('-'))
+			if start >= len(self.content):
+				return get_response(416, headers={'Content-Range': f'bytes */{len(self.content)}'})
+			response_headers.update({'Content-Range': f'bytes {start}-{len(self.content) - 1}/{len(self.content)}', 'Content-Length': str(len(self.content) - start)})
+			return get_response(206, self.content[start:], response_headers)
+
+		response_headers['Content-Length'] = str(len(self.content))
+		if self.drop_after != None and len(self.requests) == 1:
+			return get_response(200, headers=response_headers, raw=DroppingStream(self.content, self.drop_after))
+		return get_response(200, self.content, response_headers)
+
+
+@pytest.fixture
+def site():
+	return Site('site-1', 'site', 'https://tableau.example.com', 'auth-token', user_id='user-1')
+
+
+@pytest.fixture(autouse=True)
+def no_sleep():
+	with mock.patch.object(tableau_online.time, 'sleep'):
+		yield
+
+
+def serve(server):
+	return mock.patch.object(tableau_online.client.session, 'request', side_effect=server.request)
+
+
+def test_download_writes_file_without_part_or_validator(site, tmp_path):
+	server = FakeServer(get_tdsx())
+	file_path = str(tmp_path / 'Ventas.zip')
+
+	with serve(server):
+		num_bytes = _download_to_file(site, URL, file_path, chunk_size=4096)
+
+	assert num_bytes == len(server.content)
+	assert (tmp_path / 'Ventas.zip').read_bytes() == server.content
+	assert sorted(path.name for path in tmp_path.iterdir()) == ['Ventas.zip']
+	assert server.requests[0]['Accept-Encoding'] == 'identity' and 'Range' not in server.requests[0]
+
+
+def test_dropped_download_resumes_with_if_range(site, tmp_path):
+	server = FakeServer(get_tdsx(), drop_after=10000)
+	file_path = str(tmp_path / 'Ventas.zip')
+
+	with serve(server):
+		_download_to_file(site, URL, file_path, chunk_size=4096)
+
+	assert len(server.requests) == 2
+	assert server.requests[1]['Range'] == 'bytes=10000-' and server.requests[1]['If-Range'] == ETAG
+	assert (tmp_path / 'Ventas.zip').read_bytes() == server.content
+
+
+def test_part_file_from_earlier_run_resumes(site, tmp_path):
+	server = FakeServer(get_tdsx())
+	file_path = str(tmp_path / 'Ventas.zip')
+	(tmp_path / 'Ventas.zip.part').write_bytes(server.content[:5000])
+	(tmp_path / 'Ventas.zip.part.validator').write_text(ETAG)
+
+	with serve(server):
+		_download_to_file(site, URL, file_path, chunk_size=4096)
+
+	assert len(server.requests) == 1 and server.responses[0].status_code == 206
+	assert (tmp_path / 'Ventas.zip').read_bytes() == server.content
+	assert sorted(path.name for path in tmp_path.iterdir()) == ['Ventas.zip']
+
+
+def test_changed_file_restarts_from_the_beginning(site, tmp_path):
+	server = FakeServer(get_tdsx(), etag='"etag-2"') # Refreshed since the .part file was written
+	file_path = str(tmp_path / 'Ventas.zip')
+	(tmp_path / 'Ventas.zip.part').write_bytes(get_tdsx(hyper_data=b'old extract' * 1000)[:5000])
+	(tmp_path / 'Ventas.zip.part.validator').write_text(ETAG)
+
+	with serve(server):
+		_download_to_file(site, URL, file_path, chunk_size=4096)
+
+	assert server.requests[0]['If-Range'] == ETAG and server.responses[0].status_code == 200
+	assert (tmp_path / 'Ventas.zip').read_bytes() == server.content
+
+
+def test_server_ignoring_range_restarts_from_the_beginning(site, tmp_path):
+	server = FakeServer(get_tdsx(), supports_ranges=False)
+	file_path = str(tmp_path / 'Ventas.zip')
+	(tmp_path / 'Ventas.zip.part').write_bytes(b'x' * 5000) # Would corrupt the file if appended to
+	(tmp_path / 'Ventas.zip.part.validator').write_text(ETAG)
+
+	with serve(server):
+		_download_to_file(site, URL, file_path, chunk_size=4096)
+
+	assert 'Range' in server.requests[0] and server.responses[0].status_code == 200
+	assert (tmp_path / 'Ventas.zip').read_bytes() == server.content
+
+
+def test_part_file_without_validator_is_not_resumed(site, tmp_path):
+	server = FakeServer(get_tdsx())
+	file_path = str(tmp_path / 'Ventas.zip')
+	(tmp_path / 'Ventas.zip.part').write_bytes(b'x' * 5000)
+
+	with serve(server):
+		_download_to_file(site, URL, file_path, chunk_size=4096)
+
+	assert 'Range' not in server.requests[0]
+	assert (tmp_path / 'Ventas.zip').read_bytes() == server.content
+
+
+def test_416_removes_part_file_and_downloads_again(site, tmp_path):
+	server = FakeServer(get_tdsx())
+	file_path = str(tmp_path / 'Ventas.zip')
+	(tmp_path / 'Ventas.zip.part').write_bytes(server.content + b'extra bytes')
+	(tmp_path / 'Ventas.zip.part.validator').write_text(ETAG)
+
+	with serve(server):
+		_download_to_file(site, URL, file_path, chunk_size=4096)
+
+	assert [response.status_code for response in server.responses] == [416, 200]
+	assert server.responses[0].close.called
+	assert (tmp_path / 'Ventas.zip').read_bytes() == server.content
+
+
+def test_failed_verification_deletes_part_file(site, tmp_path):
+	server = FakeServer(get_corrupt_tdsx())
+	file_path = str(tmp_path / 'Ventas.zip')
+
+	with serve(server), pytest.raises(DownloadIntegrityError, match='CRC'):
+		_download_to_file(site, URL, file_path, chunk_size=4096)
+
+	assert list(tmp_path.iterdir()) == [] # Resuming a corrupt .part file would keep it corrupt
+
+
+def test_wrong_sha256_deletes_part_file(site, tmp_path):
+	server = FakeServer(get_tdsx())
+	file_path = str(tmp_path / 'Ventas.zip')
+
+	with serve(server), pytest.raises(DownloadIntegrityError, match='SHA-256'):
+		_download_to_file(site, URL, file_path, chunk_size=4096, expected_sha256='0' * 64)
+
+	assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize('compression', [zipfile.ZIP_DEFLATED, zipfile.ZIP_STORED])
+@pytest.mark.parametrize('zip64', [False, True])
+def test_hyper_extracted_from_stream(site, tmp_path, compression, zip64):
+	server = FakeServer(get_tdsx(compression, zip64=zip64))
+	hyper_file_path = str(tmp_path / 'Ventas.hyper')
+
+	with serve(server):
+		assert _download_hyper_from_stream(site, URL, hyper_file_path, chunk_size=1000) == True
+
+	assert (tmp_path / 'Ventas.hyper').read_bytes() == HYPER_DATA
+	assert sorted(path.name for path in tmp_path.iterdir()) == ['Ventas.hyper']
+	assert server.responses[0].close.called
+
+
+@pytest.mark.parametrize('zip64', [False, True])
+def test_hyper_extracted_from_stream_with_data_descriptors(site, tmp_path, zip64):
+	server = FakeServer(get_tdsx(zipfile.ZIP_DEFLATED, data_descriptors=True, zip64=zip64))
+	hyper_file_path = str(tmp_path / 'Ventas.hyper')
+
+	with serve(server):
+		assert _download_hyper_from_stream(site, URL, hyper_file_path, chunk_size=1000) == True
+
+	assert (tmp_path / 'Ventas.hyper').read_bytes() == HYPER_DATA
+
+
+@pytest.mark.parametrize('content', [
+	get_tdsx(zipfile.ZIP_STORED, data_descriptors=True), # A stored member's end can't be found without its size
+	b'<html>Not a zip</html>',
+	get_tdsx()[:3000], # Truncated in the middle of a member
+	get_corrupt_tdsx(),
+], ids=['stored_with_data_descriptor', 'not_a_zip', 'truncated', 'crc_mismatch'])
+def test_stream_falls_back_to_whole_archive(site, tmp_path, content):
+	server = FakeServer(content)
+	hyper_file_path = str(tmp_path / 'Ventas.hyper')
+
+	with serve(server):
+		assert _download_hyper_from_stream(site, URL, hyper_file_path, chunk_size=1000) == False
+
+	assert list(tmp_path.iterdir()) == []
+
+
+def test_stream_falls_back_when_connection_drops(site, tmp_path):
+	server = FakeServer(get_tdsx(), drop_after=3000)
+	hyper_file_path = str(tmp_path / 'Ventas.hyper')
+
+	with serve(server):
+		assert _download_hyper_from_stream(site, URL, hyper_file_path, chunk_size=1000) == False
+
+	assert list(tmp_path.iterdir()) == []
+
+
+def test_stream_without_hyper_falls_back(site, tmp_path):
+	tds_only = io.BytesIO()
+	with zipfile.ZipFile(tds_only, 'w', compression=zipfile.ZIP_DEFLATED) as tdsx_zip_file:
+		tdsx_zip_file.writestr('Ventas.tds', b'<datasource/>')
+	server = FakeServer(tds_only.getvalue())
+
+	with serve(server):
+		assert _download_hyper_from_stream(site, URL, str(tmp_path / 'Ventas.hyper')) == False
+
+
+def test_datasource_download_falls_back_from_truncated_stream(site, tmp_path):
+	server = FakeServer(get_tdsx(), drop_after=3000)
+	datasource = object.__new__(tableau_online.Datasource)
+	datasource.id = 'ds-1'
+	datasource.name = 'Ventas'
+
+	with serve(server):
+		downloaded_file_paths = datasource.download(site, f'{tmp_path}/', stream_hyper=True)
+
+	assert downloaded_file_paths['full_hyper_file_path'] == f'{tmp_path}/Ventas.hyper'
+	assert (tmp_path / 'Ventas.hyper').read_bytes() == HYPER_DATA
+	assert sorted(path.name for path in tmp_path.iterdir()) == ['Ventas.hyper'] # The fallback's zip file is deleted
+
+
+@pytest.mark.parametrize('download', [_download_to_file, _download_hyper_from_stream], ids=['to_file', 'hyper_from_stream'])
+def test_failed_status_closes_response(site, tmp_path, download):
+	not_found = get_response(404, f'<tsResponse xmlns="{tableau_online.xmlns["t"]}"><error code="404004"><summary>Not found</summary><detail>Datasource not found</detail></error></tsResponse>'.encode())
+	not_found.close = mock.Mock(wraps=not_found.close)
+
+	with mock.patch.object(tableau_online.client.session, 'request', return_value=not_found), pytest.raises(tableau_online.ApiCallError):
+		download(site, URL, str(tmp_path / 'Ventas.zip'))
+
+	assert not_found.close.called
+	assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,80 @@
+from unittest import mock
+import requests
+import pytest
+import tableau_online
+from tableau_online import GetCache, Site, Workbook, xmlns
+
+
+@pytest.fixture
+def now():
+	# Current time seen by the cache, moved forward by the tests
+	now = [1000.0]
+	with mock.patch.object(tableau_online.time, 'time', side_effect=lambda: now[0]):
+		yield now
+
+
+def test_entries_expire_after_their_content_type_ttl(now):
+	get_cache = GetCache(ttl_seconds={'Workbook': 300, 'Datasource': 60})
+	get_cache.set(('site-1', 'Workbook', 'wb-1'), 'workbook')
+	get_cache.set(('site-1', 'Datasource', 'ds-1'), 'datasource')
+
+	now[0] += 61
+	assert get_cache.get(('site-1', 'Workbook', 'wb-1')) == 'workbook'
+	assert get_cache.get(('site-1', 'Datasource', 'ds-1')) == None
+
+	now[0] += 240
+	assert get_cache.get(('site-1', 'Workbook', 'wb-1')) == None
+	assert get_cache.get_stats() == {'size': 0, 'hits': {'Workbook': 1}, 'misses': {'Datasource': 1, 'Workbook': 1}}
+
+
+def test_least_recently_used_entry_is_evicted(now):
+	get_cache = GetCache(max_size=2, ttl_seconds={'Workbook': 300})
+	get_cache.set(('site-1', 'Workbook', 'wb-1'), 'workbook 1')
+	get_cache.set(('site-1', 'Workbook', 'wb-2'), 'workbook 2')
+	get_cache.get(('site-1', 'Workbook', 'wb-1')) # wb-2 is now the least recently used
+	get_cache.set(('site-1', 'Workbook', 'wb-3'), 'workbook 3')
+
+	assert get_cache.get(('site-1', 'Workbook', 'wb-2')) == None
+	assert get_cache.get(('site-1', 'Workbook', 'wb-1')) == 'workbook 1'
+	assert get_cache.get(('site-1', 'Workbook', 'wb-3')) == 'workbook 3'
+
+
+def test_invalidate_drops_only_that_site_entry(now):
+	get_cache = GetCache(ttl_seconds={'Workbook': 300})
+	get_cache.set(('site-1', 'Workbook', 'wb-1'), 'workbook on site 1')
+	get_cache.set(('site-2', 'Workbook', 'wb-1'), 'workbook on site 2')
+
+	get_cache.invalidate(('site-1', 'Workbook', 'wb-1'))
+
+	assert get_cache.get(('site-1', 'Workbook', 'wb-1')) == None
+	assert get_cache.get(('site-2', 'Workbook', 'wb-1')) == 'workbook on site 2'
+
+
+def test_workbook_get_is_cached_until_refreshed_or_invalidated():
+	site = Site('site-1', 'site', 'https://tableau.example.com', 'auth-token', user_id='user-1')
+	calls = []
+
+	def request(method, url, **kwargs):
+		calls.append((method, url))
+		response = requests.models.Response()
+		response.status_code = 200
+		response._content = f'<tsResponse xmlns="{xmlns["t"]}"><workbook id="wb-1" name="Workbook" showTabs="false"/><permissions/></tsResponse>'.encode()
+		response._content_consumed = True
+		return response
+
+	tableau_online.get_cache.clear()
+
+	with mock.patch.object(tableau_online.client.session, 'request', side_effect=request):
+		workbook = Workbook.get(site, 'wb-1')
+		assert Workbook.get(site, 'wb-1') == workbook
+		assert len(calls) == 1
+
+		assert Workbook.get(site, 'wb-1', refresh=True) != workbook
+		assert len(calls) == 2
+
+		workbook.add_group_permissions(site, 'group-1', ['Read'], 'Allow') # Changes the workbook, so its entry is dropped
+		Workbook.get(site, 'wb-1')
+		assert [method for method, url in calls] == ['GET', 'GET', 'PUT', 'GET']
+
+	with pytest.raises(TypeError):
+		Workbook.get(site, 'wb-1', True) # refresh is keyword-only
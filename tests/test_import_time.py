@@ -0,0 +1,39 @@
+import re
+import subprocess
+import sys
+from conftest import REPOSITORY_PATH
+
+
+# Budget for 'import tableau_online' in a fresh interpreter, including requests and dotenv. It takes about 0.15s on a laptop.
+IMPORT_TIME_BUDGET_SECONDS = 1.0
+
+# Heavy modules that only the functions using them may import
+HEAVY_MODULES = ('pantab', 'pandas', 'snowflake', 'tableauhyperapi')
+
+
+def run_python(code, *options):
+	return subprocess.run([sys.executable, *options, '-c', code], cwd=REPOSITORY_PATH, capture_output=True, text=True, check=True)
+
+
+def get_import_seconds(module_name):
+	"""
+	Returns the cumulative import time of a module, in seconds, as reported by python -X importtime.
+	"""
+
+	stderr = run_python(f'import {module_name}', '-X', 'importtime').stderr
+	cumulative_microseconds = [int(match.group(1)) for match in re.finditer(rf'^import time:\s+\d+ \|\s+(\d+) \| {module_name}$', stderr, re.MULTILINE)]
+	assert len(cumulative_microseconds) == 1, stderr[-2000:]
+	return cumulative_microseconds[0] / 1000000
+
+
+def test_import_loads_no_heavy_modules():
+	loaded_modules = run_python('import sys, tableau_online, database; print(" ".join(sys.modules))').stdout.split()
+
+	assert [module_name for module_name in loaded_modules if module_name.split('.')[0] in HEAVY_MODULES] == []
+
+
+def test_import_time_within_budget():
+	# The best of 3 runs, so a busy machine doesn't fail the test
+	import_seconds = min(get_import_seconds('tableau_online') for run_number in range(3))
+
+	assert import_seconds < IMPORT_TIME_BUDGET_SECONDS, f'import tableau_online took {import_seconds:.2f}s, budget is {IMPORT_TIME_BUDGET_SECONDS}s'
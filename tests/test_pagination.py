@@ -0,0 +1,112 @@
+import io
+import time
+import threading
+from unittest import mock
+from urllib.parse import urlparse, parse_qs
+import requests
+import pytest
+import tableau_online
+from tableau_online import Site, Workbook, TABLEAU_PAGE_SIZE, xmlns, _iter_pages
+
+
+URL = 'https://tableau.example.com/api/3.13/sites/site-1/workbooks'
+
+
+class ListingServer:
+	def __init__(self, num_items, pagination_first=True):
+		"""
+		Answers listing calls with pages of <workbook> elements, like Tableau's REST API, and records the page numbers requested.
+		'pagination_first'		Boolean to put <pagination> before the listed elements, as Tableau does. False puts it after them.
+		"""
+
+		self.num_items = num_items
+		self.pagination_first = pagination_first
+		self.page_numbers = []
+		self.responses = []
+		self._lock = threading.Lock()
+
+
+	def request(self, method, url, **kwargs):
+		query = parse_qs(urlparse(url).query)
+		page_number = int(query['pageNumber'][0])
+		page_size = int(query['pageSize'][0])
+		first_item = (page_number - 1) * page_size
+
+		workbooks = ''.join(f'<workbook id="wb-{item_number}" name="Workbook {item_number}"><project id="p1"/></workbook>' for item_number in range(first_item, min(first_item + page_size, self.num_items)))
+		pagination = f'<pagination pageNumber="{page_number}" pageSize="{page_size}" totalAvailable="{self.num_items}"/>'
+		body = f'<tsResponse xmlns="{xmlns["t"]}">{pagination}<workbooks>{workbooks}</workbooks></tsResponse>' if self.pagination_first == True else f'<tsResponse xmlns="{xmlns["t"]}"><workbooks>{workbooks}</workbooks>{pagination}</tsResponse>'
+
+		response = requests.models.Response()
+		response.status_code = 200
+		response.raw = io.BytesIO(body.encode('utf-8'))
+		response.close = mock.Mock(wraps=response.close)
+
+		with self._lock:
+			self.page_numbers.append(page_number)
+			self.responses.append(response)
+
+		return response
+
+
+@pytest.fixture
+def site():
+	return Site('site-1', 'site', 'https://tableau.example.com', 'auth-token', user_id='user-1')
+
+
+def serve(server):
+	return mock.patch.object(tableau_online.client.session, 'request', side_effect=server.request)
+
+
+@pytest.mark.parametrize('pagination_first', [True, False])
+def test_every_page_is_yielded_in_order(site, pagination_first):
+	server = ListingServer(25, pagination_first)
+
+	with serve(server):
+		workbook_ids = [element.get('id') for element in _iter_pages(site, URL, 'workbook', page_size=10, prefetch=2)]
+
+	assert workbook_ids == [f'wb-{item_number}' for item_number in range(25)]
+	assert sorted(server.page_numbers) == [1, 2, 3]
+	assert all(response.close.called for response in server.responses)
+
+
+def test_exact_multiple_of_page_size_requests_no_empty_page(site):
+	server = ListingServer(20)
+
+	with serve(server):
+		assert len(list(_iter_pages(site, URL, 'workbook', page_size=10))) == 20
+
+	assert sorted(server.page_numbers) == [1, 2]
+
+
+def test_empty_listing_makes_one_call(site):
+	server = ListingServer(0)
+
+	with serve(server):
+		assert list(_iter_pages(site, URL, 'workbook', page_size=10)) == []
+
+	assert server.page_numbers == [1]
+
+
+def test_early_close_stops_fetching_and_closes_responses(site):
+	server = ListingServer(1000)
+
+	with serve(server):
+		pages = _iter_pages(site, URL, 'workbook', page_size=10, prefetch=2)
+		first_workbooks = [next(pages) for item_number in range(3)]
+		pages.close()
+		time.sleep(0.2) # Any page fetch still running finishes
+
+	assert [element.get('id') for element in first_workbooks] == ['wb-0', 'wb-1', 'wb-2']
+	assert len(server.page_numbers) <= 3 # The first page plus at most 'prefetch' pages, not all 100
+	assert all(response.close.called for response in server.responses)
+
+
+def test_workbook_find_pages_through_the_listing(site):
+	server = ListingServer(TABLEAU_PAGE_SIZE * 2 + 5)
+
+	with serve(server):
+		workbooks = Workbook.find(site)
+
+	assert len(workbooks) == TABLEAU_PAGE_SIZE * 2 + 5
+	assert workbooks[-1].id == f'wb-{TABLEAU_PAGE_SIZE * 2 + 4}'
+	assert sorted(server.page_numbers) == [1, 2, 3]
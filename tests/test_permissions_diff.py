@@ -0,0 +1,117 @@
+import xml.etree.ElementTree as ET
+from unittest import mock
+import requests
+import pytest
+import tableau_online
+from tableau_online import Site, Workbook, xmlns, get_permission_changes
+from permissions_engine import PermissionsEngine, PermissionWrite
+
+
+SERVER_ADDRESS = 'https://tableau.example.com'
+
+
+def get_response(status_code, body=b''):
+	response = requests.models.Response()
+	response.status_code = status_code
+	response._content = body
+	response._content_consumed = True
+	return response
+
+
+class PermissionsServer:
+	def __init__(self, permissions):
+		"""
+		Holds the workbook permissions {workbook ID: {group ID: {capability name: mode}}} and answers GET, PUT and DELETE on them like Tableau.
+		"""
+
+		self.permissions = permissions
+		self.calls = [] # (method, URL path after the site, capabilities written)
+
+
+	def request(self, method, url, data=None, **kwargs):
+		path = url.split(f'/sites/site-1/')[1]
+		workbook_id = path.split('/')[1]
+		workbook_permissions = self.permissions.setdefault(workbook_id, {})
+
+		if method == 'GET':
+			self.calls.append((method, path, None))
+			grantees = ''
+			for group_id, capabilities in workbook_permissions.items():
+				capability_elements = ''.join(f'<capability name="{name}" mode="{mode}"/>' for name, mode in capabilities.items())
+				grantees += f'<granteeCapabilities><group id="{group_id}"/><capabilities>{capability_elements}</capabilities></granteeCapabilities>'
+			return get_response(200, f'<tsResponse xmlns="{xmlns["t"]}"><permissions><workbook id="{workbook_id}"/>{grantees}</permissions></tsResponse>'.encode())
+
+		if method == 'DELETE': # .../permissions/groups/<group ID>/<capability>/<mode>
+			group_id, capability_name, permission_mode = path.split('/')[-3:]
+			assert workbook_permissions[group_id].pop(capability_name) == permission_mode
+			self.calls.append((method, path, None))
+			return get_response(204)
+
+		written = {}
+		for grantee_capabilities_element in ET.fromstring(data).iter('granteeCapabilities'):
+			group_id = grantee_capabilities_element.find('group').get('id')
+			for capability_element in grantee_capabilities_element.iter('capability'):
+				assert capability_element.get('name') not in workbook_permissions.get(group_id, {}), 'Tableau rejects a capability set in the other mode'
+				workbook_permissions.setdefault(group_id, {})[capability_element.get('name')] = capability_element.get('mode')
+				written[capability_element.get('name')] = capability_element.get('mode')
+		self.calls.append((method, path, written))
+		return get_response(200, f'<tsResponse xmlns="{xmlns["t"]}"><permissions/></tsResponse>'.encode())
+
+
+def get_workbook(workbook_id):
+	workbook = object.__new__(Workbook)
+	for attribute_name in Workbook.__slots__:
+		setattr(workbook, attribute_name, None)
+	workbook.id = workbook_id
+	workbook.name = f'Workbook {workbook_id}'
+	return workbook
+
+
+@pytest.fixture
+def engine():
+	return PermissionsEngine(Site('site-1', 'site', SERVER_ADDRESS, 'auth-token', user_id='user-1'), max_workers=2, content_graph=object())
+
+
+def apply(engine, server, permission_writes):
+	with mock.patch.object(tableau_online.client.session, 'request', side_effect=server.request):
+		return engine.execute(engine._diff(permission_writes))
+
+
+def test_get_permission_changes():
+	current_capabilities = {'Read': 'Allow', 'Filter': 'Deny'}
+
+	assert get_permission_changes(current_capabilities, ['Read'], 'Allow') == ([], [])
+	assert get_permission_changes(current_capabilities, ['Read', 'Filter', 'ExportData'], 'Allow') == (['ExportData'], ['Filter'])
+	assert get_permission_changes({}, ['Read'], 'Deny') == (['Read'], [])
+
+
+def test_only_changed_capabilities_are_written(engine):
+	server = PermissionsServer({'wb-1': {'group-1': {'Read': 'Allow', 'Filter': 'Deny'}}})
+
+	summary = apply(engine, server, [PermissionWrite(get_workbook('wb-1'), ['group-1'], ['Read', 'Filter', 'ExportData'], 'Allow')])
+
+	assert summary['written'] == 1 and summary['failed'] == []
+	assert [(method, written) for method, path, written in server.calls if method != 'GET'] == [('DELETE', None), ('PUT', {'Filter': 'Allow', 'ExportData': 'Allow'})]
+	assert server.permissions['wb-1']['group-1'] == {'Read': 'Allow', 'Filter': 'Allow', 'ExportData': 'Allow'}
+
+
+def test_unchanged_site_costs_only_reads(engine):
+	server = PermissionsServer({'wb-1': {'group-1': {'Read': 'Allow'}, 'group-2': {'Read': 'Allow'}}, 'wb-2': {'group-1': {'Read': 'Allow'}}})
+	permission_writes = [PermissionWrite(get_workbook('wb-1'), ['group-1'], ['Read'], 'Allow'), PermissionWrite(get_workbook('wb-1'), ['group-2'], ['Read'], 'Allow'),
+		PermissionWrite(get_workbook('wb-2'), ['group-1'], ['Read'], 'Allow')]
+
+	summary = apply(engine, server, permission_writes)
+
+	assert summary['planned'] == 0
+	assert sorted(path for method, path, written in server.calls) == ['workbooks/wb-1/permissions', 'workbooks/wb-2/permissions'] # One read per workbook, not per group
+
+
+def test_diff_keeps_writes_per_group(engine):
+	server = PermissionsServer({'wb-1': {'group-1': {'Read': 'Allow'}}})
+	permission_writes = [PermissionWrite(get_workbook('wb-1'), ['group-1'], ['Read'], 'Allow'), PermissionWrite(get_workbook('wb-1'), ['group-2'], ['Read'], 'Allow')]
+
+	summary = apply(engine, server, permission_writes)
+
+	assert summary['written'] == 1
+	assert [written for method, path, written in server.calls if method == 'PUT'] == [{'Read': 'Allow'}]
+	assert server.permissions['wb-1'] == {'group-1': {'Read': 'Allow'}, 'group-2': {'Read': 'Allow'}}
@@ -0,0 +1,96 @@
+from unittest import mock
+import xml.etree.ElementTree as ET
+import requests
+import pytest
+import tableau_online
+from tableau_online import Site, Workbook, View, TABLEAU_API_VERSION, xmlns
+
+
+SERVER_ADDRESS = 'https://tableau.example.com'
+SITE_ID = 'site-1'
+NUM_VIEWS = 60
+
+
+def get_response(status_code, body):
+	response = requests.models.Response()
+	response.status_code = status_code
+	response._content = body.encode('utf-8')
+	response._content_consumed = True
+	return response
+
+
+def get_views_listing(workbook_id, num_views):
+	views = ''.join(f'<view id="v{view_number}" name="View {view_number}" contentUrl="wb/sheets/View{view_number}"><workbook id="{workbook_id}"/></view>' for view_number in range(num_views))
+	return f'<tsResponse xmlns="{xmlns["t"]}"><pagination pageNumber="1" pageSize="100" totalAvailable="{num_views}"/><views>{views}</views></tsResponse>'
+
+
+@pytest.fixture
+def site():
+	# Signed in already, so no sign-in call is made
+	return Site(SITE_ID, 'site', SERVER_ADDRESS, 'auth-token', user_id='user-1')
+
+
+@pytest.fixture
+def workbook():
+	workbook = object.__new__(Workbook)
+	for attribute_name in Workbook.__slots__:
+		setattr(workbook, attribute_name, None)
+	workbook.id = 'wb-1'
+	workbook.name = 'Workbook'
+	workbook.show_tabs = 'false'
+	return workbook
+
+
+@pytest.fixture
+def server_calls():
+	"""
+	Answers every call made through tableau_online.client like Tableau would, and records (method, url) for each.
+	"""
+
+	calls = []
+
+	def request(method, url, **kwargs):
+		calls.append((method, url))
+		if method == 'GET' and url.split('?')[0].endswith('/views'):
+			return get_response(200, get_views_listing('wb-1', NUM_VIEWS))
+		if method == 'GET' and '/workbooks/' in url:
+			workbook_id = url.split('?')[0].rstrip('/').split('/')[-1]
+			return get_response(200, f'<tsResponse xmlns="{xmlns["t"]}"><workbook id="{workbook_id}" name="Workbook" showTabs="false"/></tsResponse>')
+		if method == 'PUT' and url.endswith('/permissions'):
+			return get_response(200, f'<tsResponse xmlns="{xmlns["t"]}"><permissions/></tsResponse>')
+		raise AssertionError(f'Unexpected call: {method} {url}')
+
+	with mock.patch.object(tableau_online.client.session, 'request', side_effect=request):
+		yield calls
+
+
+def test_get_views_makes_one_call(site, workbook, server_calls):
+	views = workbook.get_views(site)
+
+	assert len(server_calls) == 1
+	assert server_calls[0] == ('GET', f'{SERVER_ADDRESS}/api/{TABLEAU_API_VERSION}/sites/{SITE_ID}/workbooks/wb-1/views')
+	assert len(views) == NUM_VIEWS
+	assert all(isinstance(view, View) and view.parent_workbook_id == 'wb-1' for view in views)
+	assert views[0].name == 'View 0' and views[0].url == 'wb/sheets/View0'
+
+
+def test_cascade_to_views_makes_n_plus_2_calls(site, workbook, server_calls):
+	workbook.add_group_permissions(site, 'group-1', ['Read'], 'Allow', view_permission_capabilities=['Read'], cascade_to_views=True)
+
+	# The workbook PUT, the views listing, then one PUT per view. No View.get or Workbook.get per view.
+	assert len(server_calls) == NUM_VIEWS + 2
+	assert [method for method, url in server_calls].count('GET') == 1
+	assert sum(1 for method, url in server_calls if method == 'PUT' and '/views/' in url) == NUM_VIEWS
+
+
+def test_workbooks_map_fetches_each_parent_once_per_run(site, server_calls):
+	views = [View.from_element(view_element) for view_element in ET.fromstring(get_views_listing('wb-1', 3)).iter(f'{{{xmlns["t"]}}}view')]
+	views += [View.from_element(view_element) for view_element in ET.fromstring(get_views_listing('wb-2', 3)).iter(f'{{{xmlns["t"]}}}view')]
+	workbooks = {}
+
+	for view in views:
+		tableau_online.get_cache.clear() # As if each entry's TTL had passed, or the LRU had evicted it
+		view.add_group_permissions(view, 'group-1', ['Read'], 'Allow', site=site, workbooks=workbooks)
+
+	assert [url.split('/')[-1] for method, url in server_calls if method == 'GET'] == ['wb-1', 'wb-2']
+	assert sorted(workbooks) == ['wb-1', 'wb-2']
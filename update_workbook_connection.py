@@ -1,6 +1,5 @@
 import tableau_online
 import xml.etree.ElementTree as ET # Contains methods used to build and parse XML
-import requests # Contains methods used to make HTTP requests
 import common
 import argparse
 
@@ -119,8 +118,9 @@ def main(workbook_id, connection_id, site=tableau_online.site, connection_server
 
 		common.standard_logger.debug(f'xml_request: {xml_request}')
 
-		server_response = requests.put(url, data=xml_request, headers={'x-tableau-auth': tableau_online.auth_token})
+		server_response = tableau_online.client.put(url, data=xml_request, site=site)
 		tableau_online._check_status(server_response, 200)
+		tableau_online.invalidate_content(site, 'Workbook', workbook_id)
 
 		common.standard_logger.debug('Finished updating connection.')
 
@@ -12,6 +12,7 @@ def get_cmd_parameters():
 		'table_name'			(Optional) Default value is 'TABLEAU_ONLINE_USAGE'.
 		'schema_name'			(Optional) Default value is 'BUSINESS_INTELLIGENCE'.
 		'database_name'			(Optional) Default value is 'PATTERN_DB'.
+		'force'					(Optional) Download and load the datasource even if it's unchanged since the last successful run.
 	"""
 
 	parser.add_argument(
@@ -54,6 +55,13 @@ def get_cmd_parameters():
 		help="(Optional) Default value is 'PATTERN_DB'."
 	)
 
+	parser.add_argument(
+		"-f",
+		"--force",
+		action='store_true',
+		help="(Optional) Download and load the datasource even if it's unchanged since the last successful run."
+	)
+
 	args = parser.parse_args()
 
 	return args
@@ -119,21 +127,27 @@ def remove_duplicates_on_tableau_online_usage_snowflake_table(table_name, schema
 	return num_deleted_records
 
 
-def upload_tableau_online_usage_data(output_path='/', num_look_back_days=1, table_name='TABLEAU_ONLINE_USAGE', schema_name='BUSINESS_INTELLIGENCE', database_name='PATTERN_DB'):
+def upload_tableau_online_usage_data(output_path='/', num_look_back_days=1, table_name='TABLEAU_ONLINE_USAGE', schema_name='BUSINESS_INTELLIGENCE', database_name='PATTERN_DB', force=False):
 	"""
 	Downloads TDSX file, extracts to Hyper, converts it to Dataframe, changes the date data types, inserts into Snowflake table,
-	and removes potential duplicate rows.
+	and removes potential duplicate rows. Does nothing if the datasource is unchanged (same updated_at and size) since the last successful run.
 	'output_path'			Filepath to store data source file. '/' required at end of path.
 	'num_look_back_days'	(Optional) Number of days to insert. Default value is 1.
 	'table_name'			(Optional) Default value is 'TABLEAU_ONLINE_USAGE'.
 	'schema_name'			(Optional) Default value is 'BUSINESS_INTELLIGENCE'.
 	'database_name'			(Optional) Default value is 'PATTERN_DB'.
+	'force'					(Optional) Boolean to run even if the datasource is unchanged.
 	"""
 
 	ts_events_datasource_id = 'd398510b-7ed4-40c7-a560-d08464033063'
 
-	ts_events_datasource = tableau_online.Datasource.get(tableau_online.site, ts_events_datasource_id)
-	downloaded_ts_events_file = ts_events_datasource.download(tableau_online.site, output_path, hyper_output_file_name=ts_events_datasource.name, extract_as_hyper=True, delete_zip_file=True)
+	ts_events_datasource = tableau_online.Datasource.get(tableau_online.site, ts_events_datasource_id, refresh=True)
+
+	if force == False and ts_events_datasource.is_unchanged(tableau_online.site):
+		common.standard_logger.info(f'{ts_events_datasource.name} is unchanged since {ts_events_datasource.updated_at}. Nothing to upload.')
+		return {'num_rows_inserted': 0, 'num_deleted_records': 0}
+
+	downloaded_ts_events_file = ts_events_datasource.download(tableau_online.site, output_path, hyper_output_file_name=ts_events_datasource.name, extract_as_hyper=True, delete_zip_file=True, stream_hyper=True)
 
 	df_data = tableau_online.convert_hyper_file_to_dataframe(downloaded_ts_events_file['full_hyper_file_path'], 'Extract')
 
@@ -157,6 +171,9 @@ def upload_tableau_online_usage_data(output_path='/', num_look_back_days=1, tabl
 
 	common.standard_logger.info(f'num_rows_inserted: {num_rows_inserted}. num_deleted_records: {num_deleted_records}.')
 
+	# Recorded only now, so a failed download or load is retried on the next run
+	ts_events_datasource.record_download_state(tableau_online.site)
+
 	return {'num_rows_inserted': num_rows_inserted, 'num_deleted_records': num_deleted_records}
 
 